@@ -1,10 +1,8 @@
+import importlib
 import streamlit as st
 from models.portfolio import PortfolioTracker
-from ui.dashboard import dashboard_page
-from ui.portfolio import portfolio_page
-from ui.accounts import accounts_page
-from ui.transactions import transaction_page
-from ui.config import config_page
+from ui import data_cache
+from ui.progress import StreamlitReporter
 
 # Configuration de la page Streamlit
 st.set_page_config(
@@ -14,33 +12,47 @@ st.set_page_config(
     initial_sidebar_state="expanded"
 )
 
+# Pages de l'application : libellé -> (module, fonction). Le module d'une page n'est importé
+# qu'à son premier affichage (Plotly n'est chargé que par les pages qui tracent des graphiques)
+PAGES = {
+    "🏠 Tableau de Bord": ('ui.dashboard', 'dashboard_page'),
+    "📈 Suivi de Portefeuille": ('ui.portfolio', 'portfolio_page'),
+    "💼 Gestion des Comptes": ('ui.accounts', 'accounts_page'),
+    "💸 Gestion des Transactions": ('ui.transactions', 'transaction_page'),
+    "🧪 Simulation": ('ui.scenario', 'scenario_page'),
+    "🔮 Projection": ('ui.projection', 'projection_page'),
+    "⚙️ Configuration": ('ui.config', 'config_page'),
+}
+
+def load_page(page: str):
+    """Fonction d'affichage d'une page, son module étant importé à la demande"""
+    module_name, function_name = PAGES[page]
+    return getattr(importlib.import_module(module_name), function_name)
+
+@st.cache_resource
+def get_tracker() -> PortfolioTracker:
+    """Tracker partagé par les exécutions et les sessions : la base n'est initialisée qu'une fois"""
+    return PortfolioTracker()
+
 def main():
-    tracker = PortfolioTracker()
+    tracker = get_tracker()
     
     # Initialiser les taux de change EUR/USD au démarrage avec feedback
     if 'rates_initialized' not in st.session_state:
         with st.spinner("🔄 Récupération du taux de change EUR/USD..."):
-            tracker.currency_converter.get_eur_usd_rate(show_debug=True)
+            tracker.currency_converter.get_eur_usd_rate(StreamlitReporter())
 
         st.session_state.rates_initialized = True
     
     # Sidebar pour la navigation
     st.sidebar.title("📊 Navigation")
-    page = st.sidebar.selectbox("Choisir une page", 
-                               ["🏠 Tableau de Bord", "📈 Suivi de Portefeuille", 
-                                "💼 Gestion des Comptes", "💸 Gestion des Transactions", 
-                                "⚙️ Configuration"])
-    
-    if page == "🏠 Tableau de Bord":
-        dashboard_page(tracker)
-    elif page == "📈 Suivi de Portefeuille":
-        portfolio_page(tracker)
-    elif page == "💼 Gestion des Comptes":
-        accounts_page(tracker)
-    elif page == "💸 Gestion des Transactions":
-        transaction_page(tracker)
-    elif page == "⚙️ Configuration":
-        config_page(tracker)
+    page = st.sidebar.selectbox("Choisir une page", list(PAGES))
+
+    # Devise de valorisation partagée par les pages (EUR, USD ou devise avec taux historiques)
+    st.sidebar.selectbox("💱 Devise de valorisation", data_cache.get_reporting_currencies(tracker),
+                         key="reporting_currency")
+
+    load_page(page)(tracker)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
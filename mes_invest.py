@@ -0,0 +1,188 @@
+import argparse
+import logging
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+from models.portfolio import EVOLUTION_BREAKDOWNS, PortfolioTracker
+from models.progress import LoggingReporter
+
+# Codes de sortie (2 est celui d'argparse pour des arguments invalides)
+EXIT_OK = 0
+EXIT_PARTIAL = 1   # une partie des produits en échec ou sans données
+EXIT_USAGE = 2     # arguments invalides
+EXIT_FAILED = 3    # rien n'a pu être mis à jour
+EXIT_ERROR = 4     # erreur inattendue
+
+REPORT_FORMATS = ('json', 'csv')
+
+logger = logging.getLogger('mes_invest')
+
+
+def _batch_exit_code(succeeded: int, failed: int) -> int:
+    """Code de sortie d'un traitement par produit"""
+    if failed and not succeeded:
+        return EXIT_FAILED
+    return EXIT_PARTIAL if failed else EXIT_OK
+
+
+def _write_report(df, args):
+    """Écrit un rapport (DataFrame) au format demandé, sur la sortie standard ou dans --output"""
+    if args.format == 'json':
+        content = df.to_json(orient='records', date_format='iso', force_ascii=False, indent=2)
+    else:
+        content = df.to_csv(index=False)
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(content)
+    else:
+        try:
+            sys.stdout.write(content)
+            if not content.endswith('\n'):
+                sys.stdout.write('\n')
+            sys.stdout.flush()
+        except BrokenPipeError:
+            # Lecteur fermé avant la fin (| head) : le reste est ignoré, sans erreur à la sortie
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+            return
+    logger.info(f"{len(df)} ligne(s) exportée(s) ({args.format})")
+
+
+def sync_prices(tracker: PortfolioTracker, args) -> int:
+    """Met à jour les prix de tous les produits depuis leur dernière mise à jour (un téléchargement groupé)"""
+    days = args.days or tracker.get_incremental_history_days()
+    logger.info(f"Mise à jour des prix ({days} jour(s) d'historique)")
+    result = tracker.update_all_prices(days, LoggingReporter(logger))
+    logger.info(f"{result['updated']} produit(s) mis à jour, {result['failed']} en échec, "
+                f"{result['alerts']} alerte(s) déclenchée(s)")
+    return _batch_exit_code(result['updated'], result['failed'])
+
+
+def init_history(tracker: PortfolioTracker, args) -> int:
+    """Remplace l'historique des prix de tous les produits"""
+    result = tracker.initialize_price_history(args.days, LoggingReporter(logger), delay=args.delay)
+    logger.info(f"{result['initialized']} produit(s) initialisé(s), {result['empty']} sans données, "
+                f"{result['failed']} en échec, {result['rows']} prix enregistrés")
+    return _batch_exit_code(result['initialized'], result['failed'] + result['empty'])
+
+
+def sync_fx(tracker: PortfolioTracker, args) -> int:
+    """Récupère le taux EUR/USD du jour et l'enregistre dans les taux historiques"""
+    converter = tracker.currency_converter
+    if not converter.get_eur_usd_rate(LoggingReporter(logger)):
+        logger.error("Taux EUR/USD indisponible, taux de secours non enregistré")
+        return EXIT_FAILED
+
+    if not tracker.db.save_exchange_rate('EUR', 'USD', float(converter.eur_usd_rate), datetime.now()):
+        logger.error("Échec de l'enregistrement du taux EUR/USD")
+        return EXIT_FAILED
+    logger.info(f"Taux enregistré : 1 EUR = {converter.eur_usd_rate:.4f} USD")
+    return EXIT_OK
+
+
+def summary(tracker: PortfolioTracker, args) -> int:
+    """Résumé du portefeuille (une ligne par position)"""
+    _write_report(tracker.get_portfolio_summary(currency=args.currency), args)
+    return EXIT_OK
+
+
+def evolution(tracker: PortfolioTracker, args) -> int:
+    """Évolution de la valeur du portefeuille entre deux dates (sans les répartitions)"""
+    if args.date_from > args.date_to:
+        logger.error("--from doit précéder --to")
+        return EXIT_USAGE
+
+    df = tracker.get_portfolio_evolution(args.date_from, args.date_to, currency=args.currency,
+                                         frequency=args.frequency)
+    _write_report(df.drop(columns=list(EVOLUTION_BREAKDOWNS), errors='ignore'), args)
+    return EXIT_OK
+
+
+def db_stats(tracker: PortfolioTracker, args) -> int:
+    """Nombre de lignes par table et taille du fichier de base"""
+    for table, count in tracker.db.get_database_stats().items():
+        print(f"{table:<20} {count:>10}")
+    print(f"{'taille (Mo)':<20} {os.path.getsize(tracker.db.db_path) / 1024 / 1024:>10.2f}")
+    return EXIT_OK
+
+
+def _add_report_arguments(command: argparse.ArgumentParser):
+    """Options communes aux rapports (summary, evolution)"""
+    command.add_argument('--format', choices=REPORT_FORMATS, default='json')
+    command.add_argument('--currency', type=str.upper, default='EUR', help="Devise de valorisation (défaut : EUR)")
+    command.add_argument('--output', help="Fichier de sortie (défaut : sortie standard)")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(
+        prog='python -m mes_invest',
+        description="Opérations du suivi de patrimoine sans interface (tâches planifiées, scripts)",
+        epilog=f"Codes de sortie : {EXIT_OK} succès, {EXIT_PARTIAL} succès partiel, {EXIT_USAGE} arguments "
+               f"invalides, {EXIT_FAILED} échec, {EXIT_ERROR} erreur inattendue")
+    parser.add_argument('--db', default='portfolio.db', help="Fichier de base SQLite (défaut : portfolio.db)")
+    parser.add_argument('-v', '--verbose', action='store_true', help="Affiche aussi les messages de debug")
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    command = commands.add_parser('sync-prices', help="Met à jour les prix depuis la dernière mise à jour")
+    command.add_argument('--days', type=int, help="Jours d'historique à télécharger "
+                                                  "(défaut : depuis le dernier prix du produit le moins à jour)")
+    command.set_defaults(handler=sync_prices)
+
+    command = commands.add_parser('init-history', help="Initialise l'historique des prix de tous les produits")
+    command.add_argument('--days', type=int, default=365, help="Jours d'historique (défaut : 365)")
+    command.add_argument('--delay', type=float, default=1.0, help="Pause entre deux produits, en secondes")
+    command.set_defaults(handler=init_history)
+
+    command = commands.add_parser('sync-fx', help="Enregistre le taux EUR/USD du jour")
+    command.set_defaults(handler=sync_fx)
+
+    command = commands.add_parser('summary', help="Résumé du portefeuille")
+    _add_report_arguments(command)
+    command.set_defaults(handler=summary)
+
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    command = commands.add_parser('evolution', help="Évolution de la valeur du portefeuille")
+    _add_report_arguments(command)
+    command.add_argument('--from', dest='date_from', type=datetime.fromisoformat, default=today - timedelta(days=365),
+                         help="Date de début AAAA-MM-JJ (défaut : il y a un an)")
+    command.add_argument('--to', dest='date_to', type=datetime.fromisoformat, default=today,
+                         help="Date de fin AAAA-MM-JJ (défaut : aujourd'hui)")
+    command.add_argument('--frequency', choices=('W', 'M'), help="Rééchantillonnage hebdomadaire ou mensuel")
+    command.set_defaults(handler=evolution)
+
+    command = commands.add_parser('db-stats', help="Statistiques de la base de données")
+    command.set_defaults(handler=db_stats)
+    return parser
+
+
+def main(argv=None) -> int:
+    args = build_parser().parse_args(argv)
+    logging.basicConfig(level=logging.DEBUG if args.verbose else logging.INFO, stream=sys.stderr,
+                        format='%(asctime)s %(levelname)s %(message)s')
+
+    start = time.perf_counter()
+    try:
+        tracker = PortfolioTracker(args.db)
+        if getattr(args, 'currency', None) is not None:
+            currencies = tracker.get_reporting_currencies()
+            if args.currency not in currencies:
+                logger.error(f"Devise non supportée : {args.currency} (disponibles : {', '.join(currencies)})")
+                return EXIT_USAGE
+        rows_before = tracker.db.get_database_stats()
+        code = args.handler(tracker, args)
+    except Exception:
+        logger.exception(f"Erreur inattendue pendant {args.command}")
+        return EXIT_ERROR
+
+    # Lignes ajoutées ou supprimées par table, puis durée totale
+    for table, count in tracker.db.get_database_stats().items():
+        if count != rows_before[table]:
+            logger.info(f"{table} : {count - rows_before[table]:+d} ligne(s) ({count} au total)")
+    logger.info(f"{args.command} terminé en {time.perf_counter() - start:.2f} s (code {code})")
+    return code
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,253 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Optional, Tuple
+
+from models.database import DatabaseManager
+from models.price_matrix import PriceMatrix
+
+# Types d'alertes et signification du seuil
+# PRICE_ABOVE / PRICE_BELOW : prix actuel (devise du produit) au-dessus / en dessous du seuil
+# MOVE : variation sur window_days jours ≥ seuil (seuil positif) ou ≤ seuil (seuil négatif), en fraction
+# DRAWDOWN : baisse depuis le plus haut des window_days derniers jours (tout l'historique si vide) ≥ seuil
+# WEIGHT_ABOVE : poids de la position dans le portefeuille ≥ seuil (fraction)
+ALERT_TYPES = ('PRICE_ABOVE', 'PRICE_BELOW', 'MOVE', 'DRAWDOWN', 'WEIGHT_ABOVE')
+
+ALERT_TYPE_LABELS = {
+    'PRICE_ABOVE': "Prix au-dessus de",
+    'PRICE_BELOW': "Prix en dessous de",
+    'MOVE': "Variation sur la période",
+    'DRAWDOWN': "Baisse depuis le plus haut",
+    'WEIGHT_ABOVE': "Poids dans le portefeuille au-dessus de",
+}
+
+# Types qui exigent un horizon en jours
+WINDOW_ALERT_TYPES = ('MOVE',)
+
+
+def evaluate_alerts(alert_types: np.ndarray, thresholds: np.ndarray, prices: np.ndarray, moves: np.ndarray,
+                    drawdowns: np.ndarray, weights: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Évalue toutes les alertes en une passe : chaque tableau est aligné sur les alertes
+    (valeurs déjà résolues pour le produit et l'horizon de chacune).
+    Retourne la valeur observée et la condition ; une donnée manquante ne déclenche rien.
+    """
+    values = np.select(
+        [np.isin(alert_types, ('PRICE_ABOVE', 'PRICE_BELOW')), alert_types == 'MOVE',
+         alert_types == 'DRAWDOWN', alert_types == 'WEIGHT_ABOVE'],
+        [prices, moves, drawdowns, weights],
+        default=np.nan
+    )
+    with np.errstate(invalid='ignore'):
+        conditions = np.select(
+            [alert_types == 'PRICE_ABOVE', alert_types == 'PRICE_BELOW',
+             (alert_types == 'MOVE') & (thresholds >= 0), (alert_types == 'MOVE') & (thresholds < 0),
+             alert_types == 'DRAWDOWN', alert_types == 'WEIGHT_ABOVE'],
+            [values >= thresholds, values <= thresholds,
+             values >= thresholds, values <= thresholds,
+             values >= thresholds, values >= thresholds],
+            default=False
+        )
+    return values, conditions & ~np.isnan(values)
+
+
+def format_alert_value(alert_type: str, value: float, currency: str) -> str:
+    """Valeur observée ou seuil d'une alerte : prix en devise du produit, sinon pourcentage"""
+    if alert_type in ('PRICE_ABOVE', 'PRICE_BELOW'):
+        return f"{value:,.2f} {currency}"
+    return f"{value * 100:+.2f}%" if alert_type == 'MOVE' else f"{value * 100:.2f}%"
+
+
+class AlertEngine:
+    """
+    Alertes de prix évaluées en lot après chaque actualisation des prix.
+
+    Une alerte se déclenche quand sa condition devient vraie (front montant) : un
+    événement est enregistré une seule fois, puis l'alerte est réarmée quand la
+    condition redevient fausse. Les données nécessaires sont lues en quelques requêtes
+    quel que soit le nombre d'alertes, les valeurs par alerte sont obtenues par indexation.
+    """
+
+    def __init__(self, db: DatabaseManager, prices: PriceMatrix):
+        self.db = db
+        self.prices = prices
+
+    def add_alert(self, product_id: int, alert_type: str, threshold: float,
+                  window_days: Optional[int] = None, note: str = "") -> Tuple[bool, str]:
+        """Crée une alerte (seuil en devise du produit pour les prix, en fraction sinon)"""
+        if alert_type not in ALERT_TYPES:
+            return False, f"Type d'alerte inconnu : {alert_type}"
+        if alert_type in WINDOW_ALERT_TYPES and not window_days:
+            return False, "Un horizon (en jours) est requis pour une alerte de variation"
+        if alert_type in ('PRICE_ABOVE', 'PRICE_BELOW', 'WEIGHT_ABOVE', 'DRAWDOWN') and threshold <= 0:
+            return False, "Le seuil doit être positif"
+
+        conn = sqlite3.connect(self.db.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''INSERT INTO alerts (product_id, alert_type, threshold, window_days, note)
+                        VALUES (?, ?, ?, ?, ?)''',
+                      (product_id, alert_type, threshold, window_days or None, note))
+        conn.commit()
+        conn.close()
+        self.db.mark_written()
+        return True, "Alerte créée"
+
+    def delete_alert(self, alert_id: int) -> bool:
+        """Supprime une alerte et ses déclenchements"""
+        conn = sqlite3.connect(self.db.db_path)
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM alert_events WHERE alert_id = ?", (alert_id,))
+        cursor.execute("DELETE FROM alerts WHERE id = ?", (alert_id,))
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        self.db.mark_written()
+        return success
+
+    def set_alert_active(self, alert_id: int, active: bool) -> bool:
+        """Active ou suspend une alerte (une alerte réactivée est réarmée)"""
+        conn = sqlite3.connect(self.db.db_path)
+        cursor = conn.cursor()
+        cursor.execute("UPDATE alerts SET active = ?, is_triggered = 0 WHERE id = ?", (int(active), alert_id))
+        success = cursor.rowcount > 0
+        conn.commit()
+        conn.close()
+        self.db.mark_written()
+        return success
+
+    def get_alerts(self) -> pd.DataFrame:
+        """Récupère les alertes avec le symbole du produit et le dernier déclenchement"""
+        conn = sqlite3.connect(self.db.db_path)
+        df = pd.read_sql_query('''
+            SELECT al.*, fp.symbol, fp.currency,
+                   (SELECT MAX(ae.fired_at) FROM alert_events ae WHERE ae.alert_id = al.id) AS last_fired_at
+            FROM alerts al
+            JOIN financial_products fp ON al.product_id = fp.id
+            ORDER BY fp.symbol, al.alert_type
+        ''', conn)
+        conn.close()
+        return df
+
+    def get_alert_events(self, unacknowledged_only: bool = True, limit: int = 50) -> pd.DataFrame:
+        """Derniers déclenchements (par défaut ceux qui n'ont pas encore été lus)"""
+        conn = sqlite3.connect(self.db.db_path)
+        where = "WHERE ae.acknowledged_at IS NULL" if unacknowledged_only else ""
+        df = pd.read_sql_query(f'''
+            SELECT ae.id, ae.alert_id, ae.trigger_date, ae.value, ae.threshold, ae.fired_at,
+                   ae.acknowledged_at, al.alert_type, al.window_days, al.note, fp.symbol, fp.currency
+            FROM alert_events ae
+            JOIN alerts al ON ae.alert_id = al.id
+            JOIN financial_products fp ON al.product_id = fp.id
+            {where}
+            ORDER BY ae.fired_at DESC, ae.id DESC
+            LIMIT ?
+        ''', conn, params=(limit,))
+        conn.close()
+        return df
+
+    def acknowledge_events(self, event_ids: Optional[list] = None) -> int:
+        """Marque les déclenchements comme lus (tous si event_ids n'est pas fourni)"""
+        conn = sqlite3.connect(self.db.db_path)
+        cursor = conn.cursor()
+        now = datetime.now()
+        if event_ids is None:
+            cursor.execute("UPDATE alert_events SET acknowledged_at = ? WHERE acknowledged_at IS NULL", (now,))
+        else:
+            cursor.executemany("UPDATE alert_events SET acknowledged_at = ? WHERE id = ? AND acknowledged_at IS NULL",
+                               [(now, int(event_id)) for event_id in event_ids])
+        count = cursor.rowcount
+        conn.commit()
+        conn.close()
+        self.db.mark_written()
+        return count
+
+    def check_alerts(self) -> pd.DataFrame:
+        """
+        Évalue toutes les alertes actives contre les prix stockés et enregistre les
+        nouveaux déclenchements (un par alerte et par jour au plus). Retourne ces déclenchements.
+        """
+        conn = sqlite3.connect(self.db.db_path)
+        alerts = pd.read_sql_query('''
+            SELECT id, product_id, alert_type, threshold, window_days, is_triggered
+            FROM alerts
+            WHERE active = 1
+            ORDER BY product_id
+        ''', conn)
+        if alerts.empty:
+            conn.close()
+            return pd.DataFrame(columns=['alert_id', 'product_id', 'alert_type', 'value', 'threshold'])
+
+        products = pd.read_sql_query('''
+            SELECT fp.id, fp.current_price, fp.current_price_eur,
+                   COALESCE(SUM(pos.quantity), 0) * COALESCE(fp.current_price_eur, 0) AS value
+            FROM financial_products fp
+            LEFT JOIN positions pos ON pos.product_id = fp.id
+            GROUP BY fp.id
+            ORDER BY fp.id
+        ''', conn)
+        conn.close()
+
+        # Position de chaque alerte dans les tableaux par produit (ids triés)
+        product_ids = products['id'].to_numpy()
+        columns = np.clip(np.searchsorted(product_ids, alerts['product_id'].to_numpy()), 0, len(product_ids) - 1)
+        known = product_ids[columns] == alerts['product_id'].to_numpy()
+
+        current_native = products['current_price'].to_numpy(dtype=float)
+        current_eur = products['current_price_eur'].to_numpy(dtype=float)
+        values_eur = products['value'].to_numpy(dtype=float)
+        total_value = values_eur.sum()
+
+        alert_types = alerts['alert_type'].to_numpy(dtype=object)
+        windows = alerts['window_days'].to_numpy(dtype=float)
+        moves = np.full(len(alerts), np.nan)
+        drawdowns = np.full(len(alerts), np.nan)
+
+        history = self.prices.get(product_ids=list(product_ids), fill_current=False)
+        if not history.empty:
+            matrix = history.to_numpy(dtype=float)
+            today_row = len(matrix) - 1
+
+            # Variations : une ligne de référence par horizon distinct
+            is_move = (alert_types == 'MOVE') & known
+            for window in np.unique(windows[is_move]):
+                selected = is_move & (windows == window)
+                reference = matrix[max(today_row - int(window), 0), columns[selected]]
+                moves[selected] = current_eur[columns[selected]] / reference - 1
+
+            # Baisse depuis le plus haut : un maximum par colonne et par horizon distinct
+            is_drawdown = (alert_types == 'DRAWDOWN') & known
+            for window in np.unique(np.nan_to_num(windows[is_drawdown], nan=0)):
+                selected = is_drawdown & (np.nan_to_num(windows, nan=0) == window)
+                start_row = max(today_row - int(window), 0) if window > 0 else 0
+                with np.errstate(all='ignore'):
+                    highs = np.fmax(np.nanmax(matrix[start_row:], axis=0, initial=-np.inf), current_eur)
+                drawdowns[selected] = 1 - current_eur[columns[selected]] / highs[columns[selected]]
+
+        weights = values_eur / total_value if total_value > 0 else np.full(len(values_eur), np.nan)
+        values, conditions = evaluate_alerts(
+            alert_types, alerts['threshold'].to_numpy(dtype=float),
+            np.where(known, current_native[columns], np.nan), moves, drawdowns,
+            np.where(known, weights[columns], np.nan)
+        )
+
+        # Front montant : déclenchement ; condition retombée : alerte réarmée
+        triggered = alerts['is_triggered'].to_numpy(dtype=bool)
+        fired = conditions & ~triggered
+        changed = conditions != triggered
+        today = datetime.now().strftime('%Y-%m-%d')
+        fired_alerts = alerts[fired].assign(value=values[fired])
+
+        conn = sqlite3.connect(self.db.db_path)
+        cursor = conn.cursor()
+        cursor.executemany('''INSERT OR IGNORE INTO alert_events (alert_id, trigger_date, value, threshold)
+                            VALUES (?, ?, ?, ?)''',
+                          zip(fired_alerts['id'].tolist(), [today] * len(fired_alerts),
+                              fired_alerts['value'].tolist(), fired_alerts['threshold'].tolist()))
+        cursor.executemany("UPDATE alerts SET is_triggered = ? WHERE id = ?",
+                           zip(conditions[changed].astype(int).tolist(), alerts['id'].to_numpy()[changed].tolist()))
+        conn.commit()
+        conn.close()
+        self.db.mark_written()
+
+        return fired_alerts.rename(columns={'id': 'alert_id'})[['alert_id', 'product_id', 'alert_type', 'value', 'threshold']]
@@ -0,0 +1,36 @@
+import numpy as np
+import pandas as pd
+
+
+def simulate_benchmarks(flow_days: np.ndarray, flow_amounts: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """
+    Valeur quotidienne de « mêmes flux investis dans l'indice » pour plusieurs indices à la fois.
+
+    flow_days donne l'indice du jour de chaque flux dans la grille de prices (jours × indices),
+    flow_amounts le montant en EUR (positif pour un achat, négatif pour une vente).
+    Chaque achat achète des parts de l'indice au prix du jour, chaque vente en revend
+    pour le même montant ; une vente ne peut pas céder plus de parts que détenues.
+    """
+    n_days, n_benchmarks = prices.shape
+    bought = np.zeros((n_days, n_benchmarks))
+    sold = np.zeros((n_days, n_benchmarks))
+
+    units = np.abs(flow_amounts)[:, None] / prices[flow_days]
+    buys = flow_amounts > 0
+    np.add.at(bought, flow_days[buys], units[buys])
+    np.add.at(sold, flow_days[~buys], units[~buys])
+
+    # Parts vendues cumulées plafonnées : X_t = S_t + min(0, cummin(B - S))
+    bought = np.cumsum(bought, axis=0)
+    sold = np.cumsum(sold, axis=0)
+    sold_effective = sold + np.minimum(0.0, np.minimum.accumulate(bought - sold, axis=0))
+
+    return (bought - sold_effective) * prices
+
+
+def benchmark_prices(prices: pd.DataFrame) -> pd.DataFrame:
+    """
+    Prix d'exécution des flux simulés : dernier prix connu, ou premier prix disponible
+    pour les flux antérieurs au début de l'historique de l'indice
+    """
+    return prices.ffill().bfill()
@@ -0,0 +1,71 @@
+import pandas as pd
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+
+def extract_splits(hist: pd.DataFrame) -> List[Tuple[str, float]]:
+    """
+    Fractionnements (date d'effet, ratio) contenus dans un historique Yahoo Finance :
+    la colonne Stock Splits est fournie avec les prix (2.0 pour une division par deux
+    du cours, 0.1 pour un regroupement de 10 en 1).
+    """
+    if hist.empty or 'Stock Splits' not in hist.columns:
+        return []
+    splits = hist['Stock Splits']
+    splits = splits[splits > 0]
+    return [(date.strftime('%Y-%m-%d'), float(ratio)) for date, ratio in splits.items()]
+
+
+def record_splits(cursor, product_id: int, splits: List[Tuple[str, float]], source: str = 'yahoo') -> int:
+    """Enregistre des fractionnements (ignorés s'ils sont déjà connus) ; retourne le nombre de nouveaux"""
+    cursor.executemany('''INSERT OR IGNORE INTO corporate_actions (product_id, action_type, ex_date, ratio, source)
+                          VALUES (?, 'SPLIT', ?, ?, ?)''',
+                       [(product_id, ex_date, ratio, source) for ex_date, ratio in splits])
+    return max(cursor.rowcount, 0)
+
+
+def apply_pending_actions(cursor, product_id: Optional[int] = None) -> List[Dict]:
+    """
+    Applique, par ordre de date d'effet, les opérations non encore appliquées.
+
+    Pour un fractionnement de ratio r, tout ce qui précède la date d'effet est ramené en
+    termes post-opération par des UPDATE groupés : quantités des transactions × r, prix
+    des transactions, de l'historique et dividendes par part ÷ r (les montants restent
+    inchangés, les positions suivent par triggers). Les valeurs d'origine des transactions
+    sont copiées dans corporate_action_audit et l'opération est marquée appliquée :
+    un second appel ne modifie rien. S'exécute dans la transaction de l'appelant.
+    """
+    where = "applied_at IS NULL" + (" AND product_id = ?" if product_id is not None else "")
+    params = (product_id,) if product_id is not None else ()
+    pending = cursor.execute(f'''SELECT id, product_id, ex_date, ratio FROM corporate_actions
+                                 WHERE {where} ORDER BY ex_date, id''', params).fetchall()
+
+    applied = []
+    for action_id, action_product_id, ex_date, ratio in pending:
+        before_split = (action_product_id, ex_date)
+
+        cursor.execute('''INSERT INTO corporate_action_audit
+                          (action_id, transaction_id, old_quantity, old_price, old_price_eur, old_price_usd)
+                          SELECT ?, id, quantity, price, price_eur, price_usd FROM transactions
+                          WHERE product_id = ? AND date(transaction_date) < ?''', (action_id,) + before_split)
+        cursor.execute('''UPDATE transactions
+                          SET quantity = quantity * ?, price = price / ?, price_eur = price_eur / ?, price_usd = price_usd / ?
+                          WHERE product_id = ? AND date(transaction_date) < ?''', (ratio,) * 4 + before_split)
+        transactions_adjusted = cursor.rowcount
+
+        cursor.execute('''UPDATE price_history
+                          SET price = price / ?, price_eur = price_eur / ?, price_usd = price_usd / ?
+                          WHERE product_id = ? AND date(date) < ?''', (ratio,) * 3 + before_split)
+        prices_adjusted = cursor.rowcount
+
+        cursor.execute('''UPDATE dividends
+                          SET amount = amount / ?, amount_eur = amount_eur / ?, amount_usd = amount_usd / ?
+                          WHERE product_id = ? AND ex_date < ?''', (ratio,) * 3 + before_split)
+
+        cursor.execute('''UPDATE corporate_actions
+                          SET applied_at = ?, transactions_adjusted = ?, prices_adjusted = ?
+                          WHERE id = ?''', (datetime.now(), transactions_adjusted, prices_adjusted, action_id))
+
+        applied.append({'id': action_id, 'product_id': action_product_id, 'ex_date': ex_date, 'ratio': ratio,
+                        'transactions_adjusted': transactions_adjusted, 'prices_adjusted': prices_adjusted})
+
+    return applied
@@ -0,0 +1,158 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from typing import Dict, List, Optional, Tuple
+
+from models.database import DatabaseManager
+from models.price_matrix import PriceMatrix
+from models.risk import MIN_OBSERVATIONS, TRADING_DAYS_PER_YEAR, to_trading_days
+from utils.versioned_cache import VersionedCache
+
+# Quantité en dessous de laquelle une position est considérée comme soldée
+HOLDING_EPSILON = 1e-9
+
+# Matrices calculées, partagées entre toutes les sessions du processus
+_correlation_cache = VersionedCache(max_entries=16)
+
+
+def covariance_matrix(log_returns: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Covariance quotidienne par paires d'une matrice de rendements (jours × séries, NaN hors
+    historique) et nombre de jours communs à chaque paire.
+
+    Chaque série est centrée sur sa propre moyenne et ses jours manquants mis à 0 :
+    la covariance s'obtient alors d'un seul produit matriciel Xᵀ X, les effectifs
+    par paire du produit des masques.
+    """
+    valid = ~np.isnan(log_returns)
+    observations = valid.sum(axis=0)
+    mean = np.where(valid, log_returns, 0.0).sum(axis=0) / np.maximum(observations, 1)
+    centered = np.where(valid, log_returns - mean, 0.0)
+
+    mask = valid.astype(float)
+    pairs = mask.T @ mask
+    covariance = (centered.T @ centered) / np.maximum(pairs - 1, 1)
+    return covariance, pairs
+
+
+def correlation_from_covariance(covariance: np.ndarray) -> np.ndarray:
+    """Corrélations déduites d'une covariance (bornées à [-1, 1], diagonale à 1)"""
+    std = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+    scale = np.outer(std, std)
+    correlation = np.divide(covariance, scale, out=np.full_like(covariance, np.nan), where=scale > 0)
+    correlation = np.clip(correlation, -1.0, 1.0)
+    np.fill_diagonal(correlation, 1.0)
+    return correlation
+
+
+def effective_number_of_bets(covariance: np.ndarray, weights: np.ndarray,
+                             eigen: Optional[Tuple[np.ndarray, np.ndarray]] = None) -> float:
+    """
+    Nombre effectif de paris (Meucci) : exponentielle de l'entropie des contributions
+    au risque des facteurs principaux (composantes propres de la covariance).
+    Vaut 1 pour un portefeuille porté par un seul facteur, N pour N facteurs également risqués.
+    eigen permet de réutiliser une décomposition np.linalg.eigh déjà calculée.
+    """
+    eigenvalues, eigenvectors = eigen if eigen is not None else np.linalg.eigh(covariance)
+    contributions = (eigenvectors.T @ weights) ** 2 * np.maximum(eigenvalues, 0.0)
+    total = contributions.sum()
+    if total <= 0:
+        return np.nan
+    shares = contributions[contributions > 0] / total
+    return float(np.exp(-(shares * np.log(shares)).sum()))
+
+
+class CorrelationAnalyzer:
+    """
+    Corrélations et diversification des positions ouvertes, calculées sur les rendements
+    par jour ouvré de la matrice des prix total return et pondérées par la valeur actuelle.
+    """
+
+    def __init__(self, db: DatabaseManager, prices: PriceMatrix):
+        self.db = db
+        self.prices = prices
+
+    def get_correlation(self, product_ids: Optional[List[int]] = None,
+                        window_days: Optional[int] = 365) -> Dict:
+        """
+        Matrices de corrélation et de covariance (annualisée) des positions ouvertes
+        (limitées à product_ids si fourni) sur les window_days derniers jours, avec le
+        nombre effectif de paris et le ratio de diversification.
+        Les produits ayant moins de MIN_OBSERVATIONS rendements sont listés dans excluded.
+        """
+        holdings = tuple(sorted({int(product_id) for product_id in product_ids})) if product_ids is not None else None
+        today = pd.Timestamp.today().normalize()
+        result = _correlation_cache.get_or_compute(
+            (self.db.db_path, holdings, window_days, today), self.db.get_data_version(),
+            self._compute, holdings, window_days
+        )
+        return {key: value.copy() if isinstance(value, (pd.DataFrame, pd.Series, list)) else value
+                for key, value in result.items()}
+
+    def _holdings(self, product_ids: Optional[Tuple[int, ...]]) -> pd.DataFrame:
+        """Valeur actuelle (EUR) des positions ouvertes, agrégée par produit"""
+        conn = sqlite3.connect(self.db.db_path)
+        holdings = pd.read_sql_query(f'''
+            SELECT fp.id AS product_id, fp.symbol,
+                   SUM(pos.quantity) * COALESCE(fp.current_price_eur, 0) AS value
+            FROM positions pos
+            JOIN financial_products fp ON pos.product_id = fp.id
+            WHERE pos.quantity > {HOLDING_EPSILON}
+            GROUP BY fp.id
+            ORDER BY fp.id
+        ''', conn)
+        conn.close()
+        if product_ids is not None:
+            holdings = holdings[holdings['product_id'].isin(product_ids)]
+        return holdings.reset_index(drop=True)
+
+    def _compute(self, product_ids: Optional[Tuple[int, ...]], window_days: Optional[int]) -> Dict:
+        holdings = self._holdings(product_ids)
+        empty = {'correlation': pd.DataFrame(), 'covariance': pd.DataFrame(), 'weights': pd.Series(dtype=float),
+                 'volatility': pd.Series(dtype=float), 'excluded': holdings['symbol'].tolist(),
+                 'observations': 0, 'effective_bets': np.nan, 'diversification_ratio': np.nan}
+        if holdings.empty:
+            return empty
+
+        prices = self.prices.get(product_ids=holdings['product_id'].tolist(), fill_current=False,
+                                 total_return=True)
+        log_prices = np.log(prices.to_numpy(dtype=float))
+        daily = pd.DataFrame(np.diff(log_prices, axis=0, prepend=np.nan), index=prices.index)
+        trading = to_trading_days(daily)
+
+        # Fenêtre mesurée depuis le dernier prix stocké, comme l'analyse de risque
+        observed = trading.notna().any(axis=1)
+        if not observed.any():
+            return empty
+        trading = trading.loc[:observed[observed].index[-1]]
+        if window_days is not None:
+            trading = trading.loc[trading.index > trading.index[-1] - pd.Timedelta(days=window_days)]
+        returns = trading.to_numpy(dtype=float)
+
+        included = (~np.isnan(returns)).sum(axis=0) >= MIN_OBSERVATIONS
+        if not included.any():
+            return empty
+        returns = returns[:, included]
+        symbols = holdings['symbol'].to_numpy()[included]
+
+        covariance, pairs = covariance_matrix(returns)
+        covariance *= TRADING_DAYS_PER_YEAR
+        correlation = correlation_from_covariance(covariance)
+        # Paires dont les historiques se recouvrent trop peu : corrélation non significative
+        correlation[pairs < MIN_OBSERVATIONS] = np.nan
+
+        values = holdings['value'].to_numpy(dtype=float)[included]
+        weights = values / values.sum() if values.sum() > 0 else np.full(len(values), 1.0 / len(values))
+        volatility = np.sqrt(np.maximum(np.diag(covariance), 0.0))
+        portfolio_volatility = np.sqrt(max(weights @ covariance @ weights, 0.0))
+
+        return {
+            'correlation': pd.DataFrame(correlation, index=symbols, columns=symbols),
+            'covariance': pd.DataFrame(covariance, index=symbols, columns=symbols),
+            'weights': pd.Series(weights, index=symbols),
+            'volatility': pd.Series(volatility, index=symbols),
+            'excluded': holdings['symbol'].to_numpy()[~included].tolist(),
+            'observations': len(returns),
+            'effective_bets': effective_number_of_bets(covariance, weights),
+            'diversification_ratio': (weights @ volatility) / portfolio_volatility if portfolio_volatility > 0 else np.nan,
+        }
@@ -1,10 +1,27 @@
-import streamlit as st
-import requests
-import yfinance as yf
+import logging
+import numpy as np
+import pandas as pd
 from datetime import datetime, timedelta
 from typing import Dict, Tuple, Optional
 import time
 
+from models.progress import NULL_REPORTER, ProgressReporter
+from utils.single_flight import SingleFlight
+from utils.yahoo_finance import YahooFinanceUtils
+
+# Requêtes de change en cours, partagées entre toutes les sessions du processus
+_fx_flight = SingleFlight()
+
+EXCHANGE_RATE_API_URL = "https://api.exchangerate-api.com/v4/latest/EUR"
+
+logger = logging.getLogger(__name__)
+
+def _fetch_exchange_rate_api(timeout: int):
+    """Appel à l'API de change de secours (regroupé entre appelants concurrents)"""
+    import requests
+
+    return _fx_flight.do(('exchangerate-api', 'EUR'), requests.get, EXCHANGE_RATE_API_URL, timeout=timeout)
+
 class CurrencyConverter:
     """Gestionnaire de conversion de devises avec support taux historiques"""
     
@@ -21,15 +38,13 @@ class CurrencyConverter:
             'JPY': 0.0067, # 1 JPY = 0.0067 EUR
         }
     
-    def get_eur_usd_rate_alternative(self, show_debug=False) -> bool:
+    def get_eur_usd_rate_alternative(self, reporter: ProgressReporter = NULL_REPORTER) -> bool:
         """Méthode alternative pour récupérer le taux EUR/USD via une API gratuite"""
         try:
-            if show_debug:
-                st.write("🔄 Tentative avec API alternative...")
+            reporter.message('debug', "🔄 Tentative avec API alternative...")
             
             # API gratuite pour les taux de change
-            url = "https://api.exchangerate-api.com/v4/latest/EUR"
-            response = requests.get(url, timeout=10)
+            response = _fetch_exchange_rate_api(timeout=10)
             
             if response.status_code == 200:
                 data = response.json()
@@ -37,19 +52,17 @@ class CurrencyConverter:
                     self.eur_usd_rate = data['rates']['USD']
                     self.last_update = datetime.now()
                     
-                    if show_debug:
-                        st.success(f"✅ Taux EUR/USD récupéré via API: 1 EUR = {self.eur_usd_rate:.4f} USD")
+                    reporter.message('success', f"✅ Taux EUR/USD récupéré via API: 1 EUR = {self.eur_usd_rate:.4f} USD")
                     
                     return True
             
             return False
             
         except Exception as e:
-            if show_debug:
-                st.write(f"❌ Erreur API alternative: {str(e)}")
+            reporter.message('debug', f"❌ Erreur API alternative: {str(e)}")
             return False
 
-    def get_eur_usd_rate(self, show_debug=False) -> bool:
+    def get_eur_usd_rate(self, reporter: ProgressReporter = NULL_REPORTER) -> bool:
         """Récupère le taux de change EUR/USD via yfinance puis API de secours"""
         try:
             # Mise à jour toutes les 6 heures seulement
@@ -62,17 +75,14 @@ class CurrencyConverter:
             
             for symbol in symbols_to_try:
                 try:
-                    if show_debug:
-                        st.write(f"🔍 Tentative de récupération du taux avec {symbol}...")
+                    reporter.message('debug', f"🔍 Tentative de récupération du taux avec {symbol}...")
                     
-                    ticker = yf.Ticker(symbol)
-                    hist = ticker.history(period="2d")  # 2 jours pour plus de chances
+                    hist = YahooFinanceUtils.get_history(symbol, period="2d")  # 2 jours pour plus de chances
                     
                     if not hist.empty:
                         rate = hist['Close'].iloc[-1]
                         
-                        if show_debug:
-                            st.write(f"✅ Taux trouvé avec {symbol}: {rate}")
+                        reporter.message('debug', f"✅ Taux trouvé avec {symbol}: {rate}")
                         
                         # Si c'est USDEUR=X, on inverse le taux
                         if symbol == 'USDEUR=X':
@@ -82,37 +92,31 @@ class CurrencyConverter:
                         
                         self.last_update = datetime.now()
                         
-                        if show_debug:
-                            st.success(f"✅ Taux EUR/USD récupéré: 1 EUR = {self.eur_usd_rate:.4f} USD")
+                        reporter.message('success', f"✅ Taux EUR/USD récupéré: 1 EUR = {self.eur_usd_rate:.4f} USD")
                         
                         return True
                     else:
-                        if show_debug:
-                            st.write(f"⚠️ Pas de données pour {symbol}")
+                        reporter.message('debug', f"⚠️ Pas de données pour {symbol}")
                         
                 except Exception as e:
-                    if show_debug:
-                        st.write(f"❌ Erreur avec {symbol}: {str(e)}")
+                    reporter.message('debug', f"❌ Erreur avec {symbol}: {str(e)}")
                     continue
             
             # Si Yahoo Finance ne fonctionne pas, essayer l'API alternative
-            if show_debug:
-                st.write("🔄 Yahoo Finance indisponible, tentative avec API alternative...")
+            reporter.message('debug', "🔄 Yahoo Finance indisponible, tentative avec API alternative...")
             
-            if self.get_eur_usd_rate_alternative():
+            if self.get_eur_usd_rate_alternative(reporter):
                 return True
             
             # Si rien ne fonctionne, utiliser un taux de secours
-            if show_debug:
-                st.warning("⚠️ Impossible de récupérer le taux EUR/USD en temps réel, utilisation d'un taux de secours")
+            reporter.message('warning', "⚠️ Impossible de récupérer le taux EUR/USD en temps réel, utilisation d'un taux de secours")
             
             self.eur_usd_rate = 1.08  # Approximatif EUR/USD
             self.last_update = datetime.now()
             return False
                 
         except Exception as e:
-            if show_debug:
-                st.error(f"Erreur générale lors de la récupération du taux EUR/USD: {e}")
+            reporter.message('error', f"Erreur générale lors de la récupération du taux EUR/USD: {e}")
             
             # Utiliser un taux de secours
             self.eur_usd_rate = 1.08  # Approximatif : 1 EUR = 1.08 USD
@@ -127,6 +131,52 @@ class CurrencyConverter:
         if date_key in self.historical_rates_cache:
             return self.historical_rates_cache[date_key]
         
+        # Un seul téléchargement par date pour les demandes concurrentes
+        rate = _fx_flight.do(('EURUSD=X', date_key), self._download_historical_eur_usd_rate, date)
+        if rate is not None:
+            # Mettre en cache
+            self.historical_rates_cache[date_key] = rate
+            return rate
+        
+        # Fallback : utiliser le taux actuel
+        if not self.eur_usd_rate:
+            self.get_eur_usd_rate()
+        
+        return self.eur_usd_rate if self.eur_usd_rate else 1.08
+
+    def get_historical_eur_usd_rates(self, dates) -> np.ndarray:
+        """
+        Taux EUR/USD historiques de plusieurs dates : les dates absentes du cache sont couvertes
+        par un seul téléchargement (taux de la date cotée la plus proche), puis mises en cache
+        comme avec get_historical_eur_usd_rate. Taux actuel à défaut de données.
+        """
+        keys = pd.DatetimeIndex(pd.to_datetime(dates)).normalize().strftime('%Y-%m-%d')
+        missing = sorted(set(keys) - self.historical_rates_cache.keys())
+        
+        if missing:
+            start = datetime.fromisoformat(missing[0]) - timedelta(days=7)
+            end = datetime.fromisoformat(missing[-1]) + timedelta(days=7)
+            try:
+                hist = YahooFinanceUtils.get_history('EURUSD=X', start=start, end=end)
+                if not hist.empty:
+                    closes = hist['Close'].groupby(hist.index.tz_localize(None).normalize()).last()
+                    nearest = closes.index.get_indexer(pd.DatetimeIndex(missing), method='nearest')
+                    for key, position in zip(missing, nearest):
+                        self.historical_rates_cache[key] = float(closes.iloc[position])
+            except Exception as e:
+                logger.warning(f"Erreur lors de la récupération des taux historiques EUR/USD "
+                               f"du {missing[0]} au {missing[-1]}: {e}")
+        
+        if any(key not in self.historical_rates_cache for key in keys) and not self.eur_usd_rate:
+            self.get_eur_usd_rate()
+        fallback = self.eur_usd_rate if self.eur_usd_rate else 1.08
+        return np.array([self.historical_rates_cache.get(key, fallback) for key in keys], dtype=float)
+
+    @staticmethod
+    def _download_historical_eur_usd_rate(date: datetime) -> Optional[float]:
+        """Télécharge le taux EUR/USD le plus proche d'une date (None si indisponible)"""
+        import yfinance as yf
+
         try:
             # Récupérer via Yahoo Finance
             ticker = yf.Ticker('EURUSD=X')
@@ -149,18 +199,12 @@ class CurrencyConverter:
                     closest_date = min(hist.index, key=lambda x: abs((x - target_date).days))
                     rate = hist.loc[closest_date, 'Close']
                 
-                # Mettre en cache
-                self.historical_rates_cache[date_key] = rate
                 return rate
             
         except Exception as e:
-            print(f"Erreur lors de la récupération du taux historique EUR/USD pour {date}: {e}")
+            logger.warning(f"Erreur lors de la récupération du taux historique EUR/USD pour {date}: {e}")
         
-        # Fallback : utiliser le taux actuel
-        if not self.eur_usd_rate:
-            self.get_eur_usd_rate()
-        
-        return self.eur_usd_rate if self.eur_usd_rate else 1.08
+        return None
 
     def convert_with_historical_rate(self, amount: float, from_currency: str, 
                                    to_currency: str, date: datetime) -> float:
@@ -200,7 +244,7 @@ class CurrencyConverter:
             self.get_eur_usd_rate()
         
         if not self.eur_usd_rate:
-            st.warning("⚠️ Taux EUR/USD non disponible, pas de conversion appliquée")
+            logger.warning("⚠️ Taux EUR/USD non disponible, pas de conversion appliquée")
             return eur_amount
         
         return eur_amount * self.eur_usd_rate
@@ -211,7 +255,7 @@ class CurrencyConverter:
             self.get_eur_usd_rate()
         
         if not self.eur_usd_rate:
-            st.warning("⚠️ Taux EUR/USD non disponible, pas de conversion appliquée")
+            logger.warning("⚠️ Taux EUR/USD non disponible, pas de conversion appliquée")
             return usd_amount
         
         return usd_amount / self.eur_usd_rate
@@ -225,7 +269,7 @@ class CurrencyConverter:
         elif from_currency in self.other_rates:
             return amount * self.other_rates[from_currency]
         else:
-            st.warning(f"⚠️ Devise {from_currency} non supportée, pas de conversion appliquée")
+            logger.warning(f"⚠️ Devise {from_currency} non supportée, pas de conversion appliquée")
             return amount
     
     def convert_price_to_both(self, price: float, original_currency: str) -> tuple:
@@ -277,8 +321,7 @@ class CurrencyConverter:
         """Version silencieuse de get_eur_usd_rate pour les vérifications internes"""
         try:
             # Essayer rapidement Yahoo Finance
-            ticker = yf.Ticker('EURUSD=X')
-            hist = ticker.history(period="1d")
+            hist = YahooFinanceUtils.get_history('EURUSD=X', period="1d")
             
             if not hist.empty:
                 self.eur_usd_rate = hist['Close'].iloc[-1]
@@ -286,8 +329,7 @@ class CurrencyConverter:
                 return True
             
             # Essayer l'API alternative
-            url = "https://api.exchangerate-api.com/v4/latest/EUR"
-            response = requests.get(url, timeout=5)
+            response = _fetch_exchange_rate_api(timeout=5)
             
             if response.status_code == 200:
                 data = response.json()
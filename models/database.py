@@ -1,8 +1,151 @@
+import os
 import sqlite3
+import threading
+import numpy as np
 import pandas as pd
 from datetime import datetime
 from typing import Optional, Tuple, List, Dict
 
+from models.corporate_actions import apply_pending_actions, record_splits
+from models.dividends import total_return_factors
+from models.records import Account, PricePoint, Product, ProductDimension, Transaction
+from utils.versioned_cache import VersionedCache
+
+# Colonnes cumulées de la table positions (hors clé et date de dernière transaction)
+POSITION_COLUMNS = ['quantity', 'invested_eur', 'invested_usd', 'buy_count',
+                    'buy_price_eur_sum', 'buy_price_usd_sum', 'dividends_eur', 'dividends_usd']
+
+# Types de transactions : un dividende (quantité = parts détenues, prix = montant par part,
+# frais = retenues) est un revenu qui ne modifie ni la quantité ni le montant investi
+TRANSACTION_TYPES = ['BUY', 'SELL', 'DIVIDEND']
+
+# Tolérance de comparaison entre positions maintenues et recalculées
+POSITION_TOLERANCE = 1e-6
+
+# Tables sources dont toute écriture incrémente la version des données
+# (les tables dérivées positions / lots ne sont pas suivies)
+VERSIONED_TABLES = ['platforms', 'accounts', 'financial_products', 'transactions',
+                    'price_history', 'exchange_rates', 'dividends', 'corporate_actions']
+
+# Colonnes des listes de transactions (détails du produit, du compte et de la plateforme)
+TRANSACTION_LIST_QUERY = '''
+    SELECT 
+        t.id,
+        t.account_id,
+        t.product_id,
+        t.transaction_type,
+        t.quantity,
+        t.price,
+        t.price_currency,
+        t.price_eur,
+        t.price_usd,
+        t.transaction_date,
+        t.fees,
+        t.fees_currency,
+        t.exchange_rate_eur_usd,
+        fp.symbol,
+        fp.name as product_name,
+        fp.product_type,
+        fp.currency as product_currency,
+        a.name as account_name,
+        p.name as platform_name
+    FROM transactions t
+    JOIN financial_products fp ON t.product_id = fp.id
+    JOIN accounts a ON t.account_id = a.id
+    JOIN platforms p ON a.platform_id = p.id
+'''
+
+# Filtres acceptés par query_transactions : clé -> (condition SQL, liste de valeurs ?).
+# Les bornes de dates portent sur le jour, incluses (une date seule couvre toute la journée)
+TRANSACTION_FILTERS = {
+    'transaction_ids': ('t.id IN ({})', True),
+    'account_ids': ('t.account_id IN ({})', True),
+    'product_ids': ('t.product_id IN ({})', True),
+    'symbols': ('fp.symbol IN ({})', True),
+    'transaction_types': ('t.transaction_type IN ({})', True),
+    'start_date': ('t.transaction_date >= date(?)', False),
+    'end_date': ("t.transaction_date < date(?, '+1 day')", False),
+}
+
+def _transaction_filter_clause(filters: Optional[Dict]) -> Tuple[str, list]:
+    """Clause WHERE (... AND ...) et paramètres des filtres de query_transactions"""
+    conditions = []
+    params = []
+    for key, value in (filters or {}).items():
+        if key not in TRANSACTION_FILTERS:
+            raise ValueError(f"Filtre de transactions inconnu : {key}")
+        if value is None:
+            continue
+        condition, is_list = TRANSACTION_FILTERS[key]
+        if is_list:
+            values = list(value)
+            if not values:
+                continue
+            conditions.append(condition.format(','.join('?' for _ in values)))
+            params.extend(int(v) if isinstance(v, (int, np.integer)) else v for v in values)
+        else:
+            conditions.append(condition)
+            params.append(str(value))
+    return (' WHERE ' + ' AND '.join(conditions)) if conditions else '', params
+
+def _add_transaction_amounts(df: pd.DataFrame):
+    """Convertit les dates et ajoute le montant total en EUR (net des retenues pour un dividende)"""
+    df['transaction_date'] = pd.to_datetime(df['transaction_date'])
+    fees = df['fees'].where(df['transaction_type'] != 'DIVIDEND', -df['fees'])
+    df['total_amount'] = df['quantity'] * df['price_eur'] + fees
+
+# Compteur d'écritures par base, propre au processus, et dernière version lue avec son jeton :
+# tant que le jeton ne change pas, la version des données est connue sans requête SQL
+_write_counters: Dict[str, int] = {}
+_version_memo: Dict[str, Tuple[Tuple[int, int, int], int]] = {}
+_write_counters_lock = threading.Lock()
+
+# Dimension produits par base, partagée entre toutes les sessions du processus
+_product_dimension_cache = VersionedCache(max_entries=8)
+
+def _position_delta_columns(row: str) -> Dict[str, str]:
+    """
+    Expressions SQL de la contribution d'une ligne de transactions (NEW, OLD ou t)
+    aux colonnes cumulées de sa position
+    """
+    # Les frais sont stockés en EUR : conversion USD au taux de la transaction
+    fees_eur_to_usd = f"COALESCE({row}.exchange_rate_eur_usd, {row}.price_usd / NULLIF({row}.price_eur, 0), 1)"
+    return {
+        'quantity': f"""CASE WHEN {row}.transaction_type = 'BUY' THEN {row}.quantity
+                             WHEN {row}.transaction_type = 'SELL' THEN -{row}.quantity
+                             ELSE 0 END""",
+        'invested_eur': f"""CASE WHEN {row}.transaction_type = 'BUY' THEN {row}.quantity * {row}.price_eur + COALESCE({row}.fees, 0)
+                                 WHEN {row}.transaction_type = 'SELL' THEN -{row}.quantity * {row}.price_eur - COALESCE({row}.fees, 0)
+                                 ELSE 0 END""",
+        'invested_usd': f"""CASE WHEN {row}.transaction_type = 'BUY' THEN {row}.quantity * {row}.price_usd + COALESCE({row}.fees, 0) * {fees_eur_to_usd}
+                                 WHEN {row}.transaction_type = 'SELL' THEN -{row}.quantity * {row}.price_usd - COALESCE({row}.fees, 0) * {fees_eur_to_usd}
+                                 ELSE 0 END""",
+        'buy_count': f"CASE WHEN {row}.transaction_type = 'BUY' THEN 1 ELSE 0 END",
+        'buy_price_eur_sum': f"CASE WHEN {row}.transaction_type = 'BUY' THEN {row}.price_eur ELSE 0 END",
+        'buy_price_usd_sum': f"CASE WHEN {row}.transaction_type = 'BUY' THEN {row}.price_usd ELSE 0 END",
+        'dividends_eur': f"""CASE WHEN {row}.transaction_type = 'DIVIDEND' THEN {row}.quantity * {row}.price_eur - COALESCE({row}.fees, 0)
+                                  ELSE 0 END""",
+        'dividends_usd': f"""CASE WHEN {row}.transaction_type = 'DIVIDEND' THEN {row}.quantity * {row}.price_usd - COALESCE({row}.fees, 0) * {fees_eur_to_usd}
+                                  ELSE 0 END""",
+    }
+
+# Colonnes dans l'ordre de la requête de recalcul (les colonnes ajoutées par migration
+# sont en fin de table : l'insertion doit être nommée)
+_POSITIONS_INSERT_COLUMNS = ', '.join(['account_id', 'product_id'] + POSITION_COLUMNS + ['last_transaction_date'])
+
+def _positions_recompute_query() -> str:
+    """Requête d'agrégation complète des transactions au format de la table positions"""
+    deltas = _position_delta_columns('t')
+    sums = ',\n'.join(f"SUM({deltas[column]}) AS {column}" for column in POSITION_COLUMNS)
+    return f'''
+        SELECT t.account_id, t.product_id,
+               {sums},
+               MAX(t.transaction_date) AS last_transaction_date
+        FROM transactions t
+        WHERE t.account_id IS NOT NULL AND t.product_id IS NOT NULL
+        GROUP BY t.account_id, t.product_id
+    '''
+
 class DatabaseManager:
     """Gestionnaire de la base de données SQLite"""
     
@@ -51,6 +194,7 @@ class DatabaseManager:
                 industry TEXT,
                 exchange TEXT,
                 country TEXT,
+                is_benchmark INTEGER DEFAULT 0,
                 last_updated TIMESTAMP,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             )
@@ -78,7 +222,7 @@ class DatabaseManager:
             )
         ''')
         
-        # Table des prix historiques avec EUR et USD
+        # Table des prix historiques avec EUR et USD (et prix total return, dividendes réinvestis)
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS price_history (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -86,6 +230,9 @@ class DatabaseManager:
                 price REAL NOT NULL,
                 price_eur REAL NOT NULL,
                 price_usd REAL NOT NULL,
+                tr_price REAL,
+                tr_price_eur REAL,
+                tr_price_usd REAL,
                 date DATE NOT NULL,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 FOREIGN KEY (product_id) REFERENCES financial_products (id),
@@ -93,6 +240,143 @@ class DatabaseManager:
             )
         ''')
         
+        # Dividendes détachés par produit (montant par part en devise du produit)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS dividends (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER NOT NULL,
+                ex_date DATE NOT NULL,
+                amount REAL NOT NULL,
+                amount_eur REAL,
+                amount_usd REAL,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (product_id) REFERENCES financial_products (id),
+                UNIQUE(product_id, ex_date)
+            )
+        ''')
+        
+        # Opérations sur titres (fractionnements) et trace des transactions ajustées
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS corporate_actions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER NOT NULL,
+                action_type TEXT NOT NULL,
+                ex_date DATE NOT NULL,
+                ratio REAL NOT NULL,
+                source TEXT NOT NULL DEFAULT 'manual',
+                detected_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                applied_at TIMESTAMP,
+                transactions_adjusted INTEGER,
+                prices_adjusted INTEGER,
+                FOREIGN KEY (product_id) REFERENCES financial_products (id),
+                UNIQUE(product_id, action_type, ex_date)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS corporate_action_audit (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                action_id INTEGER NOT NULL,
+                transaction_id INTEGER NOT NULL,
+                old_quantity REAL NOT NULL,
+                old_price REAL NOT NULL,
+                old_price_eur REAL,
+                old_price_usd REAL,
+                FOREIGN KEY (action_id) REFERENCES corporate_actions (id)
+            )
+        ''')
+        
+        # Alertes de prix (seuils, variations, baisse depuis un plus haut, poids) et déclenchements
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alerts (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                product_id INTEGER NOT NULL,
+                alert_type TEXT NOT NULL,
+                threshold REAL NOT NULL,
+                window_days INTEGER,
+                active INTEGER NOT NULL DEFAULT 1,
+                is_triggered INTEGER NOT NULL DEFAULT 0,
+                note TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (product_id) REFERENCES financial_products (id)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS alert_events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                alert_id INTEGER NOT NULL,
+                trigger_date DATE NOT NULL,
+                value REAL NOT NULL,
+                threshold REAL NOT NULL,
+                fired_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                acknowledged_at TIMESTAMP,
+                FOREIGN KEY (alert_id) REFERENCES alerts (id),
+                UNIQUE(alert_id, trigger_date)
+            )
+        ''')
+        
+        # Table des positions par (compte, produit), maintenue par triggers sur transactions
+        cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name = 'positions'")
+        positions_exists = cursor.fetchone() is not None
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS positions (
+                account_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                quantity REAL NOT NULL DEFAULT 0,
+                invested_eur REAL NOT NULL DEFAULT 0,
+                invested_usd REAL NOT NULL DEFAULT 0,
+                buy_count INTEGER NOT NULL DEFAULT 0,
+                buy_price_eur_sum REAL NOT NULL DEFAULT 0,
+                buy_price_usd_sum REAL NOT NULL DEFAULT 0,
+                dividends_eur REAL NOT NULL DEFAULT 0,
+                dividends_usd REAL NOT NULL DEFAULT 0,
+                last_transaction_date TIMESTAMP,
+                PRIMARY KEY (account_id, product_id),
+                FOREIGN KEY (account_id) REFERENCES accounts (id),
+                FOREIGN KEY (product_id) REFERENCES financial_products (id)
+            )
+        ''')
+        
+        # Comptabilité par lots (FIFO / PRU) : curseur, lots ouverts et plus-values réalisées
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS lot_state (
+                account_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                method TEXT NOT NULL,
+                last_transaction_date TIMESTAMP NOT NULL,
+                last_transaction_id INTEGER NOT NULL,
+                PRIMARY KEY (account_id, product_id, method)
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS open_lots (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                account_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                method TEXT NOT NULL,
+                lot_order INTEGER NOT NULL,
+                acquired_date TIMESTAMP NOT NULL,
+                quantity REAL NOT NULL,
+                cost_eur REAL NOT NULL
+            )
+        ''')
+        
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS realized_pnl (
+                account_id INTEGER NOT NULL,
+                product_id INTEGER NOT NULL,
+                method TEXT NOT NULL,
+                year INTEGER NOT NULL,
+                realized_eur REAL NOT NULL DEFAULT 0,
+                proceeds_eur REAL NOT NULL DEFAULT 0,
+                cost_eur REAL NOT NULL DEFAULT 0,
+                PRIMARY KEY (account_id, product_id, method, year)
+            )
+        ''')
+        
         # Table pour stocker les taux de change historiques
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS exchange_rates (
@@ -106,9 +390,29 @@ class DatabaseManager:
             )
         ''')
         
+        # Métadonnées de l'application (version des données pour les caches de calcul)
+        cursor.execute('''
+            CREATE TABLE IF NOT EXISTS app_meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            )
+        ''')
+        cursor.execute("INSERT OR IGNORE INTO app_meta (key, value) VALUES ('data_version', 0)")
+        
         # Mise à jour des tables existantes pour ajouter les nouvelles colonnes
         self._update_existing_tables(cursor)
         
+        # Index pour les agrégats et filtres du portefeuille
+        self._create_indexes(cursor)
+        
+        # Triggers de maintenance des positions et d'invalidation des lots
+        self._create_position_triggers(cursor)
+        self._create_lot_triggers(cursor)
+        self._create_data_version_triggers(cursor)
+        if not positions_exists:
+            # Première création : initialiser les positions depuis l'historique existant
+            cursor.execute(f"INSERT INTO positions ({_POSITIONS_INSERT_COLUMNS}) {_positions_recompute_query()}")
+        
         conn.commit()
         conn.close()
     
@@ -124,6 +428,7 @@ class DatabaseManager:
             ('industry', 'TEXT'),
             ('exchange', 'TEXT'),
             ('country', 'TEXT'),
+            ('is_benchmark', 'INTEGER DEFAULT 0'),
             ('created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
         ]
         
@@ -153,6 +458,9 @@ class DatabaseManager:
         new_columns_history = [
             ('price_eur', 'REAL'),
             ('price_usd', 'REAL'),
+            ('tr_price', 'REAL'),
+            ('tr_price_eur', 'REAL'),
+            ('tr_price_usd', 'REAL'),
             ('created_at', 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP')
         ]
         
@@ -161,6 +469,221 @@ class DatabaseManager:
                 cursor.execute(f'ALTER TABLE price_history ADD COLUMN {column_name} {column_type}')
             except sqlite3.OperationalError:
                 pass  # Colonne existe déjà
+        
+        # Colonnes à ajouter à positions (aucun dividende n'existait avant leur création)
+        for column_name in ['dividends_eur', 'dividends_usd']:
+            try:
+                cursor.execute(f'ALTER TABLE positions ADD COLUMN {column_name} REAL NOT NULL DEFAULT 0')
+            except sqlite3.OperationalError:
+                pass  # Colonne existe déjà
+    
+    def _create_indexes(self, cursor):
+        """Crée les index utilisés par les requêtes d'analyse du portefeuille"""
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_product_account ON transactions (product_id, account_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_position_date ON transactions (account_id, product_id, transaction_date, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (transaction_date, id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_financial_products_type ON financial_products (product_type)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_open_lots_position ON open_lots (method, account_id, product_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alerts_active_product ON alerts (active, product_id)')
+        cursor.execute('CREATE INDEX IF NOT EXISTS idx_alert_events_open ON alert_events (acknowledged_at, fired_at)')
+    
+    def _create_position_triggers(self, cursor):
+        """(Re)crée les triggers qui répercutent chaque écriture de transactions sur la table positions"""
+        def apply_delta(row: str, sign: str) -> str:
+            deltas = _position_delta_columns(row)
+            assignments = ',\n'.join(f"{column} = {column} {sign} ({deltas[column]})" for column in POSITION_COLUMNS)
+            return f'''
+                UPDATE positions SET {assignments}
+                WHERE account_id = {row}.account_id AND product_id = {row}.product_id;
+            '''
+        
+        def refresh_last_date(row: str) -> str:
+            # Date de dernière transaction recalculée via l'index (compte, produit) ;
+            # une position sans transaction restante est supprimée
+            return f'''
+                UPDATE positions SET last_transaction_date = (
+                    SELECT MAX(transaction_date) FROM transactions
+                    WHERE account_id = {row}.account_id AND product_id = {row}.product_id
+                )
+                WHERE account_id = {row}.account_id AND product_id = {row}.product_id;
+                DELETE FROM positions
+                WHERE account_id = {row}.account_id AND product_id = {row}.product_id
+                  AND last_transaction_date IS NULL;
+            '''
+        
+        insert_position = '''
+            INSERT OR IGNORE INTO positions (account_id, product_id) VALUES (NEW.account_id, NEW.product_id);
+        '''
+        
+        for trigger in ['trg_positions_insert', 'trg_positions_delete', 'trg_positions_update']:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        
+        cursor.execute(f'''
+            CREATE TRIGGER trg_positions_insert AFTER INSERT ON transactions
+            WHEN NEW.account_id IS NOT NULL AND NEW.product_id IS NOT NULL
+            BEGIN
+                {insert_position}
+                {apply_delta('NEW', '+')}
+                UPDATE positions SET last_transaction_date = MAX(COALESCE(last_transaction_date, NEW.transaction_date),
+                                                                 NEW.transaction_date)
+                WHERE account_id = NEW.account_id AND product_id = NEW.product_id;
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER trg_positions_delete AFTER DELETE ON transactions
+            BEGIN
+                {apply_delta('OLD', '-')}
+                {refresh_last_date('OLD')}
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER trg_positions_update AFTER UPDATE ON transactions
+            BEGIN
+                {apply_delta('OLD', '-')}
+                {refresh_last_date('OLD')}
+                {insert_position}
+                {apply_delta('NEW', '+')}
+                {refresh_last_date('NEW')}
+            END
+        ''')
+    
+    def _create_lot_triggers(self, cursor):
+        """
+        (Re)crée les triggers qui invalident l'état des lots d'un couple (compte, produit)
+        quand son historique change ailleurs qu'en fin de chronologie
+        """
+        def invalidate(row: str, condition: str = '') -> str:
+            pair = f"account_id = {row}.account_id AND product_id = {row}.product_id"
+            stale = f"SELECT method FROM lot_state WHERE {pair} {condition}"
+            return f'''
+                DELETE FROM open_lots WHERE {pair} AND method IN ({stale});
+                DELETE FROM realized_pnl WHERE {pair} AND method IN ({stale});
+                DELETE FROM lot_state WHERE {pair} {condition};
+            '''
+        
+        for trigger in ['trg_lots_insert', 'trg_lots_delete', 'trg_lots_update']:
+            cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+        
+        # Une insertion antérieure au dernier événement appliqué impose un recalcul
+        cursor.execute(f'''
+            CREATE TRIGGER trg_lots_insert AFTER INSERT ON transactions
+            BEGIN
+                {invalidate('NEW', 'AND last_transaction_date > NEW.transaction_date')}
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER trg_lots_delete AFTER DELETE ON transactions
+            BEGIN
+                {invalidate('OLD')}
+            END
+        ''')
+        
+        cursor.execute(f'''
+            CREATE TRIGGER trg_lots_update AFTER UPDATE ON transactions
+            BEGIN
+                {invalidate('OLD')}
+                {invalidate('NEW')}
+            END
+        ''')
+    
+    def _create_data_version_triggers(self, cursor):
+        """(Re)crée les triggers qui incrémentent la version des données à chaque écriture"""
+        bump = "UPDATE app_meta SET value = value + 1 WHERE key = 'data_version';"
+        
+        for table in VERSIONED_TABLES:
+            for operation in ['INSERT', 'UPDATE', 'DELETE']:
+                trigger = f"trg_data_version_{table}_{operation.lower()}"
+                cursor.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+                cursor.execute(f'''
+                    CREATE TRIGGER {trigger} AFTER {operation} ON {table}
+                    BEGIN
+                        {bump}
+                    END
+                ''')
+    
+    def get_data_version(self) -> int:
+        """
+        Version courante des données, incrémentée à chaque écriture sur les tables sources.
+        Relue en base seulement si le jeton de changement a évolué depuis la dernière lecture.
+        """
+        token = self.get_change_token()
+        memo = _version_memo.get(self.db_path)
+        if memo is not None and memo[0] == token:
+            return memo[1]
+        
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute("SELECT value FROM app_meta WHERE key = 'data_version'").fetchone()
+        conn.close()
+        version = row[0] if row else 0
+        _version_memo[self.db_path] = (token, version)
+        return version
+    
+    def mark_written(self):
+        """Signale une écriture validée : invalide les lectures mises en cache dans le processus"""
+        with _write_counters_lock:
+            _write_counters[self.db_path] = _write_counters.get(self.db_path, 0) + 1
+    
+    def get_change_token(self) -> Tuple[int, int, int]:
+        """
+        Jeton de changement obtenu sans requête SQL : compteur d'écritures du processus,
+        date de modification et taille du fichier (écritures faites par un autre processus)
+        """
+        try:
+            stat = os.stat(self.db_path)
+            file_state = (stat.st_mtime_ns, stat.st_size)
+        except OSError:
+            file_state = (0, 0)
+        return (_write_counters.get(self.db_path, 0),) + file_state
+    
+    def rebuild_positions(self) -> Dict:
+        """
+        Recalcule entièrement la table positions depuis les transactions.
+        Compare d'abord l'état maintenu par les triggers au recalcul et retourne
+        le nombre de positions et la liste des écarts trouvés.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        
+        try:
+            cursor.execute(f"CREATE TEMP TABLE positions_recomputed AS {_positions_recompute_query()}")
+            
+            columns = ', '.join(f"r.{column}, s.{column}" for column in POSITION_COLUMNS)
+            differences = ' OR '.join(
+                f"ABS(COALESCE(r.{column}, 0) - COALESCE(s.{column}, 0)) > {POSITION_TOLERANCE}"
+                for column in POSITION_COLUMNS
+            )
+            # Jointure complète (positions manquantes d'un côté ou de l'autre)
+            cursor.execute(f'''
+                SELECT keys.account_id, keys.product_id, {columns},
+                       r.last_transaction_date, s.last_transaction_date
+                FROM (SELECT account_id, product_id FROM positions_recomputed
+                      UNION SELECT account_id, product_id FROM positions) keys
+                LEFT JOIN positions_recomputed r ON r.account_id = keys.account_id AND r.product_id = keys.product_id
+                LEFT JOIN positions s ON s.account_id = keys.account_id AND s.product_id = keys.product_id
+                WHERE r.account_id IS NULL OR s.account_id IS NULL OR {differences}
+                   OR r.last_transaction_date IS NOT s.last_transaction_date
+            ''')
+            mismatches = [
+                {'account_id': row[0], 'product_id': row[1],
+                 'expected': dict(zip(POSITION_COLUMNS + ['last_transaction_date'], row[2:-2:2] + (row[-2],))),
+                 'stored': dict(zip(POSITION_COLUMNS + ['last_transaction_date'], row[3:-2:2] + (row[-1],)))}
+                for row in cursor.fetchall()
+            ]
+            
+            cursor.execute("DELETE FROM positions")
+            cursor.execute(f"INSERT INTO positions ({_POSITIONS_INSERT_COLUMNS}) "
+                           f"SELECT {_POSITIONS_INSERT_COLUMNS} FROM positions_recomputed")
+            positions_count = cursor.rowcount
+            cursor.execute("DROP TABLE positions_recomputed")
+            conn.commit()
+            self.mark_written()
+        finally:
+            conn.close()
+        
+        return {'positions': positions_count, 'mismatches': mismatches}
     
     # Méthodes pour les plateformes
     def add_platform(self, name: str, description: str = "") -> bool:
@@ -171,6 +694,7 @@ class DatabaseManager:
             cursor.execute("INSERT INTO platforms (name, description) VALUES (?, ?)", 
                          (name, description))
             conn.commit()
+            self.mark_written()
             return True
         except sqlite3.IntegrityError:
             return False
@@ -185,6 +709,7 @@ class DatabaseManager:
             cursor.execute("UPDATE platforms SET name = ?, description = ? WHERE id = ?",
                          (name, description, platform_id))
             conn.commit()
+            self.mark_written()
             return cursor.rowcount > 0
         except sqlite3.IntegrityError:
             return False
@@ -207,6 +732,7 @@ class DatabaseManager:
         try:
             cursor.execute("DELETE FROM platforms WHERE id = ?", (platform_id,))
             conn.commit()
+            self.mark_written()
             conn.close()
             return True, "Plateforme supprimée avec succès"
         except Exception as e:
@@ -228,6 +754,7 @@ class DatabaseManager:
         cursor.execute("INSERT INTO accounts (platform_id, name, account_type) VALUES (?, ?, ?)",
                       (platform_id, name, account_type))
         conn.commit()
+        self.mark_written()
         conn.close()
         return True
     
@@ -238,6 +765,7 @@ class DatabaseManager:
         cursor.execute("UPDATE accounts SET platform_id = ?, name = ?, account_type = ? WHERE id = ?",
                       (platform_id, name, account_type, account_id))
         conn.commit()
+        self.mark_written()
         success = cursor.rowcount > 0
         conn.close()
         return success
@@ -258,6 +786,7 @@ class DatabaseManager:
         try:
             cursor.execute("DELETE FROM accounts WHERE id = ?", (account_id,))
             conn.commit()
+            self.mark_written()
             conn.close()
             return True, "Compte supprimé avec succès"
         except Exception as e:
@@ -277,6 +806,19 @@ class DatabaseManager:
         conn.close()
         return df
     
+    def get_account_records(self) -> List[Account]:
+        """Comptes avec leur plateforme, sous forme d'enregistrements Account"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = Account.row_factory
+        accounts = conn.execute('''
+            SELECT a.id, a.name, a.account_type, a.platform_id, p.name as platform_name
+            FROM accounts a
+            JOIN platforms p ON a.platform_id = p.id
+            ORDER BY p.name, a.name
+        ''').fetchall()
+        conn.close()
+        return accounts
+    
     # Méthodes pour les produits financiers
     def add_financial_product(self, product_info: Dict) -> Tuple[bool, str]:
         """Ajoute un nouveau produit financier avec informations complètes"""
@@ -286,18 +828,19 @@ class DatabaseManager:
             cursor.execute('''INSERT INTO financial_products 
                             (symbol, name, product_type, currency, current_price, 
                              current_price_eur, current_price_usd, market_cap, sector, 
-                             industry, exchange, country, last_updated) 
-                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
+                             industry, exchange, country, is_benchmark, last_updated) 
+                            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''',
                           (product_info['symbol'], product_info['name'], 
                            product_info['product_type'], product_info['currency'],
                            product_info['current_price'], product_info['current_price_eur'],
                            product_info['current_price_usd'], product_info.get('market_cap'),
                            product_info.get('sector'), product_info.get('industry'),
                            product_info.get('exchange'), product_info.get('country'),
-                           datetime.now()))
+                           int(product_info.get('is_benchmark', 0)), datetime.now()))
             
             product_id = cursor.lastrowid
             conn.commit()
+            self.mark_written()
             conn.close()
             return True, f"Produit '{product_info['symbol']}' ajouté avec succès ! Prix actuel: {product_info['current_price']:.2f} {product_info['currency']}"
         except sqlite3.IntegrityError:
@@ -318,6 +861,7 @@ class DatabaseManager:
                             WHERE id = ?''',
                           (symbol, name, product_type, currency, product_id))
             conn.commit()
+            self.mark_written()
             return cursor.rowcount > 0
         except sqlite3.IntegrityError:
             return False
@@ -338,36 +882,84 @@ class DatabaseManager:
             return False, f"Impossible de supprimer : {transaction_count} transaction(s) utilisent ce produit"
         
         try:
-            # Supprimer l'historique des prix
+            # Supprimer l'historique des prix et des dividendes
             cursor.execute("DELETE FROM price_history WHERE product_id = ?", (product_id,))
+            cursor.execute("DELETE FROM dividends WHERE product_id = ?", (product_id,))
+            cursor.execute("DELETE FROM corporate_actions WHERE product_id = ?", (product_id,))
+            cursor.execute("DELETE FROM alert_events WHERE alert_id IN (SELECT id FROM alerts WHERE product_id = ?)",
+                           (product_id,))
+            cursor.execute("DELETE FROM alerts WHERE product_id = ?", (product_id,))
             # Supprimer le produit
             cursor.execute("DELETE FROM financial_products WHERE id = ?", (product_id,))
             conn.commit()
+            self.mark_written()
             conn.close()
             return True, "Produit supprimé avec succès"
         except Exception as e:
             conn.close()
             return False, f"Erreur lors de la suppression : {e}"
     
-    def get_financial_products(self) -> pd.DataFrame:
-        """Récupère tous les produits financiers"""
+    def get_financial_products(self, include_benchmarks: bool = False) -> pd.DataFrame:
+        """Récupère les produits financiers (les indices de référence seulement si demandés)"""
         conn = sqlite3.connect(self.db_path)
-        df = pd.read_sql_query("SELECT * FROM financial_products ORDER BY symbol", conn)
+        where = "" if include_benchmarks else "WHERE COALESCE(is_benchmark, 0) = 0"
+        df = pd.read_sql_query(f"SELECT * FROM financial_products {where} ORDER BY symbol", conn)
         conn.close()
         return df
     
-    def get_financial_product_by_symbol(self, symbol: str) -> Optional[pd.Series]:
-        """Récupère un produit financier par son symbole"""
+    def get_product_records(self, include_benchmarks: bool = False) -> List[Product]:
+        """Produits financiers sous forme d'enregistrements Product (mêmes règles que get_financial_products)"""
         conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("SELECT * FROM financial_products WHERE symbol = ?", (symbol,))
-        result = cursor.fetchone()
+        conn.row_factory = Product.row_factory
+        where = "" if include_benchmarks else "WHERE COALESCE(is_benchmark, 0) = 0"
+        products = conn.execute(f"SELECT * FROM financial_products {where} ORDER BY symbol").fetchall()
         conn.close()
-        
-        if result:
-            columns = [desc[0] for desc in cursor.description]
-            return pd.Series(result, index=columns)
-        return None
+        return products
+    
+    def get_benchmarks(self) -> pd.DataFrame:
+        """Récupère les indices de référence (suivis pour comparaison, jamais détenus)"""
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query('''
+            SELECT fp.*, COUNT(ph.id) AS history_count, MIN(ph.date) AS first_date, MAX(ph.date) AS last_date
+            FROM financial_products fp
+            LEFT JOIN price_history ph ON ph.product_id = fp.id
+            WHERE fp.is_benchmark = 1
+            GROUP BY fp.id
+            ORDER BY fp.symbol
+        ''', conn)
+        conn.close()
+        return df
+    
+    def get_financial_product(self, product_id: int) -> Optional[Product]:
+        """Récupère un produit financier par son ID (lecture par clé primaire)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = Product.row_factory
+        product = conn.execute("SELECT * FROM financial_products WHERE id = ?", (int(product_id),)).fetchone()
+        conn.close()
+        return product
+    
+    def get_financial_product_by_symbol(self, symbol: str) -> Optional[Product]:
+        """Récupère un produit financier par son symbole (index unique)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = Product.row_factory
+        product = conn.execute("SELECT * FROM financial_products WHERE symbol = ?", (symbol,)).fetchone()
+        conn.close()
+        return product
+    
+    def get_product_dimension(self) -> ProductDimension:
+        """
+        Tous les produits (indices de référence compris) indexés par id et par symbole,
+        rechargés seulement quand la version des données change
+        """
+        return _product_dimension_cache.get_or_compute(self.db_path, self.get_data_version(),
+                                                       self._load_product_dimension)
+    
+    def _load_product_dimension(self) -> ProductDimension:
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = Product.row_factory
+        products = conn.execute("SELECT * FROM financial_products").fetchall()
+        conn.close()
+        return ProductDimension(products)
     
     def update_product_price(self, symbol: str, current_price: float, 
                            price_eur: float, price_usd: float) -> bool:
@@ -380,8 +972,222 @@ class DatabaseManager:
                       (current_price, price_eur, price_usd, datetime.now(), symbol))
         success = cursor.rowcount > 0
         conn.commit()
+        self.mark_written()
         conn.close()
         return success
+
+    # Méthodes pour l'historique des prix et des dividendes
+    def save_price_history(self, product_id: int, price_rows: List[Tuple], dividend_rows: List[Tuple],
+                           split_rows: List[Tuple] = (), replace: bool = False) -> List[Dict]:
+        """
+        Enregistre en une seule transaction l'historique d'un produit :
+        price_rows = (date, prix, prix EUR, prix USD), dividend_rows = (date de détachement,
+        montant, montant EUR, montant USD), split_rows = (date d'effet, ratio).
+        Les fractionnements nouveaux sont appliqués aux données déjà stockées avant l'écriture
+        des prix téléchargés (déjà ajustés par le fournisseur). Avec replace, l'historique
+        existant est effacé. Les prix total return du produit sont ensuite recalculés.
+        Retourne les opérations appliquées.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            record_splits(cursor, product_id, split_rows)
+            applied = apply_pending_actions(cursor, product_id)
+            if replace:
+                cursor.execute("DELETE FROM price_history WHERE product_id = ?", (product_id,))
+                cursor.execute("DELETE FROM dividends WHERE product_id = ?", (product_id,))
+            cursor.executemany('''INSERT OR REPLACE INTO price_history
+                                (product_id, date, price, price_eur, price_usd)
+                                VALUES (?, ?, ?, ?, ?)''',
+                               [(product_id,) + tuple(row) for row in price_rows])
+            cursor.executemany('''INSERT OR REPLACE INTO dividends
+                                (product_id, ex_date, amount, amount_eur, amount_usd)
+                                VALUES (?, ?, ?, ?, ?)''',
+                               [(product_id,) + tuple(row) for row in dividend_rows])
+            # Sans remplacement ni fractionnement, seules les cotations à partir de la plus
+            # ancienne date écrite changent de facteur
+            changed_dates = [row[0] for row in price_rows] + [row[0] for row in dividend_rows]
+            if replace or applied:
+                self._refresh_total_return_prices(cursor, product_id)
+            elif changed_dates:
+                self._refresh_total_return_prices(cursor, product_id, since=min(changed_dates))
+            conn.commit()
+            self.mark_written()
+        finally:
+            conn.close()
+        return applied
+
+    def refresh_total_return_prices(self, product_ids: Optional[List[int]] = None):
+        """Recalcule les prix total return (tous les produits par défaut)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            if product_ids is None:
+                product_ids = [row[0] for row in cursor.execute("SELECT DISTINCT product_id FROM price_history")]
+            for product_id in product_ids:
+                self._refresh_total_return_prices(cursor, product_id)
+            conn.commit()
+            self.mark_written()
+        finally:
+            conn.close()
+
+    def _refresh_total_return_prices(self, cursor, product_id: int, since: Optional[str] = None):
+        """
+        Prix total return d'un produit : une lecture, un calcul vectorisé, une écriture groupée.
+        Avec since (date AAAA-MM-JJ), seules les cotations à partir de since sont recalculées, en
+        repartant du facteur de la cotation précédente. Seules les lignes modifiées sont réécrites.
+        """
+        after, base_factor = None, 1.0
+        if since is not None:
+            previous = cursor.execute('''SELECT date, price, tr_price FROM price_history
+                                         WHERE product_id = ? AND date < ?
+                                         ORDER BY date DESC LIMIT 1''', (product_id, since)).fetchone()
+            # Sans facteur connu pour la cotation précédente, tout l'historique est recalculé
+            if previous is not None and previous[1] and previous[2] is not None:
+                after, base_factor = previous[0], previous[2] / previous[1]
+
+        history = cursor.execute('''SELECT id, date, price, price_eur, price_usd, tr_price, tr_price_eur, tr_price_usd
+                                    FROM price_history WHERE product_id = ? AND date > COALESCE(?, '')
+                                    ORDER BY date''', (product_id, after)).fetchall()
+        if not history:
+            return
+        # Dividendes détachés après la cotation précédente : ceux d'avant sont déjà dans base_factor
+        dividends = cursor.execute('''SELECT ex_date, amount FROM dividends
+                                      WHERE product_id = ? AND ex_date > COALESCE(?, '')
+                                      ORDER BY ex_date''', (product_id, after)).fetchall()
+
+        ids, dates, prices, prices_eur, prices_usd, *stored = zip(*history)
+        dates = np.array(dates, dtype=str)
+        dividend_dates, dividend_amounts = zip(*dividends) if dividends else ((), ())
+        dividend_dates = np.array(dividend_dates, dtype=str)
+        if after is not None and len(dividend_dates):
+            # Détachés entre la cotation précédente et since : rattachés à la première cotation recalculée
+            dividend_dates = np.where(dividend_dates < dates[0], dates[0], dividend_dates)
+        factors = base_factor * total_return_factors(dates, np.array(prices, dtype=float),
+                                                     dividend_dates, np.array(dividend_amounts, dtype=float))
+
+        computed = np.column_stack([np.array(column, dtype=float) * factors
+                                    for column in (prices, prices_eur, prices_usd)])
+        stored = np.array(stored, dtype=float).T
+        changed = ~np.all(np.isclose(computed, stored, rtol=1e-12, atol=0.0)
+                          | (np.isnan(computed) & np.isnan(stored)), axis=1)
+        cursor.executemany('''UPDATE price_history SET tr_price = ?, tr_price_eur = ?, tr_price_usd = ?
+                              WHERE id = ?''',
+                           [tuple(values) + (row_id,)
+                            for values, row_id in zip(computed[changed].tolist(), np.array(ids)[changed].tolist())])
+
+    # Méthodes pour les opérations sur titres
+    def add_split(self, product_id: int, ex_date: datetime, ratio: float) -> Tuple[bool, str]:
+        """Enregistre un fractionnement saisi manuellement et l'applique dans la même transaction"""
+        if ratio <= 0 or ratio == 1:
+            return False, "Le ratio doit être positif et différent de 1"
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            if not record_splits(cursor, product_id, [(ex_date.strftime('%Y-%m-%d'), float(ratio))], source='manual'):
+                return False, "Ce fractionnement est déjà enregistré"
+            applied = apply_pending_actions(cursor, product_id)
+            self._refresh_total_return_prices(cursor, product_id)
+            conn.commit()
+            self.mark_written()
+        finally:
+            conn.close()
+        
+        adjusted = sum(action['transactions_adjusted'] for action in applied)
+        prices = sum(action['prices_adjusted'] for action in applied)
+        return True, f"Fractionnement appliqué : {adjusted} transaction(s) et {prices} prix ajustés"
+    
+    def apply_corporate_actions(self) -> List[Dict]:
+        """Applique en une transaction toutes les opérations en attente (sans effet si aucune)"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            applied = apply_pending_actions(cursor)
+            for product_id in {action['product_id'] for action in applied}:
+                self._refresh_total_return_prices(cursor, product_id)
+            conn.commit()
+            self.mark_written()
+        finally:
+            conn.close()
+        return applied
+    
+    def get_corporate_actions(self) -> pd.DataFrame:
+        """Opérations sur titres enregistrées, avec leur état d'application"""
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query('''
+            SELECT ca.*, fp.symbol, fp.name
+            FROM corporate_actions ca
+            JOIN financial_products fp ON ca.product_id = fp.id
+            ORDER BY ca.ex_date DESC
+        ''', conn)
+        conn.close()
+        return df
+    
+    def get_corporate_action_audit(self, action_id: int) -> pd.DataFrame:
+        """Valeurs d'origine des transactions ajustées par une opération, avec leurs valeurs actuelles"""
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query('''
+            SELECT au.transaction_id, t.transaction_date, t.transaction_type,
+                   au.old_quantity, t.quantity AS new_quantity,
+                   au.old_price, t.price AS new_price, t.price_currency
+            FROM corporate_action_audit au
+            LEFT JOIN transactions t ON au.transaction_id = t.id
+            WHERE au.action_id = ?
+            ORDER BY t.transaction_date
+        ''', conn, params=(action_id,))
+        conn.close()
+        return df
+
+    def get_dividends(self, product_id: Optional[int] = None) -> pd.DataFrame:
+        """Dividendes détachés (tous les produits, ou un seul)"""
+        conn = sqlite3.connect(self.db_path)
+        where = "WHERE d.product_id = ?" if product_id is not None else ""
+        params = (product_id,) if product_id is not None else ()
+        df = pd.read_sql_query(f'''
+            SELECT d.product_id, fp.symbol, fp.name, fp.currency, d.ex_date,
+                   d.amount, d.amount_eur, d.amount_usd
+            FROM dividends d
+            JOIN financial_products fp ON d.product_id = fp.id
+            {where}
+            ORDER BY d.ex_date DESC
+        ''', conn, params=params)
+        conn.close()
+        return df
+
+    def get_price_points(self, product_id: int, start_date: datetime, end_date: datetime) -> List[PricePoint]:
+        """Historique des prix d'un produit entre deux dates (incluses), par date croissante"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = PricePoint.row_factory
+        points = conn.execute('''
+            SELECT product_id, date, price, price_eur, price_usd
+            FROM price_history
+            WHERE product_id = ? AND date BETWEEN ? AND ?
+            ORDER BY date
+        ''', (int(product_id), start_date.strftime('%Y-%m-%d'), end_date.strftime('%Y-%m-%d'))).fetchall()
+        conn.close()
+        return points
+    
+    def get_oldest_last_price_date(self) -> Optional[datetime]:
+        """
+        Plus ancienne des dates de dernier prix des produits : l'historique de tous les produits
+        est complet jusqu'à cette date. None si un produit n'a encore aucun prix (ou aucun produit).
+        """
+        conn = sqlite3.connect(self.db_path)
+        row = conn.execute('''
+            SELECT COUNT(*), COUNT(last_date), MIN(last_date)
+            FROM (
+                SELECT fp.id, MAX(ph.date) AS last_date
+                FROM financial_products fp
+                LEFT JOIN price_history ph ON ph.product_id = fp.id
+                GROUP BY fp.id
+            )
+        ''').fetchone()
+        conn.close()
+        products, with_history, oldest = row
+        if not products or with_history < products:
+            return None
+        return datetime.fromisoformat(str(oldest)[:10])
     
     # Méthodes pour les transactions
     def add_transaction(self, account_id: int, product_id: int, transaction_type: str,
@@ -400,46 +1206,120 @@ class DatabaseManager:
                       (account_id, product_id, transaction_type, quantity, price, price_currency,
                        price_eur, price_usd, transaction_date, fees, fees_currency, exchange_rate))
         conn.commit()
+        self.mark_written()
         conn.close()
         return True
     
+    def add_transactions(self, rows: List[Tuple], exchange_rate_rows: List[Tuple] = ()) -> int:
+        """
+        Ajoute des transactions en lot dans une seule transaction SQLite (tout ou rien).
+        rows : (account_id, product_id, transaction_type, quantity, price, price_currency, price_eur,
+        price_usd, transaction_date, fees, fees_currency, exchange_rate_eur_usd) ;
+        exchange_rate_rows : taux utilisés (from_currency, to_currency, rate, date).
+        Retourne le nombre de transactions ajoutées.
+        """
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        try:
+            cursor.executemany('''INSERT INTO transactions 
+                                (account_id, product_id, transaction_type, quantity, price, price_currency,
+                                 price_eur, price_usd, transaction_date, fees, fees_currency, exchange_rate_eur_usd)
+                                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)''', rows)
+            cursor.executemany('''INSERT OR REPLACE INTO exchange_rates 
+                                (from_currency, to_currency, rate, date)
+                                VALUES (?, ?, ?, ?)''', exchange_rate_rows)
+            conn.commit()
+            self.mark_written()
+        finally:
+            conn.close()
+        return len(rows)
+    
     def get_all_transactions(self) -> pd.DataFrame:
         """Récupère toutes les transactions avec détails"""
         conn = sqlite3.connect(self.db_path)
-        query = '''
-            SELECT 
-                t.id,
-                t.account_id,
-                t.transaction_type,
-                t.quantity,
-                t.price,
-                t.price_currency,
-                t.price_eur,
-                t.price_usd,
-                t.transaction_date,
-                t.fees,
-                t.fees_currency,
-                t.exchange_rate_eur_usd,
-                fp.symbol,
-                fp.name as product_name,
-                fp.currency as product_currency,
-                a.name as account_name,
-                p.name as platform_name
+        df = pd.read_sql_query(TRANSACTION_LIST_QUERY + ' ORDER BY t.transaction_date DESC', conn)
+        conn.close()
+        
+        if not df.empty:
+            _add_transaction_amounts(df)
+        
+        return df
+    
+    def get_transaction(self, transaction_id: int) -> Optional[Transaction]:
+        """Récupère une transaction et ses détails par son ID (lecture par clé primaire)"""
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = Transaction.row_factory
+        transaction = conn.execute(TRANSACTION_LIST_QUERY + ' WHERE t.id = ?', (int(transaction_id),)).fetchone()
+        conn.close()
+        return transaction
+    
+    def get_transaction_records(self, filters: Optional[Dict] = None) -> List[Transaction]:
+        """Transactions filtrées (voir TRANSACTION_FILTERS) par ordre chronologique, sous forme d'enregistrements"""
+        where, params = _transaction_filter_clause(filters)
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = Transaction.row_factory
+        transactions = conn.execute(TRANSACTION_LIST_QUERY + where + ' ORDER BY t.transaction_date, t.id',
+                                    params).fetchall()
+        conn.close()
+        return transactions
+    
+    def query_transactions(self, filters: Optional[Dict] = None, order: str = 'desc', limit: Optional[int] = 50,
+                           cursor: Optional[Tuple[str, int]] = None) -> Tuple[pd.DataFrame, Optional[Tuple[str, int]]]:
+        """
+        Page de transactions filtrée en SQL (voir TRANSACTION_FILTERS), triée par (date, id).
+        La pagination se fait par clé : cursor est le (date, id) de la dernière ligne de la
+        page précédente, tel que retourné par l'appel précédent. Retourne la page et le
+        curseur de la page suivante (None s'il n'y en a pas). limit=None retourne tout.
+        """
+        if order not in ('asc', 'desc'):
+            raise ValueError(f"Ordre inconnu : {order} (attendu : asc, desc)")
+        
+        where, params = _transaction_filter_clause(filters)
+        if cursor is not None:
+            where += (' AND ' if where else ' WHERE ') + f"(t.transaction_date, t.id) {'<' if order == 'desc' else '>'} (?, ?)"
+            params.extend([cursor[0], int(cursor[1])])
+        
+        query = TRANSACTION_LIST_QUERY + where + f' ORDER BY t.transaction_date {order.upper()}, t.id {order.upper()}'
+        if limit is not None:
+            # Une ligne de plus pour savoir s'il existe une page suivante
+            query += ' LIMIT ?'
+            params.append(int(limit) + 1)
+        
+        conn = sqlite3.connect(self.db_path)
+        df = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+        
+        next_cursor = None
+        if limit is not None and len(df) > limit:
+            df = df.iloc[:limit]
+            next_cursor = (df['transaction_date'].iloc[-1], int(df['id'].iloc[-1]))
+        
+        if not df.empty:
+            _add_transaction_amounts(df)
+        
+        return df, next_cursor
+    
+    def get_transaction_stats(self, filters: Optional[Dict] = None) -> Dict:
+        """Nombre de transactions par type et frais totaux (EUR) pour les mêmes filtres que query_transactions"""
+        where, params = _transaction_filter_clause(filters)
+        conn = sqlite3.connect(self.db_path)
+        rows = conn.execute(f'''
+            SELECT t.transaction_type, COUNT(*), COALESCE(SUM(t.fees), 0)
             FROM transactions t
             JOIN financial_products fp ON t.product_id = fp.id
             JOIN accounts a ON t.account_id = a.id
             JOIN platforms p ON a.platform_id = p.id
-            ORDER BY t.transaction_date DESC
-        '''
-        df = pd.read_sql_query(query, conn)
+            {where}
+            GROUP BY t.transaction_type
+        ''', params).fetchall()
         conn.close()
         
-        if not df.empty:
-            df['transaction_date'] = pd.to_datetime(df['transaction_date'])
-            # Calculer le montant total en EUR
-            df['total_amount'] = df['quantity'] * df['price_eur'] + df['fees']
-        
-        return df
+        counts = {transaction_type: count for transaction_type, count, _ in rows}
+        return {
+            'count': sum(counts.values()),
+            'by_type': counts,
+            'fees': sum(fees for _, _, fees in rows),
+        }
     
     # Méthodes pour les taux de change historiques
     def save_exchange_rate(self, from_currency: str, to_currency: str, 
@@ -453,6 +1333,7 @@ class DatabaseManager:
                             VALUES (?, ?, ?, ?)''',
                           (from_currency, to_currency, rate, date.date()))
             conn.commit()
+            self.mark_written()
             return True
         except Exception:
             return False
@@ -480,7 +1361,8 @@ class DatabaseManager:
         stats = {}
         
         # Compter les enregistrements dans chaque table
-        tables = ['platforms', 'accounts', 'financial_products', 'transactions', 'price_history', 'exchange_rates']
+        tables = ['platforms', 'accounts', 'financial_products', 'transactions', 'positions', 'price_history',
+                  'dividends', 'exchange_rates']
         for table in tables:
             cursor.execute(f"SELECT COUNT(*) FROM {table}")
             stats[table] = cursor.fetchone()[0]
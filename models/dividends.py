@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+from typing import List, Tuple
+
+
+def extract_dividends(hist: pd.DataFrame) -> List[Tuple[str, float]]:
+    """
+    Dividendes (date de détachement, montant par part en devise du produit) contenus
+    dans un historique Yahoo Finance : la colonne Dividends est fournie avec les prix,
+    sans requête supplémentaire.
+    """
+    if hist.empty or 'Dividends' not in hist.columns:
+        return []
+    dividends = hist['Dividends']
+    dividends = dividends[dividends > 0]
+    return [(date.strftime('%Y-%m-%d'), float(amount)) for date, amount in dividends.items()]
+
+
+def total_return_factors(dates: np.ndarray, prices: np.ndarray,
+                         dividend_dates: np.ndarray, dividend_amounts: np.ndarray) -> np.ndarray:
+    """
+    Facteurs de réinvestissement des dividendes d'un produit, en une passe vectorisée.
+
+    dates (triées) et prices décrivent l'historique de clôture ; chaque dividende est
+    rattaché à la première cotation à partir de sa date de détachement. Le prix total
+    return vaut prix × facteur, avec facteur = Π (1 + dividende / clôture du détachement) :
+    le rendement d'un jour de détachement devient (P_t + D_t) / P_{t-1}.
+    """
+    detached = np.zeros(len(dates))
+    if len(dividend_dates) and len(dates):
+        rows = np.searchsorted(dates, dividend_dates)
+        # Les dividendes hors de l'historique stocké sont ignorés
+        inside = (rows < len(dates)) & (dividend_dates >= dates[0])
+        np.add.at(detached, rows[inside], dividend_amounts[inside])
+    return np.cumprod(1.0 + np.divide(detached, prices, out=np.zeros_like(detached), where=prices > 0))
@@ -0,0 +1,102 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from typing import Dict, List
+
+from models.database import DatabaseManager
+from utils.versioned_cache import VersionedCache
+
+# Devises de base : colonnes *_eur / *_usd stockées pour les prix et les montants
+STORED_CURRENCIES = ('EUR', 'USD')
+
+CURRENCY_SYMBOLS = {
+    'EUR': '€',
+    'USD': '$',
+    'GBP': '£',
+    'JPY': '¥',
+    'CHF': 'CHF',
+}
+
+# Séries de taux chargées, partagées entre toutes les sessions du processus
+_rates_cache = VersionedCache(max_entries=8)
+
+
+def currency_symbol(currency: str) -> str:
+    """Symbole d'affichage d'une devise (le code ISO à défaut)"""
+    return CURRENCY_SYMBOLS.get(currency, currency)
+
+
+class ExchangeRates:
+    """
+    Séries quotidiennes des taux EUR → devise, construites à partir des données stockées
+    uniquement (table exchange_rates, taux EUR/USD des transactions et prix actuels EUR/USD
+    des produits) : un taux manquant reprend le dernier taux connu.
+
+    Les montants sont calculés en EUR puis convertis en une multiplication par le tableau
+    des taux aux dates voulues, sans appel de conversion ligne par ligne.
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def get_currencies(self) -> List[str]:
+        """Devises de valorisation disponibles : EUR, USD et toute devise ayant une série de taux"""
+        series = self._get_series()
+        return list(STORED_CURRENCIES) + sorted(currency for currency in series if currency not in STORED_CURRENCIES)
+
+    def get_rates(self, currency: str, dates) -> np.ndarray:
+        """Taux EUR → devise à chaque date (dernier taux connu, premier taux avant le début de la série)"""
+        if currency == 'EUR':
+            return np.ones(len(dates))
+        series = self._get_series().get(currency)
+        if series is None:
+            raise ValueError(f"Aucun taux de change disponible pour {currency}")
+        days = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        rows = np.clip(series.index.searchsorted(days, side='right') - 1, 0, len(series) - 1)
+        return series.to_numpy()[rows]
+
+    def get_current_rate(self, currency: str) -> float:
+        """Dernier taux EUR → devise connu"""
+        if currency == 'EUR':
+            return 1.0
+        series = self._get_series().get(currency)
+        if series is None:
+            raise ValueError(f"Aucun taux de change disponible pour {currency}")
+        return float(series.iloc[-1])
+
+    def _get_series(self) -> Dict[str, pd.Series]:
+        return _rates_cache.get_or_compute(self.db.db_path, self.db.get_data_version(), self._load)
+
+    def _load(self) -> Dict[str, pd.Series]:
+        """Une série triée par date et par devise, sans doublon de date"""
+        conn = sqlite3.connect(self.db.db_path)
+        rates = pd.read_sql_query('''
+            SELECT to_currency AS currency, date(date) AS day, rate
+            FROM exchange_rates
+            WHERE from_currency = 'EUR' AND rate > 0
+            UNION ALL
+            SELECT from_currency, date(date), 1.0 / rate
+            FROM exchange_rates
+            WHERE to_currency = 'EUR' AND rate > 0
+            UNION ALL
+            SELECT 'USD', date(transaction_date), exchange_rate_eur_usd
+            FROM transactions
+            WHERE exchange_rate_eur_usd > 0
+        ''', conn)
+        # Taux appliqué lors de la dernière mise à jour des prix actuels
+        current_usd = conn.execute('''
+            SELECT AVG(current_price_usd / current_price_eur), date(MAX(last_updated))
+            FROM financial_products
+            WHERE current_price_eur > 0 AND current_price_usd > 0
+        ''').fetchone()
+        conn.close()
+
+        if current_usd[0] is not None:
+            rates.loc[len(rates)] = ['USD', current_usd[1] or pd.Timestamp.today().strftime('%Y-%m-%d'), current_usd[0]]
+
+        rates['day'] = pd.to_datetime(rates['day'])
+        series = {}
+        for currency, group in rates.groupby('currency'):
+            daily = group.groupby('day')['rate'].mean().sort_index()
+            series[currency] = daily
+        return series
@@ -0,0 +1,305 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from typing import Dict
+
+from models.database import DatabaseManager
+
+# Méthodes de calcul du coût de revient
+# FIFO : premier entré, premier sorti
+# PRU : prix de revient unitaire moyen pondéré (méthode fiscale française)
+LOT_METHODS = ('FIFO', 'PRU')
+
+# Quantité résiduelle en dessous de laquelle un lot est considéré comme soldé
+LOT_EPSILON = 1e-9
+
+
+def _check_method(method: str):
+    if method not in LOT_METHODS:
+        raise ValueError(f"Méthode de calcul inconnue : {method} (attendu : {', '.join(LOT_METHODS)})")
+
+
+def _group_cumsum(values: np.ndarray, segment: np.ndarray) -> np.ndarray:
+    """Somme cumulée remise à zéro à chaque segment (segments contigus)"""
+    return pd.Series(values).groupby(segment).cumsum().to_numpy()
+
+
+def _group_shift(values: np.ndarray, first: np.ndarray, fill: float = 0.0) -> np.ndarray:
+    """Valeur de l'événement précédent du même groupe (fill pour le premier)"""
+    shifted = np.empty_like(values)
+    shifted[0] = fill
+    shifted[1:] = values[:-1]
+    shifted[first] = fill
+    return shifted
+
+
+def _pair_codes(account_ids: np.ndarray, product_ids: np.ndarray) -> np.ndarray:
+    """Codes de groupe pour des événements triés par (compte, produit)"""
+    first = np.ones(len(account_ids), dtype=bool)
+    first[1:] = (account_ids[1:] != account_ids[:-1]) | (product_ids[1:] != product_ids[:-1])
+    return np.cumsum(first)
+
+
+def compute_lots(group: np.ndarray, is_buy: np.ndarray, quantity: np.ndarray,
+                 amount: np.ndarray, method: str = 'FIFO') -> Dict[str, np.ndarray]:
+    """
+    Applique une suite d'achats / ventes par groupe (compte, produit) en calcul vectorisé.
+
+    Les tableaux décrivent des événements triés : chaque groupe est contigu et chronologique.
+    amount est le coût total d'un achat (quantité × prix + frais) ou le produit net
+    d'une vente (quantité × prix - frais). Une vente supérieure à la quantité détenue
+    est plafonnée à la quantité détenue.
+
+    Retourne, par événement : quantité vendue effective, coût des titres vendus,
+    plus-value réalisée, quantité et coût détenus après l'événement, ainsi que
+    la quantité et le coût restants de chaque lot d'achat (FIFO) ou du lot moyen (PRU).
+    """
+    _check_method(method)
+    n = len(group)
+    quantity = quantity.astype(float)
+    amount = amount.astype(float)
+    is_buy = is_buy & (quantity > 0)
+
+    if n == 0:
+        empty = np.zeros(0)
+        return {'sold_quantity': empty, 'cost_of_sales': empty, 'realized': empty,
+                'held_quantity': empty, 'held_cost': empty,
+                'lot_quantity': empty, 'lot_cost': empty}
+
+    first = np.ones(n, dtype=bool)
+    first[1:] = group[1:] != group[:-1]
+    segment = np.cumsum(first)
+
+    buy_quantity = np.where(is_buy, quantity, 0.0)
+    buy_cost = np.where(is_buy, amount, 0.0)
+    sell_quantity = np.where(is_buy, 0.0, quantity)
+
+    bought = _group_cumsum(buy_quantity, segment)
+    bought_cost = _group_cumsum(buy_cost, segment)
+    sold = _group_cumsum(sell_quantity, segment)
+
+    # Ventes cumulées plafonnées : X_t = min(X_{t-1} + s_t, B_t) = S_t + min(0, cummin(B - S))
+    shortfall = pd.Series(bought - sold).groupby(segment).cummin().to_numpy()
+    sold_effective = sold + np.minimum(0.0, shortfall)
+    sold_before = _group_shift(sold_effective, first)
+    sold_quantity = sold_effective - sold_before
+    held_quantity = bought - sold_effective
+
+    if method == 'FIFO':
+        # Courbe globale coût cumulé = f(quantité achetée cumulée) : les ventes consomment
+        # les achats dans l'ordre, le coût vendu est un écart sur cette courbe linéaire par morceaux
+        buy_index = np.flatnonzero(is_buy)
+        curve_quantity = np.concatenate([[0.0], np.cumsum(buy_quantity[buy_index])])
+        curve_cost = np.concatenate([[0.0], np.cumsum(buy_cost[buy_index])])
+        offset_quantity = np.cumsum(buy_quantity) - bought
+        offset_cost = np.cumsum(buy_cost) - bought_cost
+
+        consumed_cost = np.interp(offset_quantity + sold_effective, curve_quantity, curve_cost) - offset_cost
+        consumed_before = _group_shift(consumed_cost, first)
+        cost_of_sales = consumed_cost - consumed_before
+        held_cost = bought_cost - consumed_cost
+
+        # Reste de chaque lot d'achat après la dernière vente du groupe
+        last_index = np.flatnonzero(np.append(first[1:], True))
+        sold_end = sold_effective[last_index][segment - 1]
+        lot_start = bought - buy_quantity
+        lot_quantity = np.where(is_buy, np.clip(bought - np.maximum(lot_start, sold_end), 0.0, None), 0.0)
+        lot_cost = np.divide(buy_cost * lot_quantity, buy_quantity,
+                             out=np.zeros(n), where=is_buy)
+    else:
+        # PRU : C_t = a_t C_{t-1} + b_t avec a_t = Q_t / Q_{t-1} sur une vente, 1 sur un achat.
+        # Les remises à zéro (début de groupe, position soldée) découpent des segments
+        # dans lesquels C_t = P_t × Σ b_j / P_j, P étant le produit cumulé des a.
+        held_before = _group_shift(held_quantity, first)
+        ratio = np.where(is_buy, 1.0,
+                         np.divide(held_quantity, held_before, out=np.zeros(n), where=held_before > 0))
+        reset = first | (ratio == 0)
+        ratio = np.where(reset, 1.0, ratio)
+        pru_segment = np.cumsum(reset)
+
+        growth = pd.Series(ratio).groupby(pru_segment).cumprod().to_numpy()
+        held_cost = growth * _group_cumsum(buy_cost / growth, pru_segment)
+        held_cost = np.where(held_quantity > LOT_EPSILON, held_cost, 0.0)
+        cost_of_sales = np.where(is_buy, 0.0, _group_shift(held_cost, first) - held_cost)
+
+        # Un seul lot moyen par groupe, porté par le dernier événement
+        last = np.append(first[1:], True)
+        lot_quantity = np.where(last, held_quantity, 0.0)
+        lot_cost = np.where(last, held_cost, 0.0)
+
+    proceeds = np.divide(amount * sold_quantity, quantity, out=np.zeros(n), where=~is_buy & (quantity > 0))
+    realized = np.where(is_buy, 0.0, proceeds - cost_of_sales)
+
+    return {
+        'sold_quantity': sold_quantity,
+        'cost_of_sales': np.where(is_buy, 0.0, cost_of_sales),
+        'realized': realized,
+        'proceeds': proceeds,
+        'held_quantity': held_quantity,
+        'held_cost': held_cost,
+        'lot_quantity': lot_quantity,
+        'lot_cost': lot_cost,
+    }
+
+
+class LotEngine:
+    """
+    Comptabilité par lots (FIFO ou PRU) persistée dans la base.
+
+    L'état des lots ouverts, le curseur de la dernière transaction appliquée et les
+    plus-values réalisées par année sont stockés par (compte, produit, méthode) :
+    seules les nouvelles transactions sont appliquées à chaque synchronisation.
+    Les triggers de la base invalident l'état d'un couple lorsqu'une de ses
+    transactions est modifiée, supprimée ou insérée dans le passé.
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def sync(self, method: str = 'FIFO') -> Dict:
+        """Applique les transactions non encore traitées et retourne le nombre d'événements traités"""
+        _check_method(method)
+        conn = sqlite3.connect(self.db.db_path)
+
+        try:
+            # Transactions non encore appliquées, triées via l'index (compte, produit, date, id)
+            new_transactions = pd.read_sql_query('''
+                SELECT t.account_id, t.product_id, 1 AS phase, 0 AS lot_order, t.transaction_date AS date,
+                       t.id, t.transaction_type = 'BUY' AS is_buy, t.quantity,
+                       CASE WHEN t.transaction_type = 'BUY' THEN t.quantity * t.price_eur + COALESCE(t.fees, 0)
+                            ELSE t.quantity * t.price_eur - COALESCE(t.fees, 0) END AS amount
+                FROM transactions t
+                LEFT JOIN lot_state s ON s.account_id = t.account_id AND s.product_id = t.product_id
+                                     AND s.method = ?
+                WHERE t.transaction_type IN ('BUY', 'SELL')
+                  AND t.account_id IS NOT NULL AND t.product_id IS NOT NULL
+                  AND (s.account_id IS NULL
+                       OR (t.transaction_date, t.id) > (s.last_transaction_date, s.last_transaction_id))
+                ORDER BY t.account_id, t.product_id, t.transaction_date, t.id
+            ''', conn, params=(method,))
+
+            if new_transactions.empty:
+                return {'transactions': 0, 'positions': 0}
+
+            first = np.diff(_pair_codes(new_transactions['account_id'].to_numpy(),
+                                        new_transactions['product_id'].to_numpy()), prepend=0) > 0
+            pairs = new_transactions.loc[first, ['account_id', 'product_id']]
+
+            # Lots ouverts des couples concernés, rejoués comme achats d'ouverture
+            open_lots = pd.read_sql_query('''
+                SELECT account_id, product_id, 0 AS phase, lot_order, acquired_date AS date,
+                       -1 AS id, 1 AS is_buy, quantity, cost_eur AS amount
+                FROM open_lots WHERE method = ?
+            ''', conn, params=(method,)).merge(pairs, on=['account_id', 'product_id'])
+
+            events = new_transactions
+            if not open_lots.empty:
+                events = pd.concat([open_lots, new_transactions], ignore_index=True).sort_values(
+                    ['account_id', 'product_id', 'phase', 'lot_order', 'date', 'id'],
+                    kind='stable', ignore_index=True)
+            events['is_buy'] = events['is_buy'].astype(bool)
+
+            group = _pair_codes(events['account_id'].to_numpy(), events['product_id'].to_numpy())
+            result = compute_lots(group, events['is_buy'].to_numpy(),
+                                  events['quantity'].to_numpy(dtype=float),
+                                  events['amount'].to_numpy(dtype=float), method)
+
+            self._save(conn, method, events, result, pairs)
+            conn.commit()
+            return {'transactions': len(new_transactions), 'positions': len(pairs)}
+        finally:
+            conn.close()
+
+    def _save(self, conn, method: str, events: pd.DataFrame, result: Dict[str, np.ndarray],
+              pairs: pd.DataFrame):
+        """Persiste les lots ouverts, les plus-values réalisées et les curseurs des couples traités"""
+        cursor = conn.cursor()
+        pair_keys = [(method, int(a), int(p)) for a, p in pairs.itertuples(index=False)]
+
+        cursor.executemany("DELETE FROM open_lots WHERE method = ? AND account_id = ? AND product_id = ?",
+                           pair_keys)
+
+        lots = events.loc[result['lot_quantity'] > LOT_EPSILON, ['account_id', 'product_id', 'date']].copy()
+        lots['quantity'] = result['lot_quantity'][lots.index]
+        lots['cost_eur'] = result['lot_cost'][lots.index]
+        lots['lot_order'] = lots.groupby(['account_id', 'product_id']).cumcount()
+        cursor.executemany('''INSERT INTO open_lots
+                              (account_id, product_id, method, lot_order, acquired_date, quantity, cost_eur)
+                              VALUES (?, ?, ?, ?, ?, ?, ?)''',
+                           [(int(row.account_id), int(row.product_id), method, int(row.lot_order),
+                             row.date, float(row.quantity), float(row.cost_eur))
+                            for row in lots.itertuples(index=False)])
+
+        sells = events.loc[(events['phase'] == 1) & ~events['is_buy'], ['account_id', 'product_id', 'date']].copy()
+        if not sells.empty:
+            sells['year'] = sells['date'].astype(str).str[:4].astype(int)
+            sells['realized_eur'] = result['realized'][sells.index]
+            sells['proceeds_eur'] = result['proceeds'][sells.index]
+            sells['cost_eur'] = result['cost_of_sales'][sells.index]
+            by_year = sells.groupby(['account_id', 'product_id', 'year'], as_index=False)[
+                ['realized_eur', 'proceeds_eur', 'cost_eur']].sum()
+            cursor.executemany('''INSERT INTO realized_pnl
+                                  (account_id, product_id, method, year, realized_eur, proceeds_eur, cost_eur)
+                                  VALUES (?, ?, ?, ?, ?, ?, ?)
+                                  ON CONFLICT (account_id, product_id, method, year) DO UPDATE SET
+                                      realized_eur = realized_eur + excluded.realized_eur,
+                                      proceeds_eur = proceeds_eur + excluded.proceeds_eur,
+                                      cost_eur = cost_eur + excluded.cost_eur''',
+                               [(int(row.account_id), int(row.product_id), method, int(row.year),
+                                 float(row.realized_eur), float(row.proceeds_eur), float(row.cost_eur))
+                                for row in by_year.itertuples(index=False)])
+
+        applied = events[events['phase'] == 1]
+        last = applied.groupby(['account_id', 'product_id'], as_index=False).last()
+        cursor.executemany('''INSERT OR REPLACE INTO lot_state
+                              (account_id, product_id, method, last_transaction_date, last_transaction_id)
+                              VALUES (?, ?, ?, ?, ?)''',
+                           [(int(row.account_id), int(row.product_id), method, row.date, int(row.id))
+                            for row in last.itertuples(index=False)])
+
+    def get_realized_pnl(self, method: str = 'FIFO') -> pd.DataFrame:
+        """Plus-values réalisées par année, compte et produit (en EUR)"""
+        self.sync(method)
+        conn = sqlite3.connect(self.db.db_path)
+        df = pd.read_sql_query('''
+            SELECT r.year, r.account_id, a.name AS account_name, p.name AS platform_name,
+                   r.product_id, fp.symbol, fp.name, fp.product_type,
+                   r.realized_eur, r.proceeds_eur, r.cost_eur
+            FROM realized_pnl r
+            JOIN financial_products fp ON r.product_id = fp.id
+            JOIN accounts a ON r.account_id = a.id
+            JOIN platforms p ON a.platform_id = p.id
+            WHERE r.method = ?
+            ORDER BY r.year, a.name, fp.symbol
+        ''', conn, params=(method,))
+        conn.close()
+        return df
+
+    def get_unrealized_pnl(self, method: str = 'FIFO') -> pd.DataFrame:
+        """Plus-values latentes par position, à partir du coût des lots ouverts (en EUR)"""
+        self.sync(method)
+        conn = sqlite3.connect(self.db.db_path)
+        df = pd.read_sql_query('''
+            SELECT l.account_id, a.name AS account_name, l.product_id, fp.symbol, fp.name,
+                   fp.product_type, fp.current_price_eur,
+                   SUM(l.quantity) AS quantity, SUM(l.cost_eur) AS cost_eur,
+                   COUNT(*) AS open_lots, MIN(l.acquired_date) AS first_acquired_date
+            FROM open_lots l
+            JOIN financial_products fp ON l.product_id = fp.id
+            JOIN accounts a ON l.account_id = a.id
+            WHERE l.method = ?
+            GROUP BY l.account_id, l.product_id
+        ''', conn, params=(method,))
+        conn.close()
+
+        if not df.empty:
+            quantity = df['quantity'].to_numpy(dtype=float)
+            cost = df['cost_eur'].to_numpy(dtype=float)
+            current_value = quantity * df['current_price_eur'].fillna(0).to_numpy(dtype=float)
+            df['unit_cost_eur'] = np.divide(cost, quantity, out=np.zeros_like(cost), where=quantity > 0)
+            df['current_value'] = current_value
+            df['unrealized_eur'] = current_value - cost
+            df['unrealized_pct'] = np.divide((current_value - cost) * 100, cost,
+                                             out=np.zeros_like(cost), where=cost > 0)
+
+        return df
@@ -0,0 +1,127 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional
+
+from models.database import DatabaseManager
+from models.price_matrix import PriceMatrix
+from models.returns import VALUE_EPSILON
+from utils.versioned_cache import VersionedCache
+
+# Horizons calculés systématiquement : nombre de jours calendaires (None = depuis le 1er janvier)
+PERFORMANCE_HORIZONS = {
+    '1D': 1,
+    '1W': 7,
+    '1M': 30,
+    'YTD': None,
+    '1Y': 365,
+}
+
+# Valorisations par position chargées, partagées entre toutes les sessions du processus
+_performance_cache = VersionedCache(max_entries=8)
+
+
+class PeriodPerformance:
+    """
+    Performance de chaque position (compte, produit) sur une période, calculée pour
+    plusieurs horizons à la fois à partir de la matrice des prix.
+
+    Sur une période, la performance vaut (valeur finale - valeur initiale - flux nets)
+    / (valeur initiale + achats) : une position achetée en cours de période est mesurée
+    depuis son prix d'achat, une vente ou un dividende compte comme un retrait.
+    """
+
+    def __init__(self, db: DatabaseManager, prices: PriceMatrix):
+        self.db = db
+        self.prices = prices
+
+    def get_period_performance(self, start_date: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Une ligne par position ayant existé : account_id, product_id, value (valeur actuelle EUR)
+        puis return_<horizon> (fraction) et gain_<horizon> (EUR) pour chaque horizon de
+        PERFORMANCE_HORIZONS, ainsi que return_period / gain_period depuis start_date si fourni.
+        """
+        today = pd.Timestamp.today().normalize()
+        loaded = _performance_cache.get_or_compute(
+            (self.db.db_path, today), self.db.get_data_version(), self._load, today
+        )
+        if loaded is None:
+            columns = ['account_id', 'product_id', 'value']
+            for label in list(PERFORMANCE_HORIZONS) + (['period'] if start_date is not None else []):
+                columns += [f'return_{label}', f'gain_{label}']
+            return pd.DataFrame(columns=columns)
+
+        starts = {label: today - pd.Timedelta(days=days) if days is not None else today.replace(month=1, day=1)
+                  for label, days in PERFORMANCE_HORIZONS.items()}
+        if start_date is not None:
+            starts['period'] = pd.Timestamp(start_date).normalize()
+
+        # Cumuls à la veille de chaque début de période (0 avant la première transaction)
+        calendar = loaded['calendar']
+        rows = np.array([(start - calendar[0]).days - 1 for start in starts.values()])
+        before = rows < 0
+        rows = np.clip(rows, 0, len(calendar) - 1)
+
+        start_values = np.where(before[:, None], 0.0, loaded['values'][rows])
+        start_flows = np.where(before[:, None], 0.0, loaded['cumulative_flows'][rows])
+        start_buys = np.where(before[:, None], 0.0, loaded['cumulative_buys'][rows])
+
+        end_values = loaded['values'][-1]
+        gains = end_values - start_values - (loaded['cumulative_flows'][-1] - start_flows)
+        base = start_values + loaded['cumulative_buys'][-1] - start_buys
+        returns = np.divide(gains, base, out=np.full_like(gains, np.nan), where=base > VALUE_EPSILON)
+
+        performance = loaded['pairs'].copy()
+        performance['value'] = end_values
+        for i, label in enumerate(starts):
+            performance[f'return_{label}'] = returns[i]
+            performance[f'gain_{label}'] = gains[i]
+        return performance
+
+    def _load(self, today: pd.Timestamp) -> Optional[Dict]:
+        """
+        Valeurs quotidiennes et cumuls des flux / achats (jours × positions) depuis la
+        première transaction, valorisés au prix actuel à défaut d'historique récent.
+        """
+        conn = sqlite3.connect(self.db.db_path)
+        transactions = pd.read_sql_query('''
+            SELECT account_id, product_id, date(transaction_date) AS day,
+                   CASE WHEN transaction_type = 'BUY' THEN quantity
+                        WHEN transaction_type = 'SELL' THEN -quantity ELSE 0 END AS quantity,
+                   CASE WHEN transaction_type = 'BUY' THEN quantity * price_eur + COALESCE(fees, 0)
+                        ELSE -(quantity * price_eur - COALESCE(fees, 0)) END AS flow
+            FROM transactions
+            WHERE transaction_type IN ('BUY', 'SELL', 'DIVIDEND')
+              AND account_id IS NOT NULL AND product_id IS NOT NULL
+              AND date(transaction_date) <= ?
+        ''', conn, params=(today.strftime('%Y-%m-%d'),))
+        conn.close()
+        if transactions.empty:
+            return None
+
+        days = pd.to_datetime(transactions['day'])
+        first_day = days.min()
+        calendar = pd.date_range(first_day, today, freq='D')
+        day_index = (days - first_day).dt.days.to_numpy()
+        n_days = len(calendar)
+
+        pair_codes, pairs = pd.MultiIndex.from_frame(transactions[['account_id', 'product_id']]).factorize()
+        flow = transactions['flow'].to_numpy(dtype=float)
+
+        def cumulate(amounts: np.ndarray) -> np.ndarray:
+            daily = np.zeros((n_days, len(pairs)))
+            np.add.at(daily, (day_index, pair_codes), amounts)
+            return np.cumsum(daily, axis=0)
+
+        held = np.maximum(cumulate(transactions['quantity'].to_numpy(dtype=float)), 0.0)
+        pair_products = pairs.get_level_values(1).to_numpy()
+        prices = self.prices.get(first_day, today, product_ids=list(pair_products), currency='EUR')
+
+        return {
+            'calendar': calendar,
+            'pairs': pairs.to_frame(index=False, name=['account_id', 'product_id']),
+            'values': held * np.nan_to_num(prices.to_numpy(dtype=float)),
+            'cumulative_flows': cumulate(flow),
+            'cumulative_buys': cumulate(np.maximum(flow, 0.0)),
+        }
@@ -1,14 +1,94 @@
+import logging
+import numpy as np
 import pandas as pd
-import yfinance as yf
-import streamlit as st
 from datetime import datetime, timedelta
 from typing import Dict, List, Optional, Tuple
 import time
+from concurrent.futures import ThreadPoolExecutor
 
-from models.database import DatabaseManager
+from models.database import DatabaseManager, TRANSACTION_LIST_QUERY, TRANSACTION_TYPES
+from models.alerts import AlertEngine
 from models.currency import CurrencyConverter
+from models.benchmark import benchmark_prices, simulate_benchmarks
+from models.corporate_actions import extract_splits
+from models.correlation import CorrelationAnalyzer
+from models.dividends import extract_dividends
+from models.exchange_rates import ExchangeRates, STORED_CURRENCIES
+from models.lots import LotEngine
+from models.performance import PeriodPerformance
+from models.price_matrix import PriceMatrix
+from models.progress import NULL_REPORTER, ProgressReporter
+from models.projection import ProjectionEngine
+from models.records import Account, PricePoint, Product, Transaction
+from models.returns import ReturnsCalculator
+from models.risk import RiskAnalyzer
+from models.scenario import ScenarioSimulator, propose_rebalancing
+from models.transaction_import import TransactionImporter
+from utils.single_flight import SingleFlight
+from utils.versioned_cache import VersionedCache
 from utils.yahoo_finance import YahooFinanceUtils
 
+# Mises à jour de prix en cours, partagées entre toutes les sessions du processus
+_price_update_flight = SingleFlight()
+
+# Positions du résumé et évolutions quotidiennes en EUR, partagées entre toutes les sessions du
+# processus : un changement de période ou de devise de valorisation ne refait que la tranche
+# et la conversion finale
+_summary_cache = VersionedCache(max_entries=32)
+_evolution_cache = VersionedCache(max_entries=32)
+
+# Quantité en dessous de laquelle une position est considérée comme soldée
+POSITION_EPSILON = 1e-9
+
+# Téléchargements simultanés lors de l'ajout de plusieurs produits
+PRODUCT_FETCH_WORKERS = 8
+
+logger = logging.getLogger(__name__)
+
+# Colonnes de répartition de l'évolution -> champ de la transaction donnant la catégorie
+EVOLUTION_BREAKDOWNS = {
+    'breakdown_account': 'account_name',
+    'breakdown_platform': 'platform_name',
+    'breakdown_asset_class': 'product_type',
+    'breakdown_product': 'product_name',
+    'breakdown_currency': 'product_currency',
+}
+
+def _build_filter_clause(account_filter: list = None, product_filter: list = None,
+                         asset_class_filter: list = None) -> Tuple[str, list]:
+    """Construit la clause SQL (AND ...) et les paramètres des filtres compte / produit / classe d'actifs"""
+    clause = ''
+    params = []
+    
+    if account_filter:
+        placeholders = ','.join(['?' for _ in account_filter])
+        clause += f' AND a.id IN ({placeholders})'
+        params.extend(int(account_id) for account_id in account_filter)
+    
+    if product_filter:
+        placeholders = ','.join(['?' for _ in product_filter])
+        clause += f' AND fp.symbol IN ({placeholders})'
+        params.extend(product_filter)
+    
+    if asset_class_filter:
+        placeholders = ','.join(['?' for _ in asset_class_filter])
+        clause += f' AND fp.product_type IN ({placeholders})'
+        params.extend(asset_class_filter)
+    
+    return clause, params
+
+def _apply_filters(df: pd.DataFrame, account_filter: list = None, product_filter: list = None,
+                   asset_class_filter: list = None) -> pd.DataFrame:
+    """Mêmes filtres que _build_filter_clause sur un DataFrame (colonnes account_id, symbol, product_type)"""
+    mask = pd.Series(True, index=df.index)
+    if account_filter:
+        mask &= df['account_id'].isin([int(account_id) for account_id in account_filter])
+    if product_filter:
+        mask &= df['symbol'].isin(product_filter)
+    if asset_class_filter:
+        mask &= df['product_type'].isin(asset_class_filter)
+    return df[mask].reset_index(drop=True)
+
 class PortfolioTracker:
     """Gestionnaire principal du portefeuille financier"""
     
@@ -16,6 +96,17 @@ class PortfolioTracker:
         self.db = DatabaseManager(db_path)
         self.currency_converter = CurrencyConverter()
         self.yahoo_utils = YahooFinanceUtils()
+        self.lots = LotEngine(self.db)
+        self.prices = PriceMatrix(self.db)
+        self.exchange_rates = ExchangeRates(self.db)
+        self.returns = ReturnsCalculator(self.db, self.prices)
+        self.performance = PeriodPerformance(self.db, self.prices)
+        self.risk = RiskAnalyzer(self.db, self.prices, self.returns)
+        self.correlation = CorrelationAnalyzer(self.db, self.prices)
+        self.scenario = ScenarioSimulator(self.db, self.prices, self._add_summary_metrics)
+        self.projection = ProjectionEngine(self.db, self.prices)
+        self.alerts = AlertEngine(self.db, self.prices)
+        self.importer = TransactionImporter(self.db, self.currency_converter, self.add_financial_products)
     
     # Méthodes pour les plateformes (delegation vers database)
     def add_platform(self, name: str, description: str = "") -> bool:
@@ -43,14 +134,19 @@ class PortfolioTracker:
     def get_accounts(self) -> pd.DataFrame:
         return self.db.get_accounts()
     
+    def get_account_records(self) -> List[Account]:
+        return self.db.get_account_records()
+    
     # Méthodes pour les produits financiers avec détection automatique
-    def add_financial_product(self, symbol: str, manual_name: str = "") -> Tuple[bool, str]:
+    def add_financial_product(self, symbol: str, manual_name: str = "", is_benchmark: bool = False,
+                              history_days: int = 30) -> Tuple[bool, str]:
         """
-        Ajoute un nouveau produit financier avec détection automatique de la devise et des informations
+        Ajoute un nouveau produit financier avec détection automatique de la devise et des informations.
+        Un indice de référence (is_benchmark) est suivi pour comparaison sans apparaître dans les produits.
         """
         try:
-            # Récupérer les informations complètes via Yahoo Finance
-            success, product_info = self.yahoo_utils.get_product_info(symbol)
+            # Récupérer les informations complètes et l'historique récent via Yahoo Finance
+            success, product_info, hist = self._fetch_new_product(symbol, history_days)
             
             if not success:
                 return False, product_info.get('error', 'Erreur inconnue')
@@ -58,58 +154,98 @@ class PortfolioTracker:
             # Utiliser le nom manuel si fourni, sinon celui de Yahoo Finance
             if manual_name.strip():
                 product_info['name'] = manual_name.strip()
+            product_info['is_benchmark'] = int(is_benchmark)
             
-            # Convertir le prix actuel dans toutes les devises
-            current_price = product_info['current_price']
-            currency = product_info['currency']
-            
-            price_eur, price_usd = self.currency_converter.convert_price_to_both(current_price, currency)
-            
-            product_info['current_price_eur'] = price_eur
-            product_info['current_price_usd'] = price_usd
-            
-            # Ajouter à la base de données
-            success, message = self.db.add_financial_product(product_info)
-            
-            if success:
-                # Ajouter quelques points d'historique récent
-                self._add_recent_price_history(symbol, currency)
-            
-            return success, message
+            return self._register_product(product_info, hist)
             
         except Exception as e:
             return False, f"Erreur lors de l'ajout du produit '{symbol}': {str(e)}"
     
-    def _add_recent_price_history(self, symbol: str, currency: str, days: int = 30):
-        """Ajoute l'historique récent des prix pour un nouveau produit"""
+    def add_financial_products(self, symbols: List[str], history_days: int = 30) -> Dict[str, Tuple[bool, str]]:
+        """
+        Ajoute plusieurs produits : les téléchargements (informations, historique récent) sont
+        faits en parallèle, les écritures ensuite une à une. Retourne (succès, message) par symbole.
+        """
+        with ThreadPoolExecutor(max_workers=PRODUCT_FETCH_WORKERS) as pool:
+            fetched = list(pool.map(lambda symbol: self._fetch_new_product(symbol, history_days), symbols))
+        
+        results = {}
+        for symbol, (success, product_info, hist) in zip(symbols, fetched):
+            if success:
+                results[symbol] = self._register_product(product_info, hist)
+            else:
+                results[symbol] = (False, product_info.get('error', 'Erreur inconnue'))
+        return results
+    
+    def _fetch_new_product(self, symbol: str, history_days: int) -> Tuple[bool, Dict, Optional[pd.DataFrame]]:
+        """Téléchargements d'un produit à ajouter : (succès, informations, historique récent ou None)"""
+        success, product_info = self.yahoo_utils.get_product_info(symbol)
+        if not success:
+            return False, product_info, None
+        
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=f"{days}d")
-            
-            if not hist.empty:
-                product = self.db.get_financial_product_by_symbol(symbol)
-                if product is not None:
-                    product_id = product['id']
-                    
-                    # Ajouter l'historique avec conversion EUR/USD
-                    for date, row in hist.iterrows():
-                        price_eur, price_usd = self.currency_converter.convert_price_to_both(
-                            row['Close'], currency
-                        )
-                        
-                        # Insérer dans price_history
-                        import sqlite3
-                        conn = sqlite3.connect(self.db.db_path)
-                        cursor = conn.cursor()
-                        cursor.execute('''INSERT OR REPLACE INTO price_history 
-                                        (product_id, price, price_eur, price_usd, date)
-                                        VALUES (?, ?, ?, ?, ?)''',
-                                      (product_id, row['Close'], price_eur, price_usd, date.date()))
-                        conn.commit()
-                        conn.close()
-                        
+            hist = self.yahoo_utils.get_history(symbol, period=f"{history_days}d")
         except Exception as e:
-            print(f"Erreur lors de l'ajout de l'historique pour {symbol}: {e}")
+            logger.warning(f"Erreur lors de la récupération de l'historique pour {symbol}: {e}")
+            hist = None
+        return True, product_info, hist
+    
+    def _register_product(self, product_info: Dict, hist: Optional[pd.DataFrame]) -> Tuple[bool, str]:
+        """Enregistre un produit téléchargé (prix actuel converti) et son historique récent"""
+        # Convertir le prix actuel dans toutes les devises
+        currency = product_info['currency']
+        price_eur, price_usd = self.currency_converter.convert_price_to_both(product_info['current_price'], currency)
+        
+        product_info['current_price_eur'] = price_eur
+        product_info['current_price_usd'] = price_usd
+        
+        # Ajouter à la base de données
+        success, message = self.db.add_financial_product(product_info)
+        
+        if success and hist is not None and not hist.empty:
+            # Ajouter quelques points d'historique récent
+            product = self.db.get_financial_product_by_symbol(product_info['symbol'])
+            if product is not None:
+                self._save_history(int(product['id']), currency, hist)
+        
+        return success, message
+    
+    def _save_history(self, product_id: int, currency: str, hist: pd.DataFrame,
+                      replace: bool = False) -> List[Dict]:
+        """
+        Enregistre prix de clôture, dividendes et fractionnements d'un historique Yahoo Finance
+        (même téléchargement) avec conversion EUR/USD vectorisée, en une seule transaction.
+        Un fractionnement détecté est appliqué automatiquement aux transactions et à
+        l'historique déjà stockés ; retourne les opérations appliquées.
+        """
+        # Conversion au taux courant : identique pour toutes les lignes
+        rate_eur, rate_usd = self.currency_converter.convert_price_to_both(1.0, currency)
+        
+        closes = hist['Close'].to_numpy(dtype=float)
+        dates = hist.index.strftime('%Y-%m-%d')
+        price_rows = list(zip(dates, closes.tolist(), (closes * rate_eur).tolist(), (closes * rate_usd).tolist()))
+        dividend_rows = [(ex_date, amount, amount * rate_eur, amount * rate_usd)
+                         for ex_date, amount in extract_dividends(hist)]
+        
+        return self.db.save_price_history(product_id, price_rows, dividend_rows,
+                                          split_rows=extract_splits(hist), replace=replace)
+    
+    # Opérations sur titres (fractionnements)
+    def add_split(self, symbol: str, ex_date: datetime, ratio: float) -> Tuple[bool, str]:
+        """Enregistre et applique un fractionnement saisi manuellement (ratio 2 = une part devient deux)"""
+        product = self.db.get_financial_product_by_symbol(symbol)
+        if product is None:
+            return False, f"Produit avec le symbole '{symbol}' non trouvé"
+        return self.db.add_split(int(product['id']), ex_date, ratio)
+    
+    def get_corporate_actions(self) -> pd.DataFrame:
+        return self.db.get_corporate_actions()
+    
+    def get_corporate_action_audit(self, action_id: int) -> pd.DataFrame:
+        return self.db.get_corporate_action_audit(action_id)
+    
+    def get_dividends(self, product_id: Optional[int] = None) -> pd.DataFrame:
+        return self.db.get_dividends(product_id)
     
     def update_financial_product(self, product_id: int, symbol: str, name: str, 
                                product_type: str, currency: str) -> bool:
@@ -118,17 +254,27 @@ class PortfolioTracker:
     def delete_financial_product(self, product_id: int) -> Tuple[bool, str]:
         return self.db.delete_financial_product(product_id)
     
-    def get_financial_products(self) -> pd.DataFrame:
-        return self.db.get_financial_products()
+    def get_financial_products(self, include_benchmarks: bool = False) -> pd.DataFrame:
+        return self.db.get_financial_products(include_benchmarks)
     
-    def get_financial_product_by_id(self, product_id: int) -> Optional[pd.Series]:
-        """Récupère un produit financier par son ID"""
-        products = self.get_financial_products()
-        if not products.empty:
-            result = products[products['id'] == product_id]
-            if not result.empty:
-                return result.iloc[0]
-        return None
+    def get_product_records(self, include_benchmarks: bool = False) -> List[Product]:
+        return self.db.get_product_records(include_benchmarks)
+    
+    # Indices de référence (suivis dans price_history, jamais détenus)
+    def add_benchmark(self, symbol: str, years: int = 5) -> Tuple[bool, str]:
+        """Ajoute un indice de référence avec son historique de prix"""
+        return self.add_financial_product(symbol, is_benchmark=True, history_days=years * 365)
+    
+    def get_benchmarks(self) -> pd.DataFrame:
+        return self.db.get_benchmarks()
+    
+    def get_financial_product_by_id(self, product_id: int) -> Optional[Product]:
+        """Récupère un produit financier par son ID (dimension produits en mémoire)"""
+        return self.db.get_product_dimension().get(product_id)
+    
+    def get_financial_product_by_symbol(self, symbol: str) -> Optional[Product]:
+        """Récupère un produit financier par son symbole (dimension produits en mémoire)"""
+        return self.db.get_product_dimension().get_by_symbol(symbol)
     
     # Méthodes pour les transactions avec conversion automatique
     def add_transaction(self, account_id: int, product_symbol: str, transaction_type: str,
@@ -136,8 +282,12 @@ class PortfolioTracker:
                        transaction_date: datetime, fees: float = 0, fees_currency: str = "EUR"):
         """
         Ajoute une nouvelle transaction avec conversion automatique des devises
-        en utilisant les taux de change de la date de transaction
+        en utilisant les taux de change de la date de transaction.
+        Pour un dividende (DIVIDEND), quantity est le nombre de parts et price le montant par part.
         """
+        if transaction_type not in TRANSACTION_TYPES:
+            raise ValueError(f"Type de transaction inconnu : {transaction_type}")
+        
         # Récupérer l'ID du produit
         product = self.db.get_financial_product_by_symbol(product_symbol)
         if product is None:
@@ -173,13 +323,33 @@ class PortfolioTracker:
             price_eur, price_usd, transaction_date, fees_eur, fees_currency, exchange_rate_eur_usd
         )
     
+    def import_transactions(self, data: pd.DataFrame, create_missing_products: bool = True,
+                            dry_run: bool = False) -> Dict:
+        """Import de transactions en lot (voir TransactionImporter.import_transactions)"""
+        return self.importer.import_transactions(data, create_missing_products, dry_run)
+    
     def get_all_transactions(self) -> pd.DataFrame:
         return self.db.get_all_transactions()
     
+    def get_transaction_records(self, filters: Dict = None) -> List[Transaction]:
+        """Transactions filtrées par ordre chronologique, sous forme d'enregistrements (sans pandas)"""
+        return self.db.get_transaction_records(filters)
+    
+    def query_transactions(self, filters: Dict = None, order: str = 'desc', limit: Optional[int] = 50,
+                           cursor: Tuple[str, int] = None) -> Tuple[pd.DataFrame, Optional[Tuple[str, int]]]:
+        """Page de transactions filtrée en SQL, paginée par clé (date, id)"""
+        return self.db.query_transactions(filters, order, limit, cursor)
+    
+    def get_transaction_stats(self, filters: Dict = None) -> Dict:
+        return self.db.get_transaction_stats(filters)
+    
     def update_transaction(self, transaction_id: int, account_id: int, product_symbol: str, 
                           transaction_type: str, quantity: float, price: float, price_currency: str,
                           transaction_date: datetime, fees: float = 0) -> Tuple[bool, str]:
         """Met à jour une transaction avec support du changement de devise"""
+        if transaction_type not in TRANSACTION_TYPES:
+            return False, f"Type de transaction inconnu : {transaction_type}"
+        
         try:
             # Récupérer l'ID du produit
             product = self.db.get_financial_product_by_symbol(product_symbol)
@@ -222,6 +392,7 @@ class PortfolioTracker:
             success = cursor.rowcount > 0
             conn.commit()
             conn.close()
+            self.db.mark_written()
             
             if success:
                 return True, f"Transaction mise à jour avec succès! Prix: {price:.2f} {price_currency} (converti: {price_eur:.2f} EUR / {price_usd:.2f} USD)"
@@ -242,156 +413,186 @@ class PortfolioTracker:
         
         conn.commit()
         conn.close()
+        self.db.mark_written()
         
         return success, "Transaction supprimée avec succès" if success else "Transaction non trouvée"
     
-    def get_transaction_by_id(self, transaction_id: int) -> Optional[dict]:
+    def get_transaction_by_id(self, transaction_id: int) -> Optional[Transaction]:
         """Récupère une transaction spécifique par son ID"""
-        transactions = self.get_all_transactions()
-        if not transactions.empty:
-            transaction = transactions[transactions['id'] == transaction_id]
-            if not transaction.empty:
-                return transaction.iloc[0].to_dict()
-        return None
+        return self.db.get_transaction(transaction_id)
     
     # Méthodes pour la mise à jour des prix
-    def update_price(self, symbol: str, days_history: int = 30) -> bool:
-        """Met à jour le prix d'un produit avec historique"""
+    def update_price(self, symbol: str, days_history: int = 30, reporter: ProgressReporter = NULL_REPORTER) -> bool:
+        """
+        Met à jour le prix d'un produit avec historique.
+        Les mises à jour concurrentes du même (symbole, plage) partagent un seul
+        téléchargement et une seule écriture dans price_history.
+        """
+        key = (self.db.db_path, symbol.upper(), days_history)
+        return _price_update_flight.do(key, self._update_price, symbol, days_history, reporter)
+    
+    def _update_price(self, symbol: str, days_history: int, reporter: ProgressReporter) -> bool:
+        """Télécharge et enregistre le prix d'un produit (voir update_price)"""
         try:
-            ticker = yf.Ticker(symbol)
-            hist = ticker.history(period=f"{days_history}d")
-            
-            if not hist.empty:
-                current_price = hist['Close'].iloc[-1]
-                
-                # Récupérer la devise du produit
-                product = self.db.get_financial_product_by_symbol(symbol)
-                if product is None:
-                    return False
-                
-                product_currency = product['currency']
-                
-                # Convertir le prix actuel dans les deux devises
-                price_eur, price_usd = self.currency_converter.convert_price_to_both(
-                    current_price, product_currency
-                )
-                
-                # Mettre à jour le prix actuel
-                self.db.update_product_price(symbol, current_price, price_eur, price_usd)
-                
-                # Ajouter l'historique récent
-                product_id = product['id']
-                import sqlite3
-                conn = sqlite3.connect(self.db.db_path)
-                cursor = conn.cursor()
-                
-                for date, row in hist.iterrows():
-                    hist_price_eur, hist_price_usd = self.currency_converter.convert_price_to_both(
-                        row['Close'], product_currency
-                    )
-                    cursor.execute('''INSERT OR REPLACE INTO price_history 
-                                    (product_id, price, price_eur, price_usd, date)
-                                    VALUES (?, ?, ?, ?, ?)''',
-                                  (product_id, row['Close'], hist_price_eur, hist_price_usd, date.date()))
-                
-                conn.commit()
-                conn.close()
-                return True
-                
+            hist = self.yahoo_utils.get_history(symbol, period=f"{days_history}d")
+            product = self.db.get_financial_product_by_symbol(symbol)
+            if product is None:
+                return False
+            return self._store_recent_history(int(product['id']), symbol, product['currency'], hist, reporter)
         except Exception as e:
-            st.error(f"Erreur lors de la mise à jour du prix pour {symbol}: {e}")
+            reporter.message('error', f"Erreur lors de la mise à jour du prix pour {symbol}: {e}")
             return False
     
-    def update_all_prices(self, days_history: int = 30):
-        """Met à jour tous les prix avec historique"""
-        products = self.get_financial_products()
-        if products.empty:
-            return
-            
-        progress_bar = st.progress(0)
-        status_text = st.empty()
-        
-        for i, row in products.iterrows():
-            status_text.text(f"Mise à jour de {row['symbol']} ({i+1}/{len(products)})")
-            success = self.update_price(row['symbol'], days_history)
-            if success:
-                st.success(f"✅ {row['symbol']} mis à jour")
-            else:
-                st.error(f"❌ Erreur pour {row['symbol']}")
-            progress_bar.progress((i + 1) / len(products))
-            time.sleep(0.5)  # Éviter de surcharger l'API
+    def _store_recent_history(self, product_id: int, symbol: str, currency: str, hist: pd.DataFrame,
+                              reporter: ProgressReporter) -> bool:
+        """
+        Enregistre le dernier cours comme prix actuel, puis l'historique récent, les dividendes et
+        fractionnements du même téléchargement. False si l'historique est vide.
+        """
+        if hist.empty:
+            return False
         
-        progress_bar.empty()
-        status_text.empty()
+        # Convertir le prix actuel dans les deux devises
+        current_price = hist['Close'].iloc[-1]
+        price_eur, price_usd = self.currency_converter.convert_price_to_both(current_price, currency)
+        self.db.update_product_price(symbol, current_price, price_eur, price_usd)
+        
+        applied = self._save_history(product_id, currency, hist)
+        for action in applied:
+            reporter.message('info', f"✂️ Fractionnement de {symbol} ({action['ratio']:g} pour 1) au "
+                                     f"{action['ex_date']} : {action['transactions_adjusted']} "
+                                     f"transaction(s) ajustée(s)")
+        return True
     
-    def initialize_price_history(self, days: int = 365):
-        """Initialise l'historique des prix pour tous les produits"""
-        products = self.get_financial_products()
-        if products.empty:
-            return
+    def update_all_prices(self, days_history: int = 30, reporter: ProgressReporter = NULL_REPORTER) -> Dict:
+        """
+        Met à jour tous les prix avec historique (indices de référence compris) à partir d'un seul
+        téléchargement groupé, puis évalue les alertes. Retourne le nombre de produits mis à jour,
+        en échec et d'alertes déclenchées.
+        """
+        result = {'updated': 0, 'failed': 0, 'alerts': 0}
+        products = self.db.get_product_records(include_benchmarks=True)
+        if not products:
+            return result
         
-        progress_bar = st.progress(0)
-        status_text = st.empty()
+        reporter.progress(0, len(products), f"Téléchargement des prix de {len(products)} produit(s)")
+        try:
+            histories = self.yahoo_utils.get_histories([product.symbol for product in products],
+                                                       period=f"{days_history}d")
+        except Exception as e:
+            reporter.message('error', f"Erreur lors du téléchargement des prix : {e}")
+            histories = {}
+        
+        for i, product in enumerate(products):
+            reporter.progress(i, len(products), f"Mise à jour de {product.symbol} ({i+1}/{len(products)})")
+            hist = histories.get(product.symbol.upper())
+            try:
+                updated = hist is not None and self._store_recent_history(product.id, product.symbol,
+                                                                          product.currency, hist, reporter)
+            except Exception as e:
+                reporter.message('error', f"Erreur lors de la mise à jour du prix pour {product.symbol}: {e}")
+                updated = False
+            
+            if updated:
+                result['updated'] += 1
+                reporter.message('success', f"✅ {product.symbol} mis à jour")
+            else:
+                result['failed'] += 1
+                reporter.message('error', f"❌ Erreur pour {product.symbol}")
+        
+        reporter.progress(len(products), len(products))
+        reporter.close()
+        
+        # Alertes évaluées en lot sur les prix fraîchement mis à jour
+        fired = self.check_alerts()
+        result['alerts'] = len(fired)
+        if not fired.empty:
+            reporter.message('warning', f"🔔 {len(fired)} alerte(s) déclenchée(s)")
+        return result
+    
+    def initialize_price_history(self, days: int = 365, reporter: ProgressReporter = NULL_REPORTER,
+                                 delay: float = 1.0) -> Dict:
+        """
+        Initialise l'historique des prix pour tous les produits (indices de référence compris).
+        Retourne le nombre de produits initialisés, sans données ou en échec et de prix enregistrés.
+        """
+        result = {'initialized': 0, 'empty': 0, 'failed': 0, 'rows': 0}
+        products = self.db.get_product_records(include_benchmarks=True)
+        if not products:
+            return result
         
-        for i, row in products.iterrows():
-            status_text.text(f"Initialisation de l'historique pour {row['symbol']} ({i+1}/{len(products)})")
+        for i, product in enumerate(products):
+            reporter.progress(i, len(products),
+                              f"Initialisation de l'historique pour {product.symbol} ({i+1}/{len(products)})")
             
             try:
-                ticker = yf.Ticker(row['symbol'])
-                hist = ticker.history(period=f"{days}d")
+                hist = self.yahoo_utils.get_history(product.symbol, period=f"{days}d")
                 
                 if not hist.empty:
-                    import sqlite3
-                    conn = sqlite3.connect(self.db.db_path)
-                    cursor = conn.cursor()
-                    
-                    # Nettoyer l'ancien historique
-                    cursor.execute("DELETE FROM price_history WHERE product_id = ?", (row['id'],))
-                    
-                    # Ajouter le nouvel historique avec conversion
-                    for date, row_data in hist.iterrows():
-                        price_eur, price_usd = self.currency_converter.convert_price_to_both(
-                            row_data['Close'], row['currency']
-                        )
-                        cursor.execute('''INSERT INTO price_history (product_id, price, price_eur, price_usd, date)
-                                        VALUES (?, ?, ?, ?, ?)''',
-                                      (row['id'], row_data['Close'], price_eur, price_usd, date.date()))
+                    # Remplacer l'ancien historique (prix et dividendes) avec conversion
+                    self._save_history(product.id, product.currency, hist, replace=True)
                     
                     # Mettre à jour le prix actuel
                     current_price = hist['Close'].iloc[-1]
                     current_price_eur, current_price_usd = self.currency_converter.convert_price_to_both(
-                        current_price, row['currency']
+                        current_price, product.currency
                     )
-                    cursor.execute('''UPDATE financial_products 
-                                    SET current_price = ?, current_price_eur = ?, current_price_usd = ?, last_updated = ?
-                                    WHERE id = ?''',
-                                  (current_price, current_price_eur, current_price_usd, datetime.now(), row['id']))
+                    self.db.update_product_price(product.symbol, current_price, current_price_eur, current_price_usd)
                     
-                    conn.commit()
-                    conn.close()
-                    
-                    st.success(f"✅ Historique de {row['symbol']} initialisé ({len(hist)} jours)")
+                    result['initialized'] += 1
+                    result['rows'] += len(hist)
+                    reporter.message('success', f"✅ Historique de {product.symbol} initialisé ({len(hist)} jours)")
                 else:
-                    st.warning(f"⚠️ Aucune donnée trouvée pour {row['symbol']}")
+                    result['empty'] += 1
+                    reporter.message('warning', f"⚠️ Aucune donnée trouvée pour {product.symbol}")
                     
             except Exception as e:
-                st.error(f"❌ Erreur pour {row['symbol']}: {e}")
+                result['failed'] += 1
+                reporter.message('error', f"❌ Erreur pour {product.symbol}: {e}")
             
-            progress_bar.progress((i + 1) / len(products))
-            time.sleep(1)  # Délai pour éviter les limitations d'API
+            time.sleep(delay)  # Délai pour éviter les limitations d'API
         
-        progress_bar.empty()
-        status_text.empty()
-        st.success("🎉 Initialisation de l'historique terminée!")
+        reporter.progress(len(products), len(products))
+        reporter.close()
+        reporter.message('success', "🎉 Initialisation de l'historique terminée!")
+        return result
     
     # Méthodes d'analyse du portefeuille
-    def get_portfolio_summary(self) -> pd.DataFrame:
-        """Calcule le résumé du portefeuille en utilisant les prix EUR stockés"""
+    def get_portfolio_summary(self, account_filter: list = None, product_filter: list = None,
+                              asset_class_filter: list = None, currency: str = 'EUR') -> pd.DataFrame:
+        """
+        Calcule le résumé du portefeuille depuis la table positions et les prix stockés, valorisé
+        dans la devise demandée (voir get_reporting_currencies).
+        Les filtres (ids de comptes, symboles, classes d'actifs) sont appliqués dans la requête SQL.
+        """
+        if currency not in self.get_reporting_currencies():
+            raise ValueError(f"Devise de résumé non supportée : {currency}")
+        
+        filters = tuple(tuple(values) if values else None
+                        for values in (account_filter, product_filter, asset_class_filter))
+        df = _summary_cache.get_or_compute(
+            (self.db.db_path, filters), self.db.get_data_version(),
+            self._load_summary, account_filter, product_filter, asset_class_filter
+        ).copy()
+        
+        if not df.empty:
+            rate = 1.0 if currency in STORED_CURRENCIES else self.exchange_rates.get_current_rate(currency)
+            self._add_summary_metrics(df, currency, rate)
+        
+        return df
+    
+    def _load_summary(self, account_filter: list = None, product_filter: list = None,
+                      asset_class_filter: list = None) -> pd.DataFrame:
+        """Lignes brutes du résumé (colonnes EUR et USD), avant le choix de la devise"""
         import sqlite3
         conn = sqlite3.connect(self.db.db_path)
         
-        query = '''
+        filter_clause, params = _build_filter_clause(account_filter, product_filter, asset_class_filter)
+        
+        # Positions maintenues par triggers : coût proportionnel au nombre de positions ouvertes
+        query = f'''
             SELECT 
+                fp.id as product_id,
                 fp.symbol,
                 fp.name,
                 fp.current_price,
@@ -399,46 +600,161 @@ class PortfolioTracker:
                 fp.current_price_usd,
                 fp.currency,
                 fp.product_type,
+                a.id as account_id,
                 a.name as account_name,
                 p.name as platform_name,
-                SUM(CASE WHEN t.transaction_type = 'BUY' THEN t.quantity 
-                         WHEN t.transaction_type = 'SELL' THEN -t.quantity 
-                         ELSE 0 END) as total_quantity,
-                AVG(CASE WHEN t.transaction_type = 'BUY' THEN t.price_eur ELSE NULL END) as avg_buy_price_eur,
-                SUM(CASE WHEN t.transaction_type = 'BUY' THEN t.quantity * t.price_eur + COALESCE(t.fees, 0)
-                         WHEN t.transaction_type = 'SELL' THEN -t.quantity * t.price_eur - COALESCE(t.fees, 0)
-                         ELSE 0 END) as total_invested_eur
-            FROM transactions t
-            JOIN financial_products fp ON t.product_id = fp.id
-            JOIN accounts a ON t.account_id = a.id
+                pos.quantity as total_quantity,
+                pos.buy_price_eur_sum / NULLIF(pos.buy_count, 0) as avg_buy_price_eur,
+                pos.buy_price_usd_sum / NULLIF(pos.buy_count, 0) as avg_buy_price_usd,
+                pos.invested_eur as total_invested_eur,
+                pos.invested_usd as total_invested_usd,
+                pos.dividends_eur as total_dividends_eur,
+                pos.dividends_usd as total_dividends_usd,
+                pos.last_transaction_date
+            FROM positions pos
+            JOIN financial_products fp ON pos.product_id = fp.id
+            JOIN accounts a ON pos.account_id = a.id
             JOIN platforms p ON a.platform_id = p.id
-            GROUP BY fp.symbol, a.id
-            HAVING total_quantity > 0
+            WHERE pos.quantity > {POSITION_EPSILON} {filter_clause}
         '''
         
-        df = pd.read_sql_query(query, conn)
+        df = pd.read_sql_query(query, conn, params=params)
         conn.close()
         
-        if not df.empty:
-            # Utiliser les prix EUR stockés
-            df['current_price_eur'] = df['current_price_eur'].fillna(0)
-            df['avg_buy_price_eur'] = df['avg_buy_price_eur'].fillna(0)
-            df['total_invested_eur'] = df['total_invested_eur'].fillna(0)
-            
-            df['current_value'] = df['total_quantity'] * df['current_price_eur']
-            df['gain_loss'] = df['current_value'] - df['total_invested_eur']
-            df['gain_loss_pct'] = df.apply(
-                lambda row: (row['gain_loss'] / row['total_invested_eur']) * 100 
-                if row['total_invested_eur'] > 0 else 0, 
-                axis=1
-            )
-            
-            # Colonnes pour compatibilité
-            df['total_invested'] = df['total_invested_eur']
-            df['avg_buy_price'] = df['avg_buy_price_eur']
-        
         return df
     
+    @staticmethod
+    def _add_summary_metrics(df: pd.DataFrame, currency: str = 'EUR', rate: float = 1.0):
+        """
+        Ajoute les colonnes dérivées (valeur, plus-value...) au résumé, en calcul vectorisé.
+        La plus-value inclut les dividendes nets perçus (rendement total).
+        EUR et USD utilisent les colonnes stockées ; une autre devise convertit les
+        montants EUR au taux rate (EUR → devise).
+        """
+        suffix = currency.lower() if currency in STORED_CURRENCIES else 'eur'
+        
+        for column in ['current_price_eur', 'current_price_usd', 'avg_buy_price_eur', 'avg_buy_price_usd',
+                       'total_invested_eur', 'total_invested_usd', 'total_dividends_eur', 'total_dividends_usd']:
+            df[column] = df[column].fillna(0)
+        
+        quantity = df['total_quantity'].to_numpy(dtype=float)
+        current_price = df[f'current_price_{suffix}'].to_numpy(dtype=float) * rate
+        invested = df[f'total_invested_{suffix}'].to_numpy(dtype=float) * rate
+        dividends = df[f'total_dividends_{suffix}'].to_numpy(dtype=float) * rate
+        
+        current_value = quantity * current_price
+        gain_loss = current_value - invested + dividends
+        
+        df['current_value'] = current_value
+        df['total_dividends'] = dividends
+        df['gain_loss'] = gain_loss
+        df['gain_loss_pct'] = np.divide(gain_loss * 100, invested,
+                                        out=np.zeros_like(gain_loss), where=invested > 0)
+        
+        # Colonnes génériques dans la devise demandée (compatibilité)
+        df['total_invested'] = invested
+        df['avg_buy_price'] = df[f'avg_buy_price_{suffix}'] * rate
+        df['current_price_report'] = current_price
+        df['report_currency'] = currency
+    
+    def get_realized_pnl(self, method: str = 'FIFO', account_filter: list = None, product_filter: list = None,
+                         asset_class_filter: list = None, currency: str = 'EUR') -> pd.DataFrame:
+        """
+        Plus-values réalisées par année (FIFO ou PRU), mises à jour de manière incrémentale et
+        filtrées comme le résumé. proceeds, cost et realized reprennent les colonnes *_eur
+        converties au taux actuel dans la devise demandée.
+        """
+        realized = _apply_filters(self.lots.get_realized_pnl(method), account_filter, product_filter,
+                                  asset_class_filter)
+        realized[['proceeds', 'cost', 'realized']] = (
+            realized[['proceeds_eur', 'cost_eur', 'realized_eur']].to_numpy(dtype=float)
+            * self.exchange_rates.get_current_rate(currency))
+        return realized
+    
+    def get_unrealized_pnl(self, method: str = 'FIFO', account_filter: list = None, product_filter: list = None,
+                           asset_class_filter: list = None, currency: str = 'EUR') -> pd.DataFrame:
+        """
+        Plus-values latentes par position selon le coût des lots ouverts (FIFO ou PRU), filtrées
+        comme le résumé. unit_cost, cost, current_value et unrealized sont convertis au taux
+        actuel dans la devise demandée.
+        """
+        unrealized = _apply_filters(self.lots.get_unrealized_pnl(method), account_filter, product_filter,
+                                    asset_class_filter)
+        if not unrealized.empty:
+            unrealized[['unit_cost', 'cost', 'current_value', 'unrealized']] = (
+                unrealized[['unit_cost_eur', 'cost_eur', 'current_value', 'unrealized_eur']].to_numpy(dtype=float)
+                * self.exchange_rates.get_current_rate(currency))
+        return unrealized
+    
+    def get_returns(self, start_date: datetime = None, end_date: datetime = None) -> pd.DataFrame:
+        """Performances TWR et TRI (XIRR) par compte, plateforme et pour le portefeuille"""
+        return self.returns.get_returns(start_date, end_date)
+    
+    def get_risk_metrics(self, window_days: int = 365) -> pd.DataFrame:
+        """Volatilité, perte maximale, Sharpe, bêta et VaR par produit, compte, plateforme et portefeuille"""
+        return self.risk.get_risk_metrics(window_days)
+    
+    def get_risk_series(self) -> Dict[str, pd.DataFrame]:
+        """Volatilité glissante et drawdown quotidiens des comptes, plateformes et du portefeuille"""
+        return self.risk.get_risk_series()
+    
+    # Méthodes pour les alertes de prix
+    def add_alert(self, symbol: str, alert_type: str, threshold: float,
+                  window_days: int = None, note: str = "") -> Tuple[bool, str]:
+        product = self.db.get_financial_product_by_symbol(symbol)
+        if product is None:
+            return False, f"Produit '{symbol}' non trouvé"
+        return self.alerts.add_alert(int(product['id']), alert_type, threshold, window_days, note)
+    
+    def delete_alert(self, alert_id: int) -> bool:
+        return self.alerts.delete_alert(alert_id)
+    
+    def set_alert_active(self, alert_id: int, active: bool) -> bool:
+        return self.alerts.set_alert_active(alert_id, active)
+    
+    def get_alerts(self) -> pd.DataFrame:
+        return self.alerts.get_alerts()
+    
+    def get_alert_events(self, unacknowledged_only: bool = True, limit: int = 50) -> pd.DataFrame:
+        return self.alerts.get_alert_events(unacknowledged_only, limit)
+    
+    def acknowledge_alert_events(self, event_ids: list = None) -> int:
+        return self.alerts.acknowledge_events(event_ids)
+    
+    def check_alerts(self) -> pd.DataFrame:
+        """Évalue toutes les alertes actives en une passe et enregistre les nouveaux déclenchements"""
+        return self.alerts.check_alerts()
+    
+    def get_period_performance(self, start_date: datetime = None, currency: str = 'EUR') -> pd.DataFrame:
+        """
+        Performance de chaque position sur 1D / 1W / 1M / YTD / 1Y et depuis start_date (achats en cours de période inclus).
+        Les montants (value, gain_*) sont convertis au taux actuel dans la devise demandée.
+        """
+        performance = self.performance.get_period_performance(start_date)
+        if currency != 'EUR' and not performance.empty:
+            amounts = ['value'] + [column for column in performance.columns if column.startswith('gain_')]
+            performance[amounts] = performance[amounts] * self.exchange_rates.get_current_rate(currency)
+        return performance
+    
+    def get_correlation(self, product_ids: List[int] = None, window_days: int = 365) -> Dict:
+        """Corrélations, covariance et diversification (nombre effectif de paris) des positions ouvertes"""
+        return self.correlation.get_correlation(product_ids, window_days)
+    
+    def simulate_scenario(self, trades: List[Dict], window_days: int = 365) -> Dict:
+        """Effet d'opérations hypothétiques (non enregistrées) sur la répartition, le risque et la performance passée"""
+        return self.scenario.evaluate(self.get_portfolio_summary(), trades, window_days)
+    
+    def propose_rebalancing(self, targets: Dict[str, float], contribution: float = 0.0,
+                            allow_sells: bool = True, candidates: Dict[str, str] = None) -> Tuple[List[Dict], List[str]]:
+        """Opérations (montants EUR) rapprochant la répartition par classe d'actifs des poids cibles"""
+        return propose_rebalancing(self.get_portfolio_summary(), targets, contribution, allow_sells, candidates)
+    
+    def project_wealth(self, years: int = 20, n_paths: int = 10_000, monthly_contribution: float = 0.0,
+                       method: str = 'bootstrap', seed: int = 42, window_days: int = None) -> Dict:
+        """Projection Monte-Carlo du patrimoine (bandes de percentiles) avec versements mensuels"""
+        return self.projection.project(self.get_portfolio_summary(), years, n_paths, monthly_contribution,
+                                       method, seed, window_days)
+    
     def get_price_history(self, symbol: str, start_date: datetime, end_date: datetime) -> pd.DataFrame:
         """Récupère l'historique des prix pour un produit sur une période"""
         import sqlite3
@@ -459,218 +775,211 @@ class PortfolioTracker:
         
         return df
     
+    def get_price_points(self, symbol: str, start_date: datetime, end_date: datetime) -> List[PricePoint]:
+        """Historique des prix d'un produit sur une période, sous forme d'enregistrements PricePoint"""
+        product = self.get_financial_product_by_symbol(symbol)
+        return self.db.get_price_points(product.id, start_date, end_date) if product is not None else []
+    
+    def get_incremental_history_days(self, default_days: int = 30, max_days: int = 365) -> int:
+        """
+        Jours d'historique à télécharger pour compléter les prix depuis la dernière mise à jour
+        (celle du produit le moins à jour, jour en cours compris), default_days si un produit
+        n'a encore aucun historique, au plus max_days
+        """
+        oldest = self.db.get_oldest_last_price_date()
+        if oldest is None:
+            return default_days
+        return max(1, min((datetime.now() - oldest).days + 1, max_days))
+    
+    def get_reporting_currencies(self) -> List[str]:
+        """Devises de valorisation : EUR, USD et toute devise disposant d'une série de taux historiques"""
+        return self.exchange_rates.get_currencies()
+    
     def get_portfolio_evolution(self, start_date: datetime, end_date: datetime, 
                                account_filter: list = None, product_filter: list = None, 
-                               asset_class_filter: list = None) -> pd.DataFrame:
-        """Calcule l'évolution de la valeur du portefeuille dans le temps avec les nouveaux prix EUR/USD"""
+                               asset_class_filter: list = None, currency: str = 'EUR',
+                               frequency: Optional[str] = None) -> pd.DataFrame:
+        """
+        Évolution de la valeur du portefeuille dans le temps, valorisée dans la devise demandée.
+        La série quotidienne complète (EUR) est calculée une fois par jeu de filtres, par jour et
+        par version des données : chaque période n'en est qu'une tranche, éventuellement
+        rééchantillonnée (frequency : 'W', 'M'... garde le premier jour de la tranche et le
+        dernier jour de chaque période), convertie au taux de chaque date.
+        """
+        filters = tuple(tuple(values) if values else None
+                        for values in (account_filter, product_filter, asset_class_filter))
+        today = pd.Timestamp.today().normalize()
+        daily = _evolution_cache.get_or_compute(
+            (self.db.db_path, filters, today), self.db.get_data_version(),
+            self._compute_daily_evolution, today, account_filter, product_filter, asset_class_filter
+        )
+        if daily.empty:
+            return daily.copy()
+        
+        in_period = daily['date'].between(pd.Timestamp(start_date).normalize(), pd.Timestamp(end_date).normalize())
+        evolution = daily[in_period]
+        if frequency and not evolution.empty:
+            period_ends = ~evolution['date'].dt.to_period(frequency).duplicated(keep='last')
+            period_ends.iloc[0] = True
+            evolution = evolution[period_ends]
+        evolution = evolution.reset_index(drop=True)
+        if evolution.empty or currency == 'EUR':
+            return evolution
+        
+        rates = self.exchange_rates.get_rates(currency, evolution['date'])
+        for column in ['total_value', 'total_invested', 'total_dividends', 'gain_loss']:
+            evolution[column] = evolution[column].to_numpy(dtype=float) * rates
+        for column in EVOLUTION_BREAKDOWNS:
+            evolution[column] = [{key: value * rate for key, value in breakdown.items()}
+                                 for breakdown, rate in zip(evolution[column], rates)]
+        return evolution
+    
+    def _compute_daily_evolution(self, today: pd.Timestamp, account_filter: list = None,
+                                 product_filter: list = None, asset_class_filter: list = None) -> pd.DataFrame:
+        """
+        Évolution quotidienne (EUR) du jour de la première transaction à aujourd'hui.
+        Les positions sont suivies par (compte, produit) : quantité et montant investi après
+        chaque transaction (une vente réduit l'investi au prorata), reportés sur chaque jour
+        puis valorisés sur la matrice de prix (dernier prix connu sur 7 jours, sinon prix actuel).
+        """
         import sqlite3
+        
+        # Transactions (enregistrements, sans DataFrame) par ordre chronologique
+        filter_clause, filter_params = _build_filter_clause(account_filter, product_filter, asset_class_filter)
         conn = sqlite3.connect(self.db.db_path)
+        conn.row_factory = Transaction.row_factory
+        transactions = conn.execute(
+            TRANSACTION_LIST_QUERY + ' WHERE date(t.transaction_date) <= ?' + filter_clause
+            + ' ORDER BY t.transaction_date, t.id',
+            [today.strftime('%Y-%m-%d')] + filter_params
+        ).fetchall()
+        conn.close()
         
-        # Base query pour récupérer les transactions
-        base_query = '''
-            SELECT 
-                t.transaction_date,
-                t.transaction_type,
-                t.quantity,
-                t.price_eur,
-                t.fees,
-                fp.symbol,
-                fp.name,
-                fp.product_type,
-                fp.currency,
-                a.id as account_id,
-                a.name as account_name,
-                p.name as platform_name
+        if not transactions:
+            return pd.DataFrame()
+        
+        # État (quantité, montant investi) de chaque position après chaque transaction
+        positions = {}
+        states = []
+        dividends = []
+        for trans in transactions:
+            day = pd.Timestamp(trans.transaction_date).normalize()
+            amount = trans.quantity * (trans.price_eur or 0)
+            fees = trans.fees or 0
+            if trans.transaction_type == 'DIVIDEND':
+                # Revenu perçu : ni la quantité ni le montant investi ne changent
+                dividends.append((day, amount - fees))
+                continue
+            
+            key = (trans.account_id, trans.product_id)
+            if key not in positions:
+                positions[key] = {'column': len(positions), 'quantity': 0.0, 'invested': 0.0, 'transaction': trans}
+            position = positions[key]
+            if trans.transaction_type == 'BUY':
+                position['quantity'] += trans.quantity
+                position['invested'] += amount + fees
+            elif trans.transaction_type == 'SELL':
+                if position['quantity'] > 0:
+                    position['invested'] *= (1 - trans.quantity / position['quantity'])
+                position['quantity'] -= trans.quantity
+                if position['quantity'] < 0:
+                    position['quantity'] = 0.0
+                    position['invested'] = 0.0
+            states.append((day, position['column'], position['quantity'], position['invested']))
+        
+        first_day = pd.Timestamp(transactions[0].transaction_date).normalize()
+        days = pd.date_range(first_day, today, freq='D')
+        columns = range(len(positions))
+        
+        # Dernier état de chaque position par jour, reporté sur les jours suivants
+        states = pd.DataFrame(states, columns=['day', 'column', 'quantity', 'invested'])
+        last_states = states.groupby(['day', 'column']).last()
+        quantity = last_states['quantity'].unstack().reindex(index=days, columns=columns).ffill().fillna(0).to_numpy()
+        invested = last_states['invested'].unstack().reindex(index=days, columns=columns).ffill().fillna(0).to_numpy()
+        
+        # Prix EUR de chaque position (colonnes de la matrice par produit)
+        held_products = [position['transaction'].product_id for position in positions.values()]
+        product_ids = sorted(set(held_products))
+        price_matrix = self.prices.get(first_day, today, product_ids=product_ids).to_numpy(dtype=float)
+        prices = np.nan_to_num(price_matrix[:, np.searchsorted(product_ids, held_products)])
+        
+        held = quantity > POSITION_EPSILON
+        valued = held & (prices > 0)
+        values = np.where(valued, quantity * prices, 0.0)
+        
+        dividends = pd.DataFrame(dividends, columns=['day', 'amount']).groupby('day')['amount'].sum()
+        total_dividends = dividends.reindex(days, fill_value=0).cumsum().to_numpy(dtype=float)
+        
+        total_value = values.sum(axis=1)
+        total_invested = np.where(held, invested, 0.0).sum(axis=1)
+        evolution = pd.DataFrame({
+            'date': days,
+            'total_value': total_value,
+            'total_invested': total_invested,
+            'total_dividends': total_dividends,
+            'gain_loss': total_value - total_invested + total_dividends,
+        })
+        
+        # Répartitions : catégories des positions valorisées ce jour-là
+        details = [position['transaction'] for position in positions.values()]
+        for column, field in EVOLUTION_BREAKDOWNS.items():
+            categories, groups = np.unique([getattr(trans, field) for trans in details], return_inverse=True)
+            membership = np.zeros((len(details), len(categories)))
+            membership[np.arange(len(details)), groups] = 1
+            sums = (values @ membership).tolist()
+            present = (valued @ membership) > 0
+            categories = categories.tolist()
+            evolution[column] = [{categories[group]: sums[row][group] for group in np.flatnonzero(present[row])}
+                                 for row in range(len(days))]
+        
+        return evolution
+    
+    def get_benchmark_evolution(self, benchmark_symbols: List[str], dates: List[datetime],
+                                account_filter: list = None, product_filter: list = None,
+                                asset_class_filter: list = None, currency: str = 'EUR') -> pd.DataFrame:
+        """
+        Valeur, aux dates demandées, des mêmes flux que le portefeuille (filtré) investis
+        dans chaque indice de référence, dividendes réinvestis (prix total return).
+        Calculé sur la matrice de prix en cache, sans téléchargement.
+        Les dates antérieures à l'historique d'un indice valent NaN.
+        """
+        import sqlite3
+        dates = pd.DatetimeIndex(pd.to_datetime(dates)).normalize()
+        products = self.get_financial_products(include_benchmarks=True)
+        benchmarks = products[products['symbol'].isin(benchmark_symbols)]
+        if benchmarks.empty or dates.empty:
+            return pd.DataFrame(index=dates)
+        
+        filter_clause, filter_params = _build_filter_clause(account_filter, product_filter, asset_class_filter)
+        conn = sqlite3.connect(self.db.db_path)
+        flows = pd.read_sql_query(f'''
+            SELECT date(t.transaction_date) AS day,
+                   CASE WHEN t.transaction_type = 'BUY' THEN t.quantity * t.price_eur + COALESCE(t.fees, 0)
+                        ELSE -(t.quantity * t.price_eur - COALESCE(t.fees, 0)) END AS amount
             FROM transactions t
             JOIN financial_products fp ON t.product_id = fp.id
             JOIN accounts a ON t.account_id = a.id
-            JOIN platforms p ON a.platform_id = p.id
-            WHERE t.transaction_date <= ?
-        '''
-        
-        params = [end_date]
-        
-        # Ajouter les filtres
-        if account_filter:
-            placeholders = ','.join(['?' for _ in account_filter])
-            base_query += f' AND a.id IN ({placeholders})'
-            params.extend(account_filter)
-        
-        if product_filter:
-            placeholders = ','.join(['?' for _ in product_filter])
-            base_query += f' AND fp.symbol IN ({placeholders})'
-            params.extend(product_filter)
-        
-        if asset_class_filter:
-            placeholders = ','.join(['?' for _ in asset_class_filter])
-            base_query += f' AND fp.product_type IN ({placeholders})'
-            params.extend(asset_class_filter)
-        
-        base_query += ' ORDER BY t.transaction_date'
-        
-        transactions = pd.read_sql_query(base_query, conn, params=params)
+            WHERE t.transaction_type IN ('BUY', 'SELL') AND date(t.transaction_date) <= ?
+            {filter_clause}
+        ''', conn, params=[dates.max().strftime('%Y-%m-%d')] + filter_params)
         conn.close()
         
-        if transactions.empty:
-            return pd.DataFrame()
+        if flows.empty:
+            return pd.DataFrame(index=dates, columns=benchmarks['symbol'], dtype=float)
         
-        # Générer les dates pour l'évolution
-        total_days = (end_date - start_date).days
+        flow_dates = pd.to_datetime(flows['day'])
+        first_day = min(flow_dates.min(), dates.min())
+        prices = self.prices.get(first_day, dates.max(), product_ids=benchmarks['id'].tolist(),
+                                 fill_current=False, total_return=True)
+        execution_prices = benchmark_prices(prices)
         
-        if total_days <= 7:
-            freq = '1D'   # Quotidien pour 7 jours ou moins
-        elif total_days <= 30:
-            freq = '2D'   # Tous les 2 jours pour 1 mois
-        elif total_days <= 90:
-            freq = 'W'    # Hebdomadaire pour 3 mois
-        else:
-            freq = 'W'    # Hebdomadaire pour plus de 3 mois
-            
-        date_range = pd.date_range(start=start_date, end=end_date, freq=freq)
-        evolution_data = []
-        
-        for current_date in date_range:
-            daily_breakdown = {
-                'account': {},
-                'platform': {},
-                'asset_class': {},
-                'product': {},
-                'currency': {}
-            }
-            daily_value = 0
-            total_invested_to_date = 0
-            
-            # Transactions jusqu'à cette date
-            trans_to_date = transactions[
-                pd.to_datetime(transactions['transaction_date']) <= current_date
-            ]
-            
-            if trans_to_date.empty:
-                evolution_data.append({
-                    'date': current_date,
-                    'total_value': 0,
-                    'total_invested': 0,
-                    'gain_loss': 0,
-                    'breakdown_account': {},
-                    'breakdown_platform': {},
-                    'breakdown_asset_class': {},
-                    'breakdown_product': {},
-                    'breakdown_currency': {}
-                })
-                continue
-            
-            # Calculer les positions à cette date
-            positions = {}
-            
-            for _, trans in trans_to_date.iterrows():
-                symbol = trans['symbol']
-                if symbol not in positions:
-                    positions[symbol] = {
-                        'quantity': 0,
-                        'symbol': symbol,
-                        'name': trans['name'],
-                        'product_type': trans['product_type'],
-                        'currency': trans['currency'],
-                        'account_name': trans['account_name'],
-                        'platform_name': trans['platform_name'],
-                        'invested_amount': 0
-                    }
-                
-                if trans['transaction_type'] == 'BUY':
-                    positions[symbol]['quantity'] += trans['quantity']
-                    # Utiliser le prix EUR déjà converti historiquement
-                    invested_eur = trans['quantity'] * trans['price_eur'] + (trans['fees'] if pd.notna(trans['fees']) else 0)
-                    positions[symbol]['invested_amount'] += invested_eur
-                else:  # SELL
-                    # Calculer le ratio vendu
-                    if positions[symbol]['quantity'] > 0:
-                        ratio_sold = trans['quantity'] / positions[symbol]['quantity']
-                        # Réduire proportionnellement le montant investi
-                        positions[symbol]['invested_amount'] *= (1 - ratio_sold)
-                    
-                    positions[symbol]['quantity'] -= trans['quantity']
-                    
-                    # Si la quantité devient négative, remettre à 0
-                    if positions[symbol]['quantity'] < 0:
-                        positions[symbol]['quantity'] = 0
-                        positions[symbol]['invested_amount'] = 0
-            
-            # Calculer le montant total investi à cette date
-            total_invested_to_date = sum(pos['invested_amount'] for pos in positions.values() if pos['quantity'] > 0)
-            
-            # Récupérer les prix pour cette date
-            for symbol, position in positions.items():
-                if position['quantity'] > 0:
-                    # Chercher le prix EUR le plus proche de cette date dans l'historique
-                    price_history = self.get_price_history(symbol, current_date - timedelta(days=7), current_date)
-                    closest_price_eur = None
-                    
-                    if not price_history.empty:
-                        # Utiliser le prix EUR de l'historique
-                        if 'price_eur' in price_history.columns and pd.notna(price_history.iloc[-1]['price_eur']):
-                            closest_price_eur = price_history.iloc[-1]['price_eur']
-                        else:
-                            # Fallback au prix original avec conversion
-                            closest_price = price_history.iloc[-1]['price']
-                            if pd.notna(closest_price):
-                                closest_price_eur = self.currency_converter.convert_to_eur(closest_price, position['currency'])
-                    else:
-                        # Si pas d'historique, utiliser le prix EUR actuel du produit
-                        products = self.get_financial_products()
-                        product_row = products[products['symbol'] == symbol]
-                        if not product_row.empty:
-                            product = product_row.iloc[0]
-                            if pd.notna(product.get('current_price_eur')):
-                                closest_price_eur = product['current_price_eur']
-                            elif pd.notna(product.get('current_price')):
-                                closest_price_eur = self.currency_converter.convert_to_eur(
-                                    product['current_price'], product['currency']
-                                )
-                    
-                    if closest_price_eur and closest_price_eur > 0:
-                        value = position['quantity'] * closest_price_eur
-                        daily_value += value
-                        
-                        # Breakdown par catégorie
-                        account_name = position['account_name']
-                        platform_name = position['platform_name']
-                        asset_class = position['product_type']
-                        product_name = position['name']
-                        currency = position['currency']
-                        
-                        if account_name not in daily_breakdown['account']:
-                            daily_breakdown['account'][account_name] = 0
-                        daily_breakdown['account'][account_name] += value
-                        
-                        if platform_name not in daily_breakdown['platform']:
-                            daily_breakdown['platform'][platform_name] = 0
-                        daily_breakdown['platform'][platform_name] += value
-                        
-                        if asset_class not in daily_breakdown['asset_class']:
-                            daily_breakdown['asset_class'][asset_class] = 0
-                        daily_breakdown['asset_class'][asset_class] += value
-                        
-                        if product_name not in daily_breakdown['product']:
-                            daily_breakdown['product'][product_name] = 0
-                        daily_breakdown['product'][product_name] += value
-                        
-                        if currency not in daily_breakdown['currency']:
-                            daily_breakdown['currency'][currency] = 0
-                        daily_breakdown['currency'][currency] += value
-            
-            evolution_data.append({
-                'date': current_date,
-                'total_value': daily_value,
-                'total_invested': total_invested_to_date,
-                'gain_loss': daily_value - total_invested_to_date,
-                'breakdown_account': daily_breakdown['account'],
-                'breakdown_platform': daily_breakdown['platform'],
-                'breakdown_asset_class': daily_breakdown['asset_class'],
-                'breakdown_product': daily_breakdown['product'],
-                'breakdown_currency': daily_breakdown['currency']
-            })
-        
-        return pd.DataFrame(evolution_data)
+        values = simulate_benchmarks((flow_dates - first_day).dt.days.to_numpy(),
+                                     flows['amount'].to_numpy(dtype=float),
+                                     execution_prices.to_numpy(dtype=float))
+        values = np.where(prices.ffill().isna().to_numpy(), np.nan, values)
+        
+        evolution = pd.DataFrame(values, index=prices.index, columns=benchmarks['symbol'].tolist()).reindex(dates)
+        return evolution.mul(self.exchange_rates.get_rates(currency, dates), axis=0)
     
     def get_available_filters(self):
         """Récupère les options disponibles pour les filtres"""
@@ -0,0 +1,117 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from models.database import DatabaseManager
+from utils.versioned_cache import VersionedCache
+
+# Nombre de jours pendant lesquels un dernier prix connu est reporté (week-ends, jours fériés)
+PRICE_FFILL_LIMIT_DAYS = 7
+
+# Colonnes (historique, prix actuel) par devise de valorisation
+PRICE_COLUMNS = {
+    'EUR': ('price_eur', 'current_price_eur'),
+    'USD': ('price_usd', 'current_price_usd'),
+}
+
+# Colonnes des prix total return (dividendes réinvestis) par devise de valorisation
+TOTAL_RETURN_COLUMNS = {
+    'EUR': 'tr_price_eur',
+    'USD': 'tr_price_usd',
+}
+
+# Matrices chargées, partagées entre toutes les sessions du processus
+_matrix_cache = VersionedCache(max_entries=8)
+
+
+class PriceMatrix:
+    """
+    Matrice des prix historiques alignée date × produit.
+
+    La matrice couvre chaque jour calendaire ; un prix manquant reprend le dernier prix
+    connu pendant PRICE_FFILL_LIMIT_DAYS jours, puis (optionnellement) le prix actuel
+    du produit. Elle est chargée une seule fois par version des données.
+
+    En total return, les prix intègrent les dividendes réinvestis : à réserver aux calculs
+    fondés sur des variations de prix (risque, corrélations, indices de référence), les
+    valorisations de positions comptant déjà les dividendes reçus comme des flux.
+    """
+
+    def __init__(self, db: DatabaseManager):
+        self.db = db
+
+    def get(self, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None,
+            product_ids: Optional[List[int]] = None, currency: str = 'EUR',
+            fill_current: bool = True, total_return: bool = False) -> pd.DataFrame:
+        """
+        Retourne les prix quotidiens (index : dates, colonnes : id des produits).
+        Sans fill_current, les jours sans prix récent restent à NaN. Avec total_return, les
+        prix total return remplacent les prix de clôture (à défaut de prix total return calculé,
+        le prix de clôture est repris) et le prix actuel est porté au dernier facteur connu.
+        """
+        if currency not in PRICE_COLUMNS:
+            raise ValueError(f"Devise non supportée : {currency} (attendu : {', '.join(PRICE_COLUMNS)})")
+
+        today = pd.Timestamp.today().normalize()
+        history, current = _matrix_cache.get_or_compute(
+            (self.db.db_path, currency, total_return, today), self.db.get_data_version(),
+            self._load, currency, total_return, today
+        )
+
+        start = pd.Timestamp(start_date).normalize() if start_date is not None else (
+            history.index[0] if not history.empty else today)
+        end = pd.Timestamp(end_date).normalize() if end_date is not None else today
+        columns = list(product_ids) if product_ids is not None else list(current.index)
+
+        matrix = history.reindex(index=pd.date_range(start, end, freq='D'), columns=columns)
+        if fill_current:
+            matrix = matrix.fillna(current.reindex(columns))
+
+        return matrix
+
+    def _load(self, currency: str, total_return: bool, today: pd.Timestamp) -> Tuple[pd.DataFrame, pd.Series]:
+        """Charge tout l'historique d'une devise en une requête et le pivote en matrice quotidienne"""
+        price_column, current_column = PRICE_COLUMNS[currency]
+        value_column = f"COALESCE({TOTAL_RETURN_COLUMNS[currency]}, {price_column})" if total_return else price_column
+        conn = sqlite3.connect(self.db.db_path)
+        prices = pd.read_sql_query(f'''
+            SELECT product_id, CAST(julianday(date) - julianday('1970-01-01') AS INTEGER) AS day,
+                   {value_column} AS price, {price_column} AS close
+            FROM price_history
+            WHERE {price_column} IS NOT NULL AND {price_column} > 0
+        ''', conn)
+        products = pd.read_sql_query(f'''
+            SELECT id, {current_column} AS current_price FROM financial_products ORDER BY id
+        ''', conn)
+        conn.close()
+
+        product_ids = products['id'].to_numpy()
+        current = pd.Series(products['current_price'].to_numpy(dtype=float), index=product_ids)
+        current = current.where(current > 0)
+
+        if total_return and not prices.empty:
+            # Prix actuel × facteur de réinvestissement de la dernière cotation
+            last = prices.sort_values('day').groupby('product_id').last()
+            current = current * (last['price'] / last['close']).reindex(current.index).fillna(1.0)
+
+        if prices.empty:
+            return pd.DataFrame(columns=product_ids, dtype=float), current
+
+        # Jours depuis l'epoch calculés par SQLite (évite la conversion des chaînes de dates)
+        dates = prices['day'].to_numpy().astype('datetime64[D]')
+        start = dates.min()
+        end = max(dates.max(), today.to_datetime64().astype('datetime64[D]'))
+
+        # Placement direct des prix dans la grille jour × produit
+        values = np.full(((end - start).astype(int) + 1, len(product_ids)), np.nan)
+        rows = (dates - start).astype(int)
+        columns = np.searchsorted(product_ids, prices['product_id'].to_numpy())
+        known = (columns < len(product_ids))
+        known[known] = product_ids[columns[known]] == prices['product_id'].to_numpy()[known]
+        values[rows[known], columns[known]] = prices['price'].to_numpy(dtype=float)[known]
+
+        history = pd.DataFrame(values, index=pd.date_range(pd.Timestamp(start), pd.Timestamp(end), freq='D'),
+                               columns=product_ids)
+        return history.ffill(limit=PRICE_FFILL_LIMIT_DAYS), current
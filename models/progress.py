@@ -0,0 +1,48 @@
+import logging
+from typing import Optional
+
+# Niveaux des messages émis par les opérations longues du modèle
+MESSAGE_LEVELS = ('debug', 'info', 'success', 'warning', 'error')
+
+_LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'success': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+
+class ProgressReporter:
+    """
+    Interface de suivi des opérations longues du modèle (mises à jour de prix, historique,
+    taux de change) : le modèle n'affiche rien lui-même, il signale son avancement et ses
+    messages à un rapporteur. Cette implémentation de base ignore tout.
+    """
+
+    def progress(self, done: int, total: int, label: str = ''):
+        """Avancement : done éléments traités sur total (label : description de l'élément en cours)"""
+
+    def message(self, level: str, text: str):
+        """Message d'un des niveaux MESSAGE_LEVELS"""
+
+    def close(self):
+        """Fin de l'opération : libère ce qui affiche l'avancement"""
+
+
+class LoggingReporter(ProgressReporter):
+    """Rapporteur pour les traitements sans interface (tâches planifiées, scripts) : module logging"""
+
+    def __init__(self, logger: Optional[logging.Logger] = None):
+        self.logger = logger or logging.getLogger('mes_invest')
+
+    def progress(self, done: int, total: int, label: str = ''):
+        if label:
+            self.logger.info(label)
+
+    def message(self, level: str, text: str):
+        self.logger.log(_LOG_LEVELS.get(level, logging.INFO), text)
+
+
+# Rapporteur par défaut des méthodes du modèle
+NULL_REPORTER = ProgressReporter()
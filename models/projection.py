@@ -0,0 +1,211 @@
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from models.database import DatabaseManager
+from models.price_matrix import PriceMatrix
+from models.risk import MIN_OBSERVATIONS, TRADING_DAYS_PER_YEAR, to_trading_days
+from utils.versioned_cache import VersionedCache
+
+MONTHS_PER_YEAR = 12
+TRADING_DAYS_PER_MONTH = TRADING_DAYS_PER_YEAR // MONTHS_PER_YEAR
+
+# Méthodes d'estimation des rendements mensuels
+PROJECTION_METHODS = ('bootstrap', 'parametric')
+
+PERCENTILES = (5, 25, 50, 75, 95)
+
+# Chemins simulés par tâche : la mémoire reste bornée (chemins × points de sortie) quel que soit N
+CHUNK_PATHS = 10_000
+
+# En dessous, la simulation reste dans le processus courant (coût de démarrage des workers)
+PARALLEL_MIN_PATHS = 4 * CHUNK_PATHS
+
+# Nombre maximal de dates conservées par chemin (pas mensuel, espacé au-delà)
+MAX_CHECKPOINTS = 61
+
+# Estimations et projections calculées, partagées entre toutes les sessions du processus
+_projection_cache = VersionedCache(max_entries=8)
+
+# Pools de processus réutilisés d'un appel à l'autre (par nombre de workers)
+_executors: Dict[int, ProcessPoolExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def _get_executor(max_workers: int) -> ProcessPoolExecutor:
+    """Pool de processus partagé ; 'spawn' évite de dupliquer les threads du serveur Streamlit"""
+    with _executors_lock:
+        if max_workers not in _executors:
+            _executors[max_workers] = ProcessPoolExecutor(
+                max_workers=max_workers, mp_context=multiprocessing.get_context('spawn')
+            )
+        return _executors[max_workers]
+
+
+def simulate_paths(seed: np.random.SeedSequence, n_paths: int, checkpoints: np.ndarray, initial: float,
+                   contribution: float, method: str, monthly_returns: np.ndarray,
+                   mu: float, sigma: float) -> np.ndarray:
+    """
+    Simule n_paths trajectoires mensuelles du patrimoine et retourne leur valeur aux
+    mois checkpoints (chemins × points, float32).
+
+    Chaque mois : patrimoine × exp(rendement logarithmique) + versement. Les rendements
+    sont tirés parmi les rendements mensuels historiques (bootstrap) ou selon une loi
+    normale (mu, sigma).
+    """
+    rng = np.random.default_rng(seed)
+    wealth = np.full(n_paths, float(initial))
+    values = np.empty((n_paths, len(checkpoints)), dtype=np.float32)
+
+    position = 0
+    for month in range(int(checkpoints[-1]) + 1):
+        if month > 0:
+            if method == 'bootstrap':
+                returns = monthly_returns[rng.integers(len(monthly_returns), size=n_paths)]
+            else:
+                returns = rng.normal(mu, sigma, size=n_paths)
+            wealth = wealth * np.exp(returns) + contribution
+        if month == checkpoints[position]:
+            values[:, position] = wealth
+            position += 1
+    return values
+
+
+class ProjectionEngine:
+    """
+    Projection Monte-Carlo du patrimoine : les positions actuelles, pondérées par leur
+    valeur et rééquilibrées chaque jour, forment un rendement de portefeuille estimé sur
+    l'historique des prix total return, puis simulé mois par mois avec les versements prévus.
+    """
+
+    def __init__(self, db: DatabaseManager, prices: PriceMatrix):
+        self.db = db
+        self.prices = prices
+
+    def project(self, summary: pd.DataFrame, years: int = 20, n_paths: int = 10_000,
+                monthly_contribution: float = 0.0, method: str = 'bootstrap', seed: int = 42,
+                window_days: Optional[int] = None, max_workers: Optional[int] = None) -> Dict:
+        """
+        Bandes de percentiles du patrimoine projeté (résumé EUR des positions actuelles).
+
+        Le résultat ne dépend que de seed (une graine dérivée par paquet de CHUNK_PATHS
+        chemins), pas du nombre de workers ; au-delà de PARALLEL_MIN_PATHS chemins, les
+        paquets sont répartis sur un pool de processus.
+        """
+        if method not in PROJECTION_METHODS:
+            raise ValueError(f"Méthode inconnue : {method} (attendu : {', '.join(PROJECTION_METHODS)})")
+        if years <= 0 or n_paths <= 0:
+            raise ValueError("L'horizon et le nombre de chemins doivent être positifs")
+
+        holdings = summary.groupby('product_id')['current_value'].sum() if not summary.empty else pd.Series(dtype=float)
+        holdings = holdings[holdings > 0]
+        holdings_key = tuple((int(product_id), round(float(value), 2)) for product_id, value in holdings.items())
+        today = pd.Timestamp.today().normalize()
+        version = self.db.get_data_version()
+
+        estimate = _projection_cache.get_or_compute(
+            ('estimate', self.db.db_path, holdings_key, window_days, today), version,
+            self._estimate, holdings, window_days
+        )
+        return _projection_cache.get_or_compute(
+            ('paths', self.db.db_path, holdings_key, window_days, today, int(years), int(n_paths),
+             float(monthly_contribution), method, int(seed), max_workers), version,
+            self._simulate, estimate, float(holdings.sum()), int(years), int(n_paths),
+            float(monthly_contribution), method, int(seed), max_workers, today
+        )
+
+    def _estimate(self, holdings: pd.Series, window_days: Optional[int]) -> Dict:
+        """Rendements mensuels historiques (21 jours ouvrés glissants) du portefeuille à poids fixes"""
+        empty = {'monthly_returns': np.empty(0), 'mu': np.nan, 'sigma': np.nan, 'observations': 0, 'coverage': 0.0}
+        if holdings.empty:
+            return empty
+
+        prices = self.prices.get(product_ids=holdings.index.tolist(), fill_current=False, total_return=True)
+        log_prices = np.log(prices.to_numpy(dtype=float))
+        trading = to_trading_days(pd.DataFrame(np.diff(log_prices, axis=0, prepend=np.nan),
+                                                index=prices.index, columns=prices.columns))
+        observed = trading.notna().any(axis=1)
+        if not observed.any():
+            return empty
+        trading = trading.loc[observed[observed].index[0]:observed[observed].index[-1]]
+        if window_days is not None:
+            trading = trading.loc[trading.index > trading.index[-1] - pd.Timedelta(days=window_days)]
+
+        # Rendement quotidien du portefeuille : moyenne pondérée des produits cotés ce jour-là
+        returns = trading.to_numpy(dtype=float)
+        valid = ~np.isnan(returns)
+        weights = holdings.reindex(trading.columns).to_numpy(dtype=float)
+        available = valid @ weights
+        growth = np.where(valid, np.expm1(returns), 0.0) @ weights
+        daily = np.log1p(growth[available > 0] / available[available > 0])
+        if len(daily) < MIN_OBSERVATIONS + TRADING_DAYS_PER_MONTH:
+            return empty
+
+        cumulative = np.concatenate([[0.0], np.cumsum(daily)])
+        monthly_returns = cumulative[TRADING_DAYS_PER_MONTH:] - cumulative[:-TRADING_DAYS_PER_MONTH]
+        covered = valid.any(axis=0)
+        return {
+            'monthly_returns': monthly_returns,
+            'mu': float(daily.mean() * TRADING_DAYS_PER_MONTH),
+            'sigma': float(daily.std(ddof=1) * np.sqrt(TRADING_DAYS_PER_MONTH)),
+            'observations': len(daily),
+            'coverage': float(weights[covered].sum() / weights.sum()),
+        }
+
+    @staticmethod
+    def _simulate(estimate: Dict, initial: float, years: int, n_paths: int, contribution: float,
+                  method: str, seed: int, max_workers: Optional[int], today: pd.Timestamp) -> Dict:
+        months = years * MONTHS_PER_YEAR
+        step = max(1, int(np.ceil(months / (MAX_CHECKPOINTS - 1))))
+        checkpoints = np.unique(np.append(np.arange(0, months + 1, step), months))
+        dates = pd.DatetimeIndex([today + pd.DateOffset(months=int(month)) for month in checkpoints])
+        invested = initial + contribution * checkpoints
+
+        result = {
+            'bands': pd.DataFrame(index=dates),
+            'initial_value': initial,
+            'annual_return': float(np.expm1(estimate['mu'] * MONTHS_PER_YEAR)),
+            'annual_volatility': float(estimate['sigma'] * np.sqrt(MONTHS_PER_YEAR)),
+            'observations': estimate['observations'],
+            'coverage': estimate['coverage'],
+            'paths': n_paths,
+            'final': {},
+        }
+        if estimate['observations'] == 0 or initial + contribution <= 0:
+            return result
+
+        # Une graine indépendante par paquet : résultat identique quel que soit le découpage sur les workers
+        sizes = [min(CHUNK_PATHS, n_paths - start) for start in range(0, n_paths, CHUNK_PATHS)]
+        seeds = np.random.SeedSequence(seed).spawn(len(sizes))
+        arguments = (checkpoints, initial, contribution, method, estimate['monthly_returns'],
+                     estimate['mu'], estimate['sigma'])
+
+        workers = max_workers or os.cpu_count() or 1
+        if workers > 1 and n_paths >= PARALLEL_MIN_PATHS:
+            executor = _get_executor(workers)
+            futures = [executor.submit(simulate_paths, chunk_seed, size, *arguments)
+                       for chunk_seed, size in zip(seeds, sizes)]
+            values = np.concatenate([future.result() for future in futures])
+        else:
+            values = np.concatenate([simulate_paths(chunk_seed, size, *arguments)
+                                     for chunk_seed, size in zip(seeds, sizes)])
+
+        bands = pd.DataFrame(np.percentile(values, PERCENTILES, axis=0).T, index=dates,
+                             columns=[f'p{percentile}' for percentile in PERCENTILES])
+        bands['mean'] = values.mean(axis=0, dtype=np.float64)
+        bands['invested'] = invested
+        final = values[:, -1]
+        result['bands'] = bands
+        result['final'] = {
+            'median': float(np.median(final)),
+            'mean': float(final.mean(dtype=np.float64)),
+            'p5': float(np.percentile(final, 5)),
+            'p95': float(np.percentile(final, 95)),
+            'probability_loss': float((final < invested[-1]).mean()),
+        }
+        return result
@@ -0,0 +1,100 @@
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+
+class Record:
+    """
+    Ligne de la base sous forme d'objet léger : attributs déclarés dans __slots__ (pas de
+    dictionnaire par instance), aussi accessibles par clé comme une ligne pandas
+    (record['symbol'], record.get('sector')) pour les appelants existants.
+
+    Les colonnes de la requête absentes des slots sont ignorées, les slots absents de la
+    requête valent None.
+    """
+    __slots__ = ()
+    # Colonnes texte converties en datetime à la lecture
+    DATE_FIELDS: Tuple[str, ...] = ()
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            setattr(self, name, values.get(name))
+
+    @classmethod
+    def row_factory(cls, cursor, row: tuple) -> 'Record':
+        """Fabrique de lignes sqlite3 : conn.row_factory = Product.row_factory"""
+        values = dict(zip((column[0] for column in cursor.description), row))
+        for name in cls.DATE_FIELDS:
+            if isinstance(values.get(name), str):
+                values[name] = datetime.fromisoformat(values[name])
+        return cls(**values)
+
+    def __getitem__(self, name: str) -> Any:
+        try:
+            return getattr(self, name)
+        except AttributeError:
+            raise KeyError(name) from None
+
+    def get(self, name: str, default: Any = None) -> Any:
+        return getattr(self, name, default)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other) -> bool:
+        return type(other) is type(self) and other.to_dict() == self.to_dict()
+
+    def __repr__(self) -> str:
+        fields = ', '.join(f"{name}={getattr(self, name)!r}" for name in self.__slots__[:3])
+        return f"{type(self).__name__}({fields}, ...)"
+
+
+class Product(Record):
+    """Produit financier (table financial_products)"""
+    __slots__ = ('id', 'symbol', 'name', 'product_type', 'currency', 'current_price', 'last_updated',
+                 'current_price_eur', 'current_price_usd', 'native_currency', 'yahoo_info', 'market_cap',
+                 'sector', 'industry', 'exchange', 'country', 'is_benchmark')
+
+
+class Account(Record):
+    """Compte avec le nom de sa plateforme"""
+    __slots__ = ('id', 'platform_id', 'name', 'account_type', 'platform_name')
+
+
+class Transaction(Record):
+    """Transaction avec les détails du produit, du compte et de la plateforme (TRANSACTION_LIST_QUERY)"""
+    __slots__ = ('id', 'account_id', 'product_id', 'transaction_type', 'quantity', 'price', 'price_currency',
+                 'price_eur', 'price_usd', 'transaction_date', 'fees', 'fees_currency', 'exchange_rate_eur_usd',
+                 'symbol', 'product_name', 'product_type', 'product_currency', 'account_name', 'platform_name')
+    DATE_FIELDS = ('transaction_date',)
+
+    @property
+    def total_amount(self) -> float:
+        """Montant total en EUR (net des retenues pour un dividende), comme dans les listes de transactions"""
+        fees = self.fees or 0
+        return self.quantity * (self.price_eur or 0) + (-fees if self.transaction_type == 'DIVIDEND' else fees)
+
+
+class PricePoint(Record):
+    """Prix de clôture d'un produit à une date (table price_history)"""
+    __slots__ = ('product_id', 'date', 'price', 'price_eur', 'price_usd')
+    DATE_FIELDS = ('date',)
+
+
+class ProductDimension:
+    """Produits financiers indexés par id et par symbole, pour les résolutions en mémoire"""
+
+    def __init__(self, products: Iterable[Product]):
+        self.by_id: Dict[int, Product] = {}
+        self.by_symbol: Dict[str, Product] = {}
+        for product in products:
+            self.by_id[product.id] = product
+            self.by_symbol[product.symbol] = product
+
+    def get(self, product_id: int) -> Optional[Product]:
+        return self.by_id.get(int(product_id))
+
+    def get_by_symbol(self, symbol: str) -> Optional[Product]:
+        return self.by_symbol.get(symbol)
+
+    def __len__(self) -> int:
+        return len(self.by_id)
@@ -0,0 +1,279 @@
+import sqlite3
+import numpy as np
+import pandas as pd
+from datetime import datetime
+from typing import Dict, Optional
+
+from models.database import DatabaseManager
+from models.price_matrix import PriceMatrix
+from utils.versioned_cache import VersionedCache
+
+DAYS_PER_YEAR = 365.0
+
+# Résolution du TRI sur x = log(1 + taux) : bornes, tolérance et nombre d'itérations de Newton
+XIRR_BOUNDS = (-10.0, 10.0)
+XIRR_TOLERANCE = 1e-10
+XIRR_MAX_ITERATIONS = 50
+XIRR_BISECTION_ITERATIONS = 80
+
+# Valeur en dessous de laquelle un portefeuille est considéré comme vide
+VALUE_EPSILON = 1e-9
+
+# Niveaux d'agrégation des performances
+RETURN_LEVELS = ('account', 'platform', 'portfolio')
+
+RETURN_COLUMNS = ['level', 'id', 'name', 'start_date', 'end_date', 'value_eur',
+                  'net_contributions_eur', 'twr', 'twr_annualized', 'xirr']
+
+# Performances calculées, partagées entre toutes les sessions du processus
+_returns_cache = VersionedCache(max_entries=16)
+
+
+def batch_xirr(group: np.ndarray, years: np.ndarray, amounts: np.ndarray, n_groups: int) -> np.ndarray:
+    """
+    TRI annualisé (XIRR) de plusieurs séries de flux résolus ensemble.
+
+    Les flux sont donnés à plat : groupe, date en années et montant (négatif pour un
+    apport, positif pour un retrait ou la valeur finale). Newton est appliqué à tous
+    les groupes à la fois sur x = log(1 + taux) ; les groupes qui ne convergent pas
+    sont résolus par dichotomie vectorisée. NaN si le TRI n'existe pas.
+    """
+    has_inflow = np.bincount(group, weights=(amounts < 0).astype(float), minlength=n_groups) > 0
+    has_outflow = np.bincount(group, weights=(amounts > 0).astype(float), minlength=n_groups) > 0
+    solvable = has_inflow & has_outflow
+    scale = np.bincount(group, weights=np.abs(amounts), minlength=n_groups)
+
+    def npv(x: np.ndarray, group: np.ndarray, years: np.ndarray, amounts: np.ndarray):
+        discounted = amounts * np.exp(-x[group] * years)
+        value = np.bincount(group, weights=discounted, minlength=len(x))
+        slope = np.bincount(group, weights=-years * discounted, minlength=len(x))
+        return value, slope
+
+    x = np.zeros(n_groups)
+    converged = ~solvable
+    for _ in range(XIRR_MAX_ITERATIONS):
+        value, slope = npv(x, group, years, amounts)
+        active = ~converged & (slope != 0)
+        if not active.any():
+            break
+        step = np.divide(value, slope, out=np.zeros(n_groups), where=active)
+        x = np.where(active, np.clip(x - step, *XIRR_BOUNDS), x)
+        converged |= active & (np.abs(step) < XIRR_TOLERANCE)
+
+    # Une convergence n'est retenue que si la VAN est réellement nulle
+    value, _ = npv(x, group, years, amounts)
+    solved = solvable & converged & (np.abs(value) <= 1e-8 * np.maximum(scale, 1.0))
+
+    failed = np.flatnonzero(solvable & ~solved)
+    if len(failed):
+        # Dichotomie restreinte aux flux des groupes non résolus
+        remap = np.full(n_groups, -1)
+        remap[failed] = np.arange(len(failed))
+        selected = remap[group] >= 0
+        sub_group, sub_years, sub_amounts = remap[group[selected]], years[selected], amounts[selected]
+
+        low = np.full(len(failed), XIRR_BOUNDS[0])
+        high = np.full(len(failed), XIRR_BOUNDS[1])
+        value_low, _ = npv(low, sub_group, sub_years, sub_amounts)
+        value_high, _ = npv(high, sub_group, sub_years, sub_amounts)
+        bracketed = np.sign(value_low) != np.sign(value_high)
+        for _ in range(XIRR_BISECTION_ITERATIONS):
+            middle = (low + high) / 2
+            value_middle, _ = npv(middle, sub_group, sub_years, sub_amounts)
+            same_side = np.sign(value_middle) == np.sign(value_low)
+            low = np.where(same_side, middle, low)
+            value_low = np.where(same_side, value_middle, value_low)
+            high = np.where(same_side, high, middle)
+        x[failed[bracketed]] = ((low + high) / 2)[bracketed]
+        solved[failed[bracketed]] = True
+
+    return np.where(solved, np.expm1(x), np.nan)
+
+
+class ReturnsCalculator:
+    """
+    Performances pondérées par le temps (TWR) et par les capitaux (TRI / XIRR)
+    par compte, par plateforme et pour l'ensemble du portefeuille.
+
+    Les valorisations quotidiennes sont reconstituées à partir des transactions et de
+    la matrice des prix ; les apports (achats) et retraits (ventes) sont les flux.
+    """
+
+    def __init__(self, db: DatabaseManager, prices: PriceMatrix):
+        self.db = db
+        self.prices = prices
+
+    def get_returns(self, start_date: Optional[datetime] = None,
+                    end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Retourne une ligne par compte, plateforme et pour le portefeuille (level = 'portfolio').
+        twr est la performance cumulée sur la période, twr_annualized et xirr sont annuels.
+        Le résultat est mis en cache par version des données.
+        """
+        start = pd.Timestamp(start_date).normalize() if start_date is not None else None
+        end = pd.Timestamp(end_date).normalize() if end_date is not None else pd.Timestamp.today().normalize()
+        returns = _returns_cache.get_or_compute(
+            (self.db.db_path, start, end), self.db.get_data_version(),
+            self._compute, start, end
+        )
+        return returns.copy()
+
+    def get_daily_returns(self, end_date: Optional[datetime] = None) -> pd.DataFrame:
+        """
+        Performances quotidiennes hors flux (base du TWR) par jour calendaire.
+        Les colonnes sont indexées par (level, id, name) ; les jours sans capital investi valent NaN.
+        """
+        valuations = self._get_valuations(end_date)
+        if valuations is None:
+            return pd.DataFrame()
+
+        previous, values, flows = valuations['previous'], valuations['values'], valuations['flows']
+        base = previous + np.maximum(flows, 0.0)
+        daily = np.divide(values - previous - flows, base, out=np.full_like(base, np.nan),
+                          where=base > VALUE_EPSILON)
+        columns = pd.MultiIndex.from_frame(valuations['groups'])
+        return pd.DataFrame(daily, index=valuations['calendar'], columns=columns)
+
+    def _get_valuations(self, end_date: Optional[datetime] = None) -> Optional[Dict]:
+        """Valorisations et flux quotidiens par groupe, mis en cache par version des données"""
+        end = pd.Timestamp(end_date).normalize() if end_date is not None else pd.Timestamp.today().normalize()
+        return _returns_cache.get_or_compute(
+            ('valuations', self.db.db_path, end), self.db.get_data_version(),
+            self._load_valuations, end
+        )
+
+    def _load_valuations(self, end: pd.Timestamp) -> Optional[Dict]:
+        """
+        Reconstitue les valorisations et flux quotidiens (jours × groupes) des comptes,
+        plateformes et du portefeuille. None s'il n'y a aucune transaction.
+        """
+        conn = sqlite3.connect(self.db.db_path)
+        transactions = pd.read_sql_query('''
+            SELECT account_id, product_id, date(transaction_date) AS day,
+                   CASE WHEN transaction_type = 'BUY' THEN quantity
+                        WHEN transaction_type = 'SELL' THEN -quantity ELSE 0 END AS quantity,
+                   CASE WHEN transaction_type = 'BUY' THEN quantity * price_eur + COALESCE(fees, 0)
+                        ELSE -(quantity * price_eur - COALESCE(fees, 0)) END AS flow
+            FROM transactions
+            WHERE transaction_type IN ('BUY', 'SELL', 'DIVIDEND')
+              AND account_id IS NOT NULL AND product_id IS NOT NULL
+              AND date(transaction_date) <= ?
+        ''', conn, params=(end.strftime('%Y-%m-%d'),))
+        accounts = pd.read_sql_query('''
+            SELECT a.id, a.name, a.platform_id, COALESCE(p.name, 'Sans plateforme') AS platform_name
+            FROM accounts a
+            LEFT JOIN platforms p ON a.platform_id = p.id
+            ORDER BY a.id
+        ''', conn)
+        conn.close()
+
+        transactions = transactions[transactions['account_id'].isin(accounts['id'])]
+        if transactions.empty:
+            return None
+
+        days = pd.to_datetime(transactions['day'])
+        first_day = days.min()
+        calendar = pd.date_range(first_day, end, freq='D')
+        day_index = (days - first_day).dt.days.to_numpy()
+        n_days = len(calendar)
+
+        # Quantités détenues par (compte, produit) et par jour
+        pair_codes, pairs = pd.MultiIndex.from_frame(transactions[['account_id', 'product_id']]).factorize()
+        quantity_changes = np.zeros((n_days, len(pairs)))
+        np.add.at(quantity_changes, (day_index, pair_codes), transactions['quantity'].to_numpy(dtype=float))
+        held = np.maximum(np.cumsum(quantity_changes, axis=0), 0.0)
+
+        pair_accounts = pairs.get_level_values(0).to_numpy()
+        pair_products = pairs.get_level_values(1).to_numpy()
+        prices = self.prices.get(first_day, end, product_ids=list(pair_products), currency='EUR')
+        pair_values = held * np.nan_to_num(prices.to_numpy(dtype=float))
+
+        # Agrégation compte → (compte, plateforme, portefeuille) par produit matriciel
+        account_ids = accounts['id'].to_numpy()
+        platform_codes, platform_ids = pd.factorize(accounts['platform_id'].fillna(-1).astype(int))
+        platform_names = accounts.groupby(platform_codes)['platform_name'].first().tolist()
+        n_accounts, n_platforms = len(account_ids), len(platform_ids)
+        pair_to_account = np.zeros((len(pairs), n_accounts))
+        pair_to_account[np.arange(len(pairs)), np.searchsorted(account_ids, pair_accounts)] = 1.0
+        account_to_group = np.hstack([
+            np.eye(n_accounts),
+            np.eye(n_platforms)[platform_codes] if n_platforms else np.zeros((n_accounts, 0)),
+            np.ones((n_accounts, 1)),
+        ])
+
+        account_flows = np.zeros((n_days, n_accounts))
+        np.add.at(account_flows, (day_index, np.searchsorted(account_ids, transactions['account_id'].to_numpy())),
+                  transactions['flow'].to_numpy(dtype=float))
+        values = (pair_values @ pair_to_account) @ account_to_group
+        groups = pd.DataFrame({
+            'level': ['account'] * n_accounts + ['platform'] * n_platforms + ['portfolio'],
+            'id': pd.Series(list(account_ids) + list(platform_ids) + [None], dtype=object),
+            'name': list(accounts['name']) + platform_names + ['Portefeuille'],
+        })
+
+        return {
+            'calendar': calendar,
+            'values': values,
+            'previous': np.vstack([np.zeros((1, values.shape[1])), values[:-1]]),
+            'flows': account_flows @ account_to_group,
+            'groups': groups,
+        }
+
+    def _compute(self, start: Optional[pd.Timestamp], end: pd.Timestamp) -> pd.DataFrame:
+        valuations = self._get_valuations(end)
+        if valuations is None:
+            return pd.DataFrame(columns=RETURN_COLUMNS)
+
+        calendar, groups = valuations['calendar'], valuations['groups']
+        n_days, n_groups = valuations['values'].shape
+
+        # Fenêtre d'analyse : la valeur de la veille tient lieu d'apport initial
+        window_start = 0 if start is None else int(np.clip((start - calendar[0]).days, 0, n_days - 1))
+        previous = valuations['previous'][window_start:]
+        window_values = valuations['values'][window_start:]
+        window_flows = valuations['flows'][window_start:]
+
+        # TWR : chaînage des performances quotidiennes hors flux. Les achats du jour sont
+        # investis dès l'ouverture (écart prix d'achat / clôture compris), les ventes en clôture
+        base = previous + np.maximum(window_flows, 0.0)
+        daily = np.divide(window_values - previous - window_flows, base,
+                          out=np.zeros_like(base), where=base > VALUE_EPSILON)
+        twr = np.prod(1 + daily, axis=0) - 1
+
+        active = (np.abs(window_values) > VALUE_EPSILON) | (window_flows != 0) | (previous > VALUE_EPSILON)
+        has_activity = active.any(axis=0)
+        first_active = np.argmax(active, axis=0)
+        active_days = (len(window_values) - first_active).astype(float)
+        twr_annualized = np.where(active_days >= DAYS_PER_YEAR,
+                                  np.power(np.maximum(1 + twr, 0.0), DAYS_PER_YEAR / active_days) - 1, np.nan)
+
+        # XIRR : apport initial, flux de la fenêtre puis valeur finale, tous groupes en un lot
+        flow_days, flow_groups = np.nonzero(window_flows)
+        initial = previous[0]
+        initial_groups = np.flatnonzero(initial > VALUE_EPSILON)
+        final_groups = np.flatnonzero(window_values[-1] > VALUE_EPSILON)
+        group = np.concatenate([initial_groups, flow_groups, final_groups])
+        years = np.concatenate([
+            np.full(len(initial_groups), -1.0),
+            flow_days.astype(float),
+            np.full(len(final_groups), len(window_values) - 1.0),
+        ]) / DAYS_PER_YEAR
+        amounts = np.concatenate([
+            -initial[initial_groups],
+            -window_flows[flow_days, flow_groups],
+            window_values[-1, final_groups],
+        ])
+        xirr = batch_xirr(group, years, amounts, n_groups)
+
+        window_calendar = calendar[window_start:]
+        result = groups.assign(**{
+            'start_date': window_calendar[first_active],
+            'end_date': window_calendar[-1],
+            'value_eur': window_values[-1],
+            'net_contributions_eur': initial + window_flows.sum(axis=0),
+            'twr': twr,
+            'twr_annualized': twr_annualized,
+            'xirr': xirr,
+        })[RETURN_COLUMNS]
+
+        return result[has_activity].reset_index(drop=True)
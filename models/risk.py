@@ -0,0 +1,214 @@
+import numpy as np
+import pandas as pd
+from typing import Dict, Optional
+
+from models.database import DatabaseManager
+from models.price_matrix import PriceMatrix
+from models.returns import ReturnsCalculator
+from utils.versioned_cache import VersionedCache
+
+TRADING_DAYS_PER_YEAR = 252
+
+# Paramètres par défaut des indicateurs de risque
+RISK_FREE_RATE = 0.02
+VAR_CONFIDENCE = 0.95
+ROLLING_WINDOW_DAYS = 63
+MIN_OBSERVATIONS = 20
+
+RISK_COLUMNS = ['level', 'id', 'name', 'observations', 'annual_return', 'volatility',
+                'sharpe', 'max_drawdown', 'beta', 'var_95']
+
+# Indicateurs calculés, partagés entre toutes les sessions du processus
+_risk_cache = VersionedCache(max_entries=16)
+
+
+def to_trading_days(log_returns: pd.DataFrame) -> pd.DataFrame:
+    """
+    Regroupe des rendements logarithmiques calendaires en jours ouvrés :
+    les rendements du week-end sont cumulés avec ceux du lundi suivant.
+    """
+    weekday = log_returns.index.dayofweek < 5
+    bucket = np.cumsum(weekday) + ~weekday
+    trading = log_returns.groupby(bucket).sum(min_count=1)
+    trading = trading.loc[trading.index <= weekday.sum()]
+    trading.index = log_returns.index[weekday][trading.index.to_numpy() - 1]
+    return trading
+
+
+def risk_metrics(log_returns: np.ndarray, market: np.ndarray,
+                 risk_free_rate: float = RISK_FREE_RATE) -> Dict[str, np.ndarray]:
+    """
+    Indicateurs de risque par colonne d'une matrice de rendements logarithmiques quotidiens
+    (jours × séries, NaN hors historique), calculés en une passe vectorisée.
+    market est la série de référence pour le bêta.
+    """
+    valid = ~np.isnan(log_returns)
+    observations = valid.sum(axis=0)
+    count = np.maximum(observations, 1)
+    values = np.where(valid, log_returns, 0.0)
+
+    mean = values.sum(axis=0) / count
+    variance = (((values - mean) * valid) ** 2).sum(axis=0) / np.maximum(observations - 1, 1)
+    volatility = np.sqrt(variance * TRADING_DAYS_PER_YEAR)
+    annual_return = np.expm1(mean * TRADING_DAYS_PER_YEAR)
+    sharpe = np.divide(annual_return - risk_free_rate, volatility,
+                       out=np.full_like(volatility, np.nan), where=volatility > 0)
+
+    # Perte maximale depuis un plus haut (le niveau initial compte comme plus haut)
+    cumulative = np.cumsum(values, axis=0)
+    peak = np.maximum.accumulate(np.maximum(cumulative, 0.0), axis=0)
+    max_drawdown = np.expm1((cumulative - peak).min(axis=0, initial=0.0))
+
+    # Bêta sur les jours communs à la série et au marché
+    both = valid & ~np.isnan(market)[:, None]
+    paired = np.maximum(both.sum(axis=0), 2)
+    series = np.where(both, log_returns, 0.0)
+    reference = np.where(both, np.nan_to_num(market)[:, None], 0.0)
+    covariance = (series * reference).sum(axis=0) - series.sum(axis=0) * reference.sum(axis=0) / paired
+    market_variance = (reference ** 2).sum(axis=0) - reference.sum(axis=0) ** 2 / paired
+    beta = np.divide(covariance, market_variance, out=np.full_like(covariance, np.nan),
+                     where=market_variance > 0)
+
+    # VaR historique à un jour (perte positive)
+    simple = np.expm1(log_returns)
+    var_95 = np.full(log_returns.shape[1], np.nan)
+    if observations.any():
+        var_95[observations > 0] = -np.nanquantile(simple[:, observations > 0], 1 - VAR_CONFIDENCE, axis=0)
+
+    metrics = {
+        'observations': observations,
+        'annual_return': annual_return,
+        'volatility': volatility,
+        'sharpe': sharpe,
+        'max_drawdown': max_drawdown,
+        'beta': beta,
+        'var_95': var_95,
+    }
+    insufficient = observations < MIN_OBSERVATIONS
+    for key in metrics:
+        if key != 'observations':
+            metrics[key] = np.where(insufficient, np.nan, metrics[key])
+    return metrics
+
+
+def rolling_volatility(log_returns: np.ndarray, window: int = ROLLING_WINDOW_DAYS) -> np.ndarray:
+    """Volatilité annualisée glissante par colonne via sommes cumulées (NaN si moins d'une demi-fenêtre)"""
+    valid = ~np.isnan(log_returns)
+    values = np.where(valid, log_returns, 0.0)
+
+    def window_sum(array: np.ndarray) -> np.ndarray:
+        cumulative = np.vstack([np.zeros((1, array.shape[1])), np.cumsum(array, axis=0)])
+        return cumulative[1:] - cumulative[np.maximum(np.arange(1, len(cumulative)) - window, 0)]
+
+    count = window_sum(valid.astype(float))
+    total = window_sum(values)
+    squares = window_sum(values ** 2)
+    variance = np.divide(squares - total ** 2 / np.maximum(count, 1), count - 1,
+                         out=np.full_like(total, np.nan), where=count >= max(window // 2, 2))
+    return np.sqrt(np.maximum(variance, 0.0) * TRADING_DAYS_PER_YEAR)
+
+
+class RiskAnalyzer:
+    """
+    Indicateurs de risque (volatilité, perte maximale, Sharpe, bêta, VaR historique)
+    par produit, compte, plateforme et pour le portefeuille.
+
+    Les produits sont évalués sur la matrice des prix total return, les comptes et le
+    portefeuille sur leurs performances quotidiennes hors flux ; le bêta est mesuré
+    par rapport au portefeuille.
+    """
+
+    def __init__(self, db: DatabaseManager, prices: PriceMatrix, returns: ReturnsCalculator):
+        self.db = db
+        self.prices = prices
+        self.returns = returns
+
+    def get_risk_metrics(self, window_days: Optional[int] = 365,
+                         risk_free_rate: float = RISK_FREE_RATE) -> pd.DataFrame:
+        """
+        Indicateurs sur les window_days derniers jours (tout l'historique si None).
+        Rendement et volatilité sont annualisés, la VaR est une perte quotidienne à 95 %.
+        """
+        today = pd.Timestamp.today().normalize()
+        return _risk_cache.get_or_compute(
+            ('metrics', self.db.db_path, window_days, risk_free_rate, today), self.db.get_data_version(),
+            self._compute_metrics, window_days, risk_free_rate
+        ).copy()
+
+    def get_risk_series(self, window: int = ROLLING_WINDOW_DAYS) -> Dict[str, pd.DataFrame]:
+        """
+        Séries par jour ouvré pour les comptes, plateformes et le portefeuille :
+        volatilité glissante sur window jours et perte depuis le plus haut (drawdown).
+        """
+        today = pd.Timestamp.today().normalize()
+        series = _risk_cache.get_or_compute(
+            ('series', self.db.db_path, window, today), self.db.get_data_version(),
+            self._compute_series, window
+        )
+        return {name: frame.copy() for name, frame in series.items()}
+
+    def _trading_returns(self) -> pd.DataFrame:
+        """Rendements logarithmiques par jour ouvré des produits et des groupes (colonnes level, id, name)"""
+        today = pd.Timestamp.today().normalize()
+        return _risk_cache.get_or_compute(
+            ('returns', self.db.db_path, today), self.db.get_data_version(), self._load_trading_returns
+        )
+
+    def _load_trading_returns(self) -> pd.DataFrame:
+        frames = []
+
+        prices = self.prices.get(fill_current=False, total_return=True)
+        if not prices.empty:
+            products = self.db.get_financial_products(include_benchmarks=True).set_index('id')
+            product_ids = [product_id for product_id in prices.columns if product_id in products.index]
+            log_prices = np.log(prices[product_ids].to_numpy(dtype=float))
+            product_returns = pd.DataFrame(np.diff(log_prices, axis=0, prepend=np.nan), index=prices.index)
+            product_returns.columns = pd.MultiIndex.from_arrays([
+                ['product'] * len(product_ids), product_ids, products.loc[product_ids, 'symbol'].tolist()
+            ], names=['level', 'id', 'name'])
+            frames.append(product_returns)
+
+        daily = self.returns.get_daily_returns()
+        if not daily.empty:
+            frames.append(np.log1p(daily))
+
+        if not frames:
+            return pd.DataFrame()
+        trading = to_trading_days(pd.concat(frames, axis=1))
+
+        # Les valorisations au-delà du dernier prix stocké ne reflètent plus le marché
+        observed = trading.loc[:, trading.columns.get_level_values('level') == 'product'].notna().any(axis=1)
+        if observed.any():
+            trading = trading.loc[:observed[observed].index[-1]]
+        return trading
+
+    def _compute_metrics(self, window_days: Optional[int], risk_free_rate: float) -> pd.DataFrame:
+        trading = self._trading_returns()
+        if trading.empty:
+            return pd.DataFrame(columns=RISK_COLUMNS)
+
+        if window_days is not None:
+            trading = trading.loc[trading.index > trading.index[-1] - pd.Timedelta(days=window_days)]
+
+        levels = trading.columns.get_level_values('level')
+        portfolio = trading.loc[:, levels == 'portfolio']
+        market = portfolio.iloc[:, 0].to_numpy(dtype=float) if portfolio.shape[1] else np.full(len(trading), np.nan)
+
+        metrics = risk_metrics(trading.to_numpy(dtype=float), market, risk_free_rate)
+        result = trading.columns.to_frame(index=False).assign(**metrics)
+        return result[RISK_COLUMNS]
+
+    def _compute_series(self, window: int) -> Dict[str, pd.DataFrame]:
+        trading = self._trading_returns()
+        if trading.empty:
+            return {'volatility': pd.DataFrame(), 'drawdown': pd.DataFrame()}
+
+        groups = trading.loc[:, trading.columns.get_level_values('level') != 'product']
+        values = groups.to_numpy(dtype=float)
+        cumulative = np.cumsum(np.nan_to_num(values), axis=0)
+        drawdown = np.expm1(cumulative - np.maximum.accumulate(np.maximum(cumulative, 0.0), axis=0))
+
+        return {
+            'volatility': pd.DataFrame(rolling_volatility(values, window), index=groups.index, columns=groups.columns),
+            'drawdown': pd.DataFrame(drawdown, index=groups.index, columns=groups.columns),
+        }
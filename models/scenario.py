@@ -0,0 +1,354 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Optional, Tuple
+
+from models.benchmark import benchmark_prices
+from models.correlation import covariance_matrix, effective_number_of_bets
+from models.database import DatabaseManager
+from models.price_matrix import PriceMatrix
+from models.risk import MIN_OBSERVATIONS, TRADING_DAYS_PER_YEAR, to_trading_days
+from utils.versioned_cache import VersionedCache
+
+# Colonnes brutes du résumé (avant ajout des indicateurs dérivés)
+SUMMARY_BASE_COLUMNS = ['product_id', 'symbol', 'name', 'current_price', 'current_price_eur', 'current_price_usd',
+                        'currency', 'product_type', 'account_id', 'account_name', 'platform_name',
+                        'total_quantity', 'avg_buy_price_eur', 'avg_buy_price_usd', 'total_invested_eur',
+                        'total_invested_usd', 'total_dividends_eur', 'total_dividends_usd', 'last_transaction_date']
+
+# Répartitions comparées avant / après (niveau → colonne du résumé)
+BREAKDOWN_COLUMNS = {
+    'asset_class': 'product_type',
+    'account': 'account_name',
+    'platform': 'platform_name',
+    'currency': 'currency',
+    'product': 'symbol',
+}
+
+# Quantité en dessous de laquelle une position simulée est considérée comme soldée
+SCENARIO_EPSILON = 1e-9
+
+# Montant (EUR) en dessous duquel une opération proposée est ignorée
+MIN_TRADE_AMOUNT = 0.01
+
+# Données de marché préparées par fenêtre, partagées entre toutes les sessions du processus
+_scenario_cache = VersionedCache(max_entries=8)
+
+
+def _buy_only_allocation(values: np.ndarray, targets: np.ndarray, contribution: float) -> np.ndarray:
+    """
+    Répartit un apport sans vente (remplissage par niveau) : achat_i = max(cible_i × λ - valeur_i, 0),
+    λ étant choisi pour que les achats totalisent l'apport. Les classes les plus en retard
+    sur leur cible sont complétées en premier.
+    """
+    buys = np.zeros(len(values))
+    active = np.flatnonzero(targets > 0)
+    if contribution <= 0 or not len(active):
+        return buys
+
+    order = active[np.argsort(values[active] / targets[active])]
+    levels = (contribution + np.cumsum(values[order])) / np.cumsum(targets[order])
+    filled = np.flatnonzero(levels >= values[order] / targets[order])[-1]
+    buys[order] = np.maximum(targets[order] * levels[filled] - values[order], 0.0)
+    return buys
+
+
+def propose_rebalancing(summary: pd.DataFrame, targets: Dict[str, float], contribution: float = 0.0,
+                        allow_sells: bool = True,
+                        candidates: Optional[Dict[str, str]] = None) -> Tuple[List[Dict], List[str]]:
+    """
+    Propose les opérations (montants EUR par symbole) qui amènent la répartition par classe
+    d'actifs vers targets (poids normalisés, classes absentes = 0), avec un apport éventuel.
+
+    Sans vente autorisée, seul l'apport est réparti entre les classes sous-pondérées.
+    Dans une classe, le montant est réparti au prorata des positions existantes ; une classe
+    non détenue est achetée via candidates[classe]. Retourne (opérations, classes inatteignables).
+    """
+    values = summary.groupby('product_type')['current_value'].sum() if not summary.empty else pd.Series(dtype=float)
+    classes = values.index.union(pd.Index(list(targets)))
+    values = values.reindex(classes, fill_value=0.0)
+    weights = pd.Series(targets, dtype=float).reindex(classes, fill_value=0.0).clip(lower=0.0)
+
+    # Classe visée mais ni détenue ni dotée d'un produit candidat : exclue de la répartition
+    candidates = candidates or {}
+    unreachable = weights.index[(weights > 0) & (values <= 0) & ~weights.index.isin(list(candidates))]
+    weights[unreachable] = 0.0
+    if weights.sum() <= 0:
+        return [], unreachable.tolist()
+    weights = weights / weights.sum()
+
+    total = values.sum() + contribution
+    if allow_sells:
+        class_amounts = weights.to_numpy() * total - values.to_numpy()
+    else:
+        class_amounts = _buy_only_allocation(values.to_numpy(), weights.to_numpy(), contribution)
+    class_amounts = pd.Series(class_amounts, index=classes)
+
+    # Répartition dans chaque classe au prorata des produits détenus
+    products = summary.groupby(['product_type', 'symbol'], as_index=False)['current_value'].sum() \
+        if not summary.empty else pd.DataFrame(columns=['product_type', 'symbol', 'current_value'])
+    products['amount'] = (products['current_value'] / products['product_type'].map(values)
+                          * products['product_type'].map(class_amounts))
+
+    unheld = class_amounts[(values <= 0) & (class_amounts.abs() >= MIN_TRADE_AMOUNT)]
+    new_positions = pd.DataFrame({'symbol': [candidates[asset_class] for asset_class in unheld.index],
+                                  'amount': unheld.to_numpy()})
+
+    trades = pd.concat([products[['symbol', 'amount']], new_positions], ignore_index=True)
+    trades = trades[trades['amount'].abs() >= MIN_TRADE_AMOUNT]
+    return trades.to_dict('records'), unreachable.tolist()
+
+
+class ScenarioSimulator:
+    """
+    Simulation « et si » d'un lot d'opérations hypothétiques, sans écriture en base.
+
+    Les opérations sont appliquées en mémoire au résumé des positions, au prix actuel ;
+    la répartition, le risque (covariance de la fenêtre) et la performance passée des
+    positions avant / après (valeur des quantités sur l'historique des prix) sont recalculés
+    sur des matrices préparées une fois par fenêtre et par version des données.
+    """
+
+    def __init__(self, db: DatabaseManager, prices: PriceMatrix,
+                 summary_metrics: Callable[[pd.DataFrame, str], None]):
+        self.db = db
+        self.prices = prices
+        self.summary_metrics = summary_metrics
+
+    def evaluate(self, baseline: pd.DataFrame, trades: List[Dict], window_days: Optional[int] = 365) -> Dict:
+        """
+        Applique trades au résumé baseline (get_portfolio_summary en EUR) et compare avant / après.
+
+        Chaque opération désigne un symbole et, signé (positif = achat, négatif = vente), soit
+        une quantité (quantity), soit un montant EUR (amount), soit une fraction de la position
+        (fraction). Sans account_id, l'opération sur un produit détenu est répartie entre les
+        comptes au prorata des quantités ; un nouveau produit va dans le compte le plus important.
+        Une vente ne peut pas céder plus que la quantité détenue.
+        """
+        market = self._market(window_days)
+        after, executed = self._apply(baseline, trades, market)
+
+        return {
+            'summary': after,
+            'trades': executed,
+            'cash': -float((executed['executed_quantity'] * executed['price_eur']).sum()),
+            'breakdowns': {level: self._breakdown(baseline, after, column)
+                           for level, column in BREAKDOWN_COLUMNS.items()},
+            **self._compare(baseline, after, market),
+        }
+
+    def _market(self, window_days: Optional[int]) -> Dict:
+        today = pd.Timestamp.today().normalize()
+        return _scenario_cache.get_or_compute(
+            (self.db.db_path, window_days, today), self.db.get_data_version(),
+            self._load_market, window_days
+        )
+
+    def _load_market(self, window_days: Optional[int]) -> Dict:
+        """Produits, prix d'exécution, valorisations quotidiennes et covariance de la fenêtre"""
+        products = self.db.get_financial_products(include_benchmarks=True).set_index('id').sort_index()
+        accounts = self.db.get_accounts()
+        product_ids = products.index.tolist()
+
+        history = self.prices.get(product_ids=product_ids, fill_current=False)
+        observed = history.notna().any(axis=1)
+        if observed.any():
+            history = history.loc[:observed[observed].index[-1]]
+        if window_days is not None and not history.empty:
+            history = history.loc[history.index > history.index[-1] - pd.Timedelta(days=window_days)]
+
+        # Prix d'exécution : prix actuel, à défaut dernier prix stocké
+        last_prices = history.ffill().iloc[-1] if not history.empty else pd.Series(np.nan, index=product_ids)
+        products['price_eur'] = products['current_price_eur'].where(products['current_price_eur'] > 0, last_prices)
+        products['price_usd'] = products['current_price_usd'].where(products['current_price_usd'] > 0,
+                                                                    products['price_eur'])
+
+        # Valorisation passée à quantités fixes : premier prix connu avant le début de l'historique
+        valuation = benchmark_prices(history).fillna(products['price_eur']).fillna(0.0)
+
+        log_prices = np.log(history.to_numpy(dtype=float))
+        trading = to_trading_days(pd.DataFrame(np.diff(log_prices, axis=0, prepend=np.nan), index=history.index))
+        returns = trading.to_numpy(dtype=float)
+        covered = np.flatnonzero((~np.isnan(returns)).sum(axis=0) >= MIN_OBSERVATIONS)
+        covariance, _ = covariance_matrix(returns[:, covered])
+        covariance *= TRADING_DAYS_PER_YEAR
+
+        return {
+            'products': products,
+            'positions': {symbol.upper(): position for position, symbol in enumerate(products['symbol'])},
+            'accounts': accounts.set_index('id'),
+            'dates': valuation.index,
+            'valuation': valuation.to_numpy(dtype=float),
+            'covered': covered,
+            'covariance': covariance,
+            'eigen': np.linalg.eigh(covariance),
+        }
+
+    @staticmethod
+    def _trade_quantity(trade: Dict, price: float, reference: float) -> float:
+        """Quantité signée d'une opération exprimée en quantité, en montant EUR ou en fraction"""
+        if pd.notna(trade.get('quantity')):
+            return float(trade['quantity'])
+        if pd.notna(trade.get('amount')):
+            return float(trade['amount']) / price if price > 0 else 0.0
+        if pd.notna(trade.get('fraction')):
+            return float(trade['fraction']) * reference
+        return 0.0
+
+    def _apply(self, baseline: pd.DataFrame, trades: List[Dict], market: Dict) -> Tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Résumé après opérations (mêmes colonnes que get_portfolio_summary) et quantités exécutées.
+        Les variations sont calculées sur des tableaux alignés sur les lignes du résumé, les
+        nouvelles positions étant ajoutées à la suite.
+        """
+        products, accounts = market['products'], market['accounts']
+        raw = baseline[SUMMARY_BASE_COLUMNS] if not baseline.empty else pd.DataFrame(columns=SUMMARY_BASE_COLUMNS)
+        pair_accounts = raw['account_id'].to_numpy(dtype=int)
+        pair_products = products.index.get_indexer(raw['product_id'])
+        quantity = raw['total_quantity'].to_numpy(dtype=float)
+        price_eur = products['price_eur'].fillna(0.0).to_numpy(dtype=float)
+        price_usd = products['price_usd'].fillna(0.0).to_numpy(dtype=float)
+
+        # Compte par défaut des nouveaux produits : celui de plus grande valeur
+        if not raw.empty:
+            account_codes, account_ids = pd.factorize(pair_accounts)
+            default_account = account_ids[np.argmax(np.bincount(
+                account_codes, weights=baseline['current_value'].to_numpy(dtype=float)))]
+        else:
+            default_account = accounts.index[0] if not accounts.empty else None
+
+        delta = np.zeros(len(raw))
+        new_pairs: Dict[Tuple[int, int], float] = {}
+        unknown = []
+        for trade in trades:
+            position = market['positions'].get(str(trade.get('symbol', '')).upper())
+            if position is None:
+                unknown.append(str(trade.get('symbol')))
+                continue
+            mask = pair_products == position
+            account_id = trade.get('account_id')
+            if pd.notna(account_id):
+                mask &= pair_accounts == int(account_id)
+            reference = quantity[mask].sum()
+            trade_quantity = self._trade_quantity(trade, price_eur[position], reference)
+
+            if reference > 0:
+                delta[mask] += trade_quantity * quantity[mask] / reference
+                continue
+            if pd.isna(account_id):
+                if default_account is None:
+                    raise ValueError("Aucun compte disponible pour simuler un achat")
+                account_id = default_account
+            key = (int(account_id), position)
+            new_pairs[key] = new_pairs.get(key, 0.0) + trade_quantity
+        if unknown:
+            raise ValueError(f"Produit(s) inconnu(s) : {', '.join(unknown)}")
+
+        # Colonnes du résumé en tableaux, les nouvelles positions (produit et compte) à la suite
+        data = {column: raw[column].to_numpy() for column in SUMMARY_BASE_COLUMNS}
+        if new_pairs:
+            new_accounts = np.array([account_id for account_id, _ in new_pairs], dtype=int)
+            new_products = np.array([position for _, position in new_pairs], dtype=int)
+            product_rows = products.iloc[new_products]
+            account_rows = accounts.reindex(new_accounts)
+            new_rows = {
+                'product_id': product_rows.index.to_numpy(), 'account_id': new_accounts,
+                **{column: product_rows[column].to_numpy() for column in
+                   ['symbol', 'name', 'current_price', 'current_price_eur', 'current_price_usd', 'currency', 'product_type']},
+                'account_name': account_rows['name'].to_numpy(), 'platform_name': account_rows['platform_name'].to_numpy(),
+            }
+            for column in SUMMARY_BASE_COLUMNS:
+                values = new_rows.get(column, np.full(len(new_pairs), np.nan))
+                data[column] = np.concatenate([data[column].astype(object) if data[column].dtype != values.dtype
+                                               else data[column], values])
+            pair_products = np.concatenate([pair_products, new_products])
+            quantity = np.concatenate([quantity, np.zeros(len(new_pairs))])
+            delta = np.concatenate([delta, np.fromiter(new_pairs.values(), dtype=float)])
+
+        new_quantity = np.maximum(quantity + delta, 0.0)
+        executed = new_quantity - quantity
+        bought = executed > 0
+        execution_price = price_eur[pair_products]
+
+        # Achat : coût ajouté au prix actuel ; vente : coût réduit au prorata des quantités
+        kept = np.divide(new_quantity, quantity, out=np.ones_like(quantity), where=quantity > 0)
+        data['total_quantity'] = new_quantity
+        for currency, price in [('eur', execution_price), ('usd', price_usd[pair_products])]:
+            invested = np.nan_to_num(data[f'total_invested_{currency}'].astype(float))
+            average = np.nan_to_num(data[f'avg_buy_price_{currency}'].astype(float))
+            data[f'total_invested_{currency}'] = np.where(bought, invested + executed * price, invested * kept)
+            data[f'avg_buy_price_{currency}'] = np.where(
+                bought,
+                np.divide(average * quantity + price * executed, new_quantity,
+                          out=np.zeros_like(average), where=new_quantity > 0),
+                average)
+
+        traded = executed != 0
+        trade_log = pd.DataFrame({
+            **{column: data[column][traded] for column in ['account_id', 'account_name', 'product_id', 'symbol']},
+            'executed_quantity': executed[traded], 'price_eur': execution_price[traded],
+        })
+
+        held = new_quantity > SCENARIO_EPSILON
+        after = pd.DataFrame({column: values[held] for column, values in data.items()})
+        if not after.empty:
+            self.summary_metrics(after, 'EUR')
+        return after, trade_log
+
+    @staticmethod
+    def _breakdown(before: pd.DataFrame, after: pd.DataFrame, column: str) -> pd.DataFrame:
+        """Valeurs et poids par catégorie avant / après (une seule factorisation des deux résumés)"""
+        keys = np.concatenate([frame[column].to_numpy(dtype=object) if not frame.empty else np.empty(0, dtype=object)
+                               for frame in (before, after)])
+        codes, categories = pd.factorize(keys, use_na_sentinel=False)
+        split = len(before)
+        before_values = np.bincount(codes[:split], weights=before['current_value'].to_numpy(dtype=float) if split else None,
+                                    minlength=len(categories))
+        after_values = np.bincount(codes[split:], weights=after['current_value'].to_numpy(dtype=float) if len(after) else None,
+                                   minlength=len(categories))
+        weights = [values / values.sum() if values.sum() > 0 else np.zeros(len(values))
+                   for values in (before_values, after_values)]
+
+        order = np.argsort(-after_values, kind='stable')
+        table = np.column_stack([before_values, after_values, *weights, after_values - before_values])[order]
+        return pd.DataFrame(table, index=pd.Index(categories[order], name=column),
+                            columns=['before', 'after', 'weight_before', 'weight_after', 'change'])
+
+    @staticmethod
+    def _compare(before: pd.DataFrame, after: pd.DataFrame, market: Dict) -> Dict:
+        """Risque et performance passée des quantités détenues avant / après"""
+        product_ids = market['products'].index
+        quantities = np.column_stack([
+            (frame.groupby('product_id')['total_quantity'].sum() if not frame.empty else pd.Series(dtype=float))
+            .reindex(product_ids, fill_value=0.0).to_numpy(dtype=float)
+            for frame in (before, after)
+        ])
+
+        # Valeurs quotidiennes des deux portefeuilles en un produit matriciel
+        values = market['valuation'] @ quantities
+        start = np.where(values[0] > 0, values[0], np.nan) if len(values) else np.full(2, np.nan)
+        evolution = pd.DataFrame({
+            'value_before': values[:, 0], 'value_after': values[:, 1],
+            'index_before': values[:, 0] / start[0] * 100, 'index_after': values[:, 1] / start[1] * 100,
+        }, index=market['dates'])
+
+        # Risque sur les produits couverts par la covariance, pondérés par leur valeur actuelle
+        current = quantities * market['products']['price_eur'].fillna(0.0).to_numpy(dtype=float)[:, None]
+        covered = current[market['covered']]
+        risk = []
+        for column in range(2):
+            total = current[:, column].sum()
+            covered_total = covered[:, column].sum()
+            weights = covered[:, column] / covered_total if covered_total > 0 else np.zeros(len(covered))
+            variance = weights @ market['covariance'] @ weights if covered_total > 0 else np.nan
+            risk.append({
+                'value': total,
+                'volatility': np.sqrt(max(variance, 0.0)) if covered_total > 0 else np.nan,
+                'effective_bets': effective_number_of_bets(market['covariance'], weights, market['eigen']) if covered_total > 0 else np.nan,
+                'period_return': values[-1, column] / start[column] - 1 if len(values) else np.nan,
+                'coverage': covered_total / total if total > 0 else np.nan,
+            })
+
+        return {
+            'risk': pd.DataFrame(risk, index=['before', 'after']),
+            'evolution': evolution,
+        }
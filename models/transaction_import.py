@@ -0,0 +1,193 @@
+import numpy as np
+import pandas as pd
+from typing import Callable, Dict, List, Tuple
+
+from models.currency import CurrencyConverter
+from models.database import DatabaseManager, TRANSACTION_TYPES
+
+# En-têtes acceptés (casse et espaces ignorés) -> colonne interne
+COLUMN_ALIASES = {
+    'date': 'date', 'transaction_date': 'date',
+    'compte': 'account', 'account': 'account', 'account_id': 'account',
+    'symbole': 'symbol', 'symbol': 'symbol',
+    'type': 'type', 'transaction_type': 'type',
+    'quantité': 'quantity', 'quantite': 'quantity', 'quantity': 'quantity',
+    'prix': 'price', 'price': 'price',
+    'devise': 'currency', 'currency': 'currency', 'price_currency': 'currency',
+    'frais': 'fees', 'fees': 'fees',
+    'devise_frais': 'fees_currency', 'fees_currency': 'fees_currency',
+}
+
+# Colonnes obligatoires ; devise (celle du produit par défaut), frais (0) et devise des frais (EUR) sont optionnelles
+REQUIRED_COLUMNS = ['date', 'account', 'symbol', 'type', 'quantity', 'price']
+
+# Types de transaction en français acceptés en plus de TRANSACTION_TYPES
+TYPE_ALIASES = {'ACHAT': 'BUY', 'VENTE': 'SELL', 'DIVIDENDE': 'DIVIDEND'}
+
+
+def read_transactions_csv(source) -> pd.DataFrame:
+    """Lit un fichier CSV de transactions (chemin ou fichier ouvert), séparateur , ou ; détecté"""
+    return pd.read_csv(source, sep=None, engine='python', dtype=str, skipinitialspace=True,
+                       keep_default_na=False, encoding='utf-8-sig')
+
+
+def _parse_numbers(values: pd.Series) -> pd.Series:
+    """Nombres saisis avec virgule ou point décimal, espaces de milliers tolérés (NaN si invalide)"""
+    cleaned = values.str.replace(r'\s', '', regex=True).str.replace(',', '.', regex=False)
+    return pd.to_numeric(cleaned, errors='coerce')
+
+
+def _parse_dates(values: pd.Series) -> pd.Series:
+    """Dates AAAA-MM-JJ (ISO) ou JJ/MM/AAAA (NaT si invalide)"""
+    dates = pd.to_datetime(values, format='ISO8601', errors='coerce')
+    french = dates.isna()
+    dates[french] = pd.to_datetime(values[french], format='%d/%m/%Y', errors='coerce')
+    return dates.dt.normalize()
+
+
+class TransactionImporter:
+    """
+    Import de transactions en lot depuis un CSV ou un DataFrame : validation vectorisée avec une
+    erreur par ligne rejetée, symboles résolus par la dimension produits (une requête), produits
+    manquants créés en un lot, conversion EUR/USD au taux historique en un seul passage, puis
+    insertion des lignes valides dans une seule transaction.
+    """
+
+    def __init__(self, db: DatabaseManager, currency_converter: CurrencyConverter,
+                 add_products: Callable[[List[str]], Dict[str, Tuple[bool, str]]]):
+        self.db = db
+        self.currency_converter = currency_converter
+        # Création des produits manquants : symboles -> (succès, message) par symbole
+        self.add_products = add_products
+
+    def import_transactions(self, data: pd.DataFrame, create_missing_products: bool = True,
+                            dry_run: bool = False) -> Dict:
+        """
+        Valide et importe les transactions de data (une ligne par transaction, voir COLUMN_ALIASES).
+        Avec dry_run, rien n'est écrit ni téléchargé : les produits manquants sont seulement listés.
+        Retourne le nombre de lignes lues, valides et importées, les erreurs (ligne du fichier,
+        message) et les produits créés (ou à créer).
+        """
+        rows = self._normalize(data)
+        errors = pd.Series(None, index=rows.index, dtype=object)
+
+        def reject(mask: pd.Series, message):
+            """Première erreur de chaque ligne : message fixe ou Series de messages"""
+            mask = mask & errors.isna()
+            errors[mask] = message[mask] if isinstance(message, pd.Series) else message
+
+        dates = _parse_dates(rows['date'])
+        reject(dates.isna(), "Date invalide (attendu AAAA-MM-JJ ou JJ/MM/AAAA)")
+
+        types = rows['type'].str.upper().replace(TYPE_ALIASES)
+        reject(~types.isin(TRANSACTION_TYPES), "Type inconnu (" + rows['type'] + ")")
+
+        quantities = _parse_numbers(rows['quantity'])
+        reject(~(quantities > 0), "Quantité invalide (nombre positif attendu)")
+        prices = _parse_numbers(rows['price'])
+        reject(~(prices >= 0), "Prix invalide (nombre positif ou nul attendu)")
+        fees = _parse_numbers(rows['fees'].replace('', '0'))
+        reject(~(fees >= 0), "Frais invalides (nombre positif ou nul attendu)")
+
+        account_ids, account_errors = self._resolve_accounts(rows['account'])
+        reject(account_errors.notna(), account_errors)
+
+        # Symboles résolus sur la dimension produits ; les manquants sont créés en un lot
+        symbols = rows['symbol'].str.upper()
+        reject(symbols == '', "Symbole manquant")
+        dimension = self.db.get_product_dimension()
+        missing = sorted({symbol for symbol in symbols[errors.isna()] if dimension.get_by_symbol(symbol) is None})
+        created = []
+        if missing and create_missing_products and not dry_run:
+            for symbol, (success, message) in self.add_products(missing).items():
+                if success:
+                    created.append(symbol)
+                else:
+                    reject(symbols == symbol, f"Produit '{symbol}' non créé : {message}")
+            dimension = self.db.get_product_dimension()
+
+        products = {symbol: dimension.get_by_symbol(symbol) for symbol in symbols.unique()}
+        product_ids = symbols.map(lambda symbol: products[symbol].id if products[symbol] is not None else None)
+        product_currencies = symbols.map(lambda symbol: products[symbol].currency if products[symbol] is not None else '')
+        pending = symbols.isin(missing) if dry_run else pd.Series(False, index=rows.index)
+        reject(product_ids.isna() & ~pending, "Produit inconnu (" + symbols + ")")
+
+        # Devise du prix : celle du produit par défaut
+        currencies = rows['currency'].str.upper().where(rows['currency'] != '', product_currencies)
+        fees_currencies = rows['fees_currency'].str.upper().replace('', 'EUR')
+        supported = ['EUR', 'USD'] + list(self.currency_converter.other_rates)
+        reject(~currencies.isin(supported) & ~pending, "Devise non supportée (" + currencies + ")")
+        reject(~fees_currencies.isin(supported), "Devise des frais non supportée (" + fees_currencies + ")")
+
+        valid = errors.isna()
+        result = {
+            'rows': len(rows),
+            'valid': int(valid.sum()),
+            'imported': 0,
+            'errors': [(int(position) + 2, message)  # ligne du fichier (en-tête en ligne 1)
+                       for position, message in zip(np.flatnonzero(~valid), errors[~valid])],
+            'created_products': created if not dry_run else missing,
+        }
+        if dry_run or not valid.any():
+            return result
+
+        # Conversion vectorisée au taux EUR/USD historique de chaque date
+        dates, currencies, fees_currencies = dates[valid], currencies[valid], fees_currencies[valid]
+        prices, fees = prices[valid].to_numpy(dtype=float), fees[valid].to_numpy(dtype=float)
+        eur_usd = self.currency_converter.get_historical_eur_usd_rates(dates)
+
+        price_eur = prices * self._to_eur_factors(currencies, eur_usd)
+        price_usd = np.where(currencies == 'USD', prices, price_eur * eur_usd)
+        fees_eur = fees * self._to_eur_factors(fees_currencies, eur_usd)
+
+        transaction_dates = dates.dt.strftime('%Y-%m-%d %H:%M:%S')
+        transaction_rows = list(zip(account_ids[valid].astype(int).tolist(), product_ids[valid].astype(int).tolist(),
+                                    types[valid].tolist(), quantities[valid].tolist(), prices.tolist(),
+                                    currencies.tolist(), price_eur.tolist(), price_usd.tolist(),
+                                    transaction_dates.tolist(), fees_eur.tolist(), fees_currencies.tolist(),
+                                    eur_usd.tolist()))
+        rate_rows = sorted({('EUR', 'USD', rate, day) for day, rate in zip(dates.dt.strftime('%Y-%m-%d'), eur_usd)})
+
+        result['imported'] = self.db.add_transactions(transaction_rows, rate_rows)
+        return result
+
+    def _normalize(self, data: pd.DataFrame) -> pd.DataFrame:
+        """Colonnes renommées (COLUMN_ALIASES), valeurs en texte sans espaces autour, colonnes optionnelles ajoutées"""
+        renamed = {column: COLUMN_ALIASES.get(str(column).strip().lower()) for column in data.columns}
+        missing = [column for column in REQUIRED_COLUMNS if column not in renamed.values()]
+        if missing:
+            raise ValueError(f"Colonnes manquantes : {', '.join(missing)}")
+
+        rows = data[[column for column, name in renamed.items() if name]].rename(columns=renamed)
+        rows = rows.loc[:, ~rows.columns.duplicated()].reset_index(drop=True)
+        rows = rows.fillna('').astype(str).apply(lambda values: values.str.strip())
+        for column in ('currency', 'fees', 'fees_currency'):
+            if column not in rows:
+                rows[column] = ''
+        return rows
+
+    def _resolve_accounts(self, values: pd.Series) -> Tuple[pd.Series, pd.Series]:
+        """Ids des comptes désignés par id ou par nom (casse ignorée), et erreur par ligne"""
+        accounts = self.db.get_account_records()
+        by_id = {str(account.id): account.id for account in accounts}
+        by_name = {}
+        for account in accounts:
+            by_name.setdefault(account.name.strip().lower(), []).append(account.id)
+
+        lookup = {}
+        for value in values.unique():
+            if value in by_id:
+                lookup[value] = (by_id[value], None)
+            elif len(by_name.get(value.lower(), [])) == 1:
+                lookup[value] = (by_name[value.lower()][0], None)
+            elif value.lower() in by_name:
+                lookup[value] = (None, f"Compte ambigu ({value}) : indiquez son id")
+            else:
+                lookup[value] = (None, f"Compte inconnu ({value})")
+
+        return values.map(lambda value: lookup[value][0]), values.map(lambda value: lookup[value][1])
+
+    def _to_eur_factors(self, currencies: pd.Series, eur_usd: np.ndarray) -> np.ndarray:
+        """Facteurs de conversion vers EUR : taux historique pour USD, taux fixes pour les autres devises"""
+        fixed = currencies.map(self.currency_converter.other_rates).fillna(1.0).to_numpy(dtype=float)
+        return np.where(currencies == 'USD', 1.0 / eur_usd, np.where(currencies == 'EUR', 1.0, fixed))
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+
+from models.database import DatabaseManager
+
+
+@pytest.fixture
+def db(tmp_path):
+    """Base vide avec une plateforme, un compte (id 1) et un produit en EUR (id 1)"""
+    db = DatabaseManager(str(tmp_path / 'portfolio.db'))
+    db.add_platform('Courtier')
+    db.add_account(1, 'Compte titres', 'CTO')
+    db.add_financial_product({'symbol': 'TEST.PA', 'name': 'Produit test', 'product_type': 'ETF',
+                              'currency': 'EUR', 'current_price': 10.0, 'current_price_eur': 10.0,
+                              'current_price_usd': 11.0})
+    return db
+
+
+@pytest.fixture
+def add_transaction(db):
+    """Ajoute une transaction en EUR sur le compte et le produit de la base de test"""
+    def add(transaction_type: str, quantity: float, price: float, date: str, fees: float = 0.0,
+            account_id: int = 1, product_id: int = 1):
+        db.add_transaction(account_id, product_id, transaction_type, quantity, price, 'EUR', price,
+                           price * 1.1, datetime.fromisoformat(date), fees, 'EUR', 1.1)
+    return add
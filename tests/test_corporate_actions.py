@@ -0,0 +1,63 @@
+import sqlite3
+
+import pytest
+
+SPLIT = [('2024-06-03', 2.0)]
+
+
+def _rows(db, query):
+    conn = sqlite3.connect(db.db_path)
+    rows = conn.execute(query).fetchall()
+    conn.close()
+    return rows
+
+
+def _prices(db):
+    return dict(_rows(db, "SELECT date, price FROM price_history WHERE product_id = 1"))
+
+
+@pytest.fixture
+def split_db(db, add_transaction):
+    """Deux achats avant un fractionnement de 2 pour 1, un après, et un historique antérieur non ajusté"""
+    add_transaction('BUY', 10, 100.0, '2024-01-10')
+    add_transaction('BUY', 4, 110.0, '2024-03-10')
+    add_transaction('BUY', 6, 60.0, '2024-07-10')
+    db.save_price_history(1, [('2024-01-10', 100.0, 100.0, 110.0), ('2024-03-10', 110.0, 110.0, 121.0)], [])
+    return db
+
+
+def test_second_sync_with_the_same_split_changes_nothing(split_db):
+    applied = split_db.save_price_history(1, [], [], split_rows=SPLIT)
+    assert [(action['ratio'], action['transactions_adjusted'], action['prices_adjusted'])
+            for action in applied] == [(2.0, 2, 2)]
+    transactions = _rows(split_db, "SELECT id, quantity, price FROM transactions ORDER BY id")
+
+    assert split_db.save_price_history(1, [], [], split_rows=SPLIT) == []
+    assert _rows(split_db, "SELECT id, quantity, price FROM transactions ORDER BY id") == transactions
+    assert _prices(split_db) == {'2024-01-10': 50.0, '2024-03-10': 55.0}
+    assert len(split_db.get_corporate_actions()) == 1
+
+
+def test_redownloaded_prices_are_not_divided_twice(split_db):
+    # Le fournisseur renvoie l'historique déjà ajusté avec la colonne Stock Splits
+    adjusted = [('2024-01-10', 50.0, 50.0, 55.0), ('2024-03-10', 55.0, 55.0, 60.5),
+                ('2024-07-10', 60.0, 60.0, 66.0)]
+    split_db.save_price_history(1, adjusted, [], split_rows=SPLIT)
+    assert _prices(split_db) == {'2024-01-10': 50.0, '2024-03-10': 55.0, '2024-07-10': 60.0}
+
+    split_db.save_price_history(1, adjusted, [], split_rows=SPLIT)
+    assert _prices(split_db) == {'2024-01-10': 50.0, '2024-03-10': 55.0, '2024-07-10': 60.0}
+
+
+def test_audit_matches_the_adjusted_transactions(split_db):
+    split_db.save_price_history(1, [], [], split_rows=SPLIT)
+    action_id = int(split_db.get_corporate_actions()['id'].iloc[0])
+    audit = split_db.get_corporate_action_audit(action_id)
+
+    # Seules les transactions antérieures à la date d'effet sont auditées, avec leurs valeurs d'origine
+    assert audit['transaction_id'].tolist() == [1, 2]
+    assert audit['old_quantity'].tolist() == [10, 4]
+    assert audit['old_price'].tolist() == [100.0, 110.0]
+    assert audit['new_quantity'].tolist() == (audit['old_quantity'] * 2).tolist()
+    assert audit['new_price'].tolist() == (audit['old_price'] / 2).tolist()
+    assert _rows(split_db, "SELECT quantity, price FROM transactions WHERE id = 3") == [(6, 60.0)]
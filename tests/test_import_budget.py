@@ -0,0 +1,14 @@
+from utils.import_budget import (COLD_START_MODULE, base_import_time, check_import_budget, loaded_lazy_modules,
+                                 measure_import_time)
+
+
+def test_cold_start_within_budget():
+    timings = measure_import_time()
+    assert COLD_START_MODULE in timings
+    assert check_import_budget(timings, base_import_time()) == []
+
+
+def test_pages_load_heavy_modules_on_demand():
+    # Les pages, importées au premier affichage, ne chargent pas non plus les modules lourds
+    timings = measure_import_time('ui.dashboard, ui.portfolio, ui.transactions, ui.config', repeat=1)
+    assert loaded_lazy_modules(timings) == []
@@ -0,0 +1,81 @@
+import sqlite3
+
+import pytest
+
+from models.lots import LotEngine
+
+
+def _realized(engine, method):
+    return engine.get_realized_pnl(method)['realized_eur'].sum()
+
+
+def _open_lots(db, method):
+    conn = sqlite3.connect(db.db_path)
+    lots = conn.execute("SELECT quantity, cost_eur FROM open_lots WHERE method = ? ORDER BY lot_order",
+                        (method,)).fetchall()
+    conn.close()
+    return lots
+
+
+def _rebuild(db, engine, method):
+    """Réalisé et lots ouverts recalculés depuis zéro, pour comparer au calcul incrémental"""
+    conn = sqlite3.connect(db.db_path)
+    for table in ('open_lots', 'realized_pnl', 'lot_state'):
+        conn.execute(f"DELETE FROM {table} WHERE method = ?", (method,))
+    conn.commit()
+    conn.close()
+    return _realized(engine, method), _open_lots(db, method)
+
+
+def test_partial_sells_across_several_lots(db, add_transaction):
+    engine = LotEngine(db)
+    add_transaction('BUY', 10, 10.0, '2024-01-10')
+    add_transaction('BUY', 10, 12.0, '2024-02-10')
+    add_transaction('SELL', 15, 15.0, '2024-03-10')
+
+    # Le premier lot est soldé, le second entamé de 5 titres
+    assert _realized(engine, 'FIFO') == pytest.approx(225 - (100 + 5 * 12))
+    assert _open_lots(db, 'FIFO') == [pytest.approx((5, 60))]
+
+    # Vente suivante appliquée incrémentalement sur le reste du second lot
+    add_transaction('SELL', 3, 20.0, '2024-04-10', fees=1.0)
+    assert _realized(engine, 'FIFO') == pytest.approx(65 + (60 - 1 - 36))
+    unrealized = engine.get_unrealized_pnl('FIFO').iloc[0]
+    assert (unrealized['quantity'], unrealized['cost_eur']) == pytest.approx((2, 24))
+
+    incremental = (_realized(engine, 'FIFO'), _open_lots(db, 'FIFO'))
+    assert _rebuild(db, engine, 'FIFO') == incremental
+
+
+def test_fifo_and_pru_realize_different_gains(db, add_transaction):
+    engine = LotEngine(db)
+    add_transaction('BUY', 10, 10.0, '2024-01-10')
+    add_transaction('BUY', 10, 20.0, '2024-02-10')
+    add_transaction('SELL', 10, 25.0, '2024-03-10')
+
+    # FIFO cède le lot à 10, le PRU le coût moyen de 15
+    assert _realized(engine, 'FIFO') == pytest.approx(250 - 100)
+    assert _realized(engine, 'PRU') == pytest.approx(250 - 150)
+    assert engine.get_unrealized_pnl('FIFO').iloc[0]['cost_eur'] == pytest.approx(200)
+    assert engine.get_unrealized_pnl('PRU').iloc[0]['cost_eur'] == pytest.approx(150)
+
+
+def test_backdated_insert_and_delete_rebuild_the_lots(db, add_transaction):
+    engine = LotEngine(db)
+    add_transaction('BUY', 10, 10.0, '2024-01-10')
+    add_transaction('SELL', 5, 20.0, '2024-03-01')
+    assert _realized(engine, 'FIFO') == pytest.approx(100 - 50)
+
+    # Achat antérieur à la dernière vente appliquée : l'état du couple est invalidé puis recalculé
+    add_transaction('BUY', 10, 5.0, '2024-01-01')
+    conn = sqlite3.connect(db.db_path)
+    assert conn.execute("SELECT COUNT(*) FROM lot_state").fetchone()[0] == 0
+    assert _realized(engine, 'FIFO') == pytest.approx(100 - 25)
+    assert _open_lots(db, 'FIFO') == [pytest.approx((5, 25)), pytest.approx((10, 100))]
+
+    # Suppression de cet achat : retour au calcul initial
+    conn.execute("DELETE FROM transactions WHERE transaction_date LIKE '2024-01-01%'")
+    conn.commit()
+    conn.close()
+    assert _realized(engine, 'FIFO') == pytest.approx(100 - 50)
+    assert _open_lots(db, 'FIFO') == [pytest.approx((5, 50))]
@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+import models.returns as returns
+from models.returns import batch_xirr
+
+
+def _xirr(*flows):
+    """TRI de chaque série de flux (années, montant), résolues en un seul appel"""
+    group = np.concatenate([np.full(len(series), index) for index, series in enumerate(flows)])
+    years = np.array([year for series in flows for year, _ in series], dtype=float)
+    amounts = np.array([amount for series in flows for _, amount in series], dtype=float)
+    return batch_xirr(group, years, amounts, len(flows))
+
+
+def test_closed_form_rate():
+    assert _xirr([(0, -1000), (1, 1100)])[0] == pytest.approx(0.10)
+
+
+def test_no_sign_change_is_nan():
+    rates = _xirr([(0, -1000), (1, -500)], [(0, 1000), (1, 100)])
+    assert np.isnan(rates).all()
+
+
+def test_several_groups_in_one_call():
+    rates = _xirr(
+        [(0, -1000), (1, 1100)],
+        [(0, -1000), (2, 1000 * 1.05 ** 2)],
+        [(0, -1000), (0.5, -1000), (1, 500)],
+        [(0, -100), (1, 80)],
+    )
+    assert rates[0] == pytest.approx(0.10)
+    assert rates[1] == pytest.approx(0.05)
+    # Deux apports, un retrait inférieur : perte proche de -100 %
+    assert -1 < rates[2] < -0.5
+    assert rates[3] == pytest.approx(-0.20)
+
+
+def test_bisection_fallback(monkeypatch):
+    flows = ([(0, -1000), (1, 1100)], [(0, -1000), (0.5, 300), (1.5, 900)], [(0, -1000), (1, -1)])
+    expected = _xirr(*flows)
+
+    # Sans itération de Newton, tous les groupes solubles passent par la dichotomie
+    monkeypatch.setattr(returns, 'XIRR_MAX_ITERATIONS', 0)
+    rates = _xirr(*flows)
+    assert rates[:2] == pytest.approx(expected[:2])
+    assert rates[0] == pytest.approx(0.10)
+    assert np.isnan(rates[2])
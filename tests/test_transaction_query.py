@@ -0,0 +1,28 @@
+def test_one_day_range_includes_the_whole_day(db, add_transaction):
+    add_transaction('BUY', 1, 10.0, '2024-06-30 23:59:59')
+    add_transaction('BUY', 2, 10.0, '2024-07-01 00:00:00')
+    add_transaction('SELL', 1, 11.0, '2024-07-01 17:30:00')
+    add_transaction('BUY', 3, 10.0, '2024-07-02 00:00:00')
+
+    page, next_cursor = db.query_transactions({'start_date': '2024-07-01', 'end_date': '2024-07-01'}, limit=None)
+
+    assert sorted(page['quantity']) == [1, 2]
+    assert next_cursor is None
+    assert db.get_transaction_stats({'start_date': '2024-07-01', 'end_date': '2024-07-01'})['count'] == 2
+
+
+def test_keyset_pages_cover_every_row_once(db, add_transaction):
+    # Plusieurs transactions à la même date : le départage se fait sur l'id
+    for day in ('2024-07-01', '2024-07-01', '2024-07-01', '2024-07-02', '2024-07-03'):
+        add_transaction('BUY', 1, 10.0, day)
+
+    for order in ('asc', 'desc'):
+        seen, cursor = [], None
+        while True:
+            page, cursor = db.query_transactions({'end_date': '2024-07-02'}, order=order, limit=2, cursor=cursor)
+            assert len(page) <= 2
+            seen.extend(page['id'])
+            if cursor is None:
+                break
+        expected = [1, 2, 3, 4]
+        assert seen == (expected if order == 'asc' else expected[::-1])
@@ -1,6 +1,9 @@
 import streamlit as st
 import pandas as pd
 
+from ui import data_cache
+from ui.progress import StreamlitReporter
+
 def accounts_page(tracker):
     st.title("💼 Gestion des Comptes")
     
@@ -19,23 +22,23 @@ def accounts_page(tracker):
                     st.error("Cette plateforme existe déjà!")
         
         st.subheader("Plateformes existantes")
-        platforms = tracker.get_platforms()
+        platforms = data_cache.get_platforms(tracker)
         
         if not platforms.empty:
-            for idx, platform in platforms.iterrows():
-                with st.expander(f"🏢 {platform['name']}"):
+            for platform in platforms.itertuples(index=False):
+                with st.expander(f"🏢 {platform.name}"):
                     col1, col2 = st.columns([3, 1])
                     
                     with col1:
-                        with st.form(f"edit_platform_{platform['id']}"):
+                        with st.form(f"edit_platform_{platform.id}"):
                             st.write("**Modifier cette plateforme :**")
-                            new_name = st.text_input("Nom", value=platform['name'], key=f"pname_{platform['id']}")
-                            new_desc = st.text_area("Description", value=platform['description'] or "", key=f"pdesc_{platform['id']}")
+                            new_name = st.text_input("Nom", value=platform.name, key=f"pname_{platform.id}")
+                            new_desc = st.text_area("Description", value=platform.description or "", key=f"pdesc_{platform.id}")
                             
                             col_update, col_delete = st.columns(2)
                             with col_update:
                                 if st.form_submit_button("✏️ Modifier", type="primary"):
-                                    if tracker.update_platform(platform['id'], new_name, new_desc):
+                                    if tracker.update_platform(platform.id, new_name, new_desc):
                                         st.success("Plateforme modifiée!")
                                         st.rerun()
                                     else:
@@ -43,7 +46,7 @@ def accounts_page(tracker):
                             
                             with col_delete:
                                 if st.form_submit_button("🗑️ Supprimer", type="secondary"):
-                                    success, message = tracker.delete_platform(platform['id'])
+                                    success, message = tracker.delete_platform(platform.id)
                                     if success:
                                         st.success(message)
                                         st.rerun()
@@ -52,15 +55,15 @@ def accounts_page(tracker):
                     
                     with col2:
                         st.write("**Informations :**")
-                        st.write(f"**ID :** {platform['id']}")
-                        if platform['description']:
-                            st.write(f"**Description :** {platform['description']}")
+                        st.write(f"**ID :** {platform.id}")
+                        if platform.description:
+                            st.write(f"**Description :** {platform.description}")
         else:
             st.info("Aucune plateforme ajoutée.")
     
     with tab2:
         st.subheader("Ajouter un compte")
-        platforms = tracker.get_platforms()
+        platforms = data_cache.get_platforms(tracker)
         if not platforms.empty:
             with st.form("add_account"):
                 platform_choice = st.selectbox("Plateforme", 
@@ -77,10 +80,10 @@ def accounts_page(tracker):
             st.warning("Ajoutez d'abord une plateforme pour créer des comptes.")
         
         st.subheader("Comptes existants")
-        accounts = tracker.get_accounts()
+        accounts = data_cache.get_account_records(tracker)
         
-        if not accounts.empty:
-            for idx, account in accounts.iterrows():
+        if accounts:
+            for account in accounts:
                 with st.expander(f"💼 {account['name']} ({account['platform_name']})"):
                     col1, col2 = st.columns([3, 1])
                     
@@ -203,7 +206,7 @@ def accounts_page(tracker):
         st.divider()
         
         st.subheader("Produits financiers")
-        products = tracker.get_financial_products()
+        products = data_cache.get_financial_products(tracker)
         
         if not products.empty:
             # Statistiques rapides avec nouvelles informations
@@ -229,11 +232,11 @@ def accounts_page(tracker):
                 key="product_filter"
             )
             
-            if filter_type != "Tous":
-                products = products[products['product_type'] == filter_type]
+            product_records = [product for product in data_cache.get_product_records(tracker)
+                               if filter_type == "Tous" or product.product_type == filter_type]
             
             # Affichage des produits avec nouvelles informations
-            for idx, product in products.iterrows():
+            for product in product_records:
                 status_icon = "✅" if pd.notna(product['current_price']) else "⚠️"
                 
                 # Affichage des prix dans toutes les devises disponibles
@@ -361,7 +364,7 @@ def accounts_page(tracker):
                         # Bouton de mise à jour du prix
                         if st.button(f"🔄 Actualiser prix", key=f"update_price_{product['id']}"):
                             with st.spinner(f"Mise à jour de {product['symbol']}..."):
-                                if tracker.update_price(product['symbol']):
+                                if tracker.update_price(product['symbol'], reporter=StreamlitReporter()):
                                     st.success("✅ Prix mis à jour !")
                                     st.rerun()
                                 else:
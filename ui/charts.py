@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+
+from utils.downsampling import lttb_indices
+
+# Points par série envoyés au navigateur (de l'ordre de la largeur d'un graphique en pixels)
+CHART_POINT_BUDGET = 1000
+
+# Au-delà de ce nombre de points dans une trace, le rendu passe en WebGL (Scattergl)
+WEBGL_POINT_THRESHOLD = 500
+
+# Colonnes des courbes d'évolution
+EVOLUTION_LINE_COLUMNS = ['date', 'total_value', 'total_invested', 'gain_loss']
+
+
+def evolution_chart_data(evolution: pd.DataFrame, breakdown_key: Optional[str] = None,
+                         budget: int = CHART_POINT_BUDGET) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Étape entre get_portfolio_evolution et Plotly : ramène chaque trace à au plus budget points.
+    Retourne les courbes (EVOLUTION_LINE_COLUMNS) et la répartition selon breakdown_key
+    (une colonne par catégorie, triées ; vide sans breakdown_key), sur les mêmes dates, ce que
+    l'empilement exige : elles sont choisies par LTTB sur la valeur totale (le total empilé
+    de la répartition) et reprises pour chaque série.
+    """
+    lines = evolution[EVOLUTION_LINE_COLUMNS].reset_index(drop=True)
+    if breakdown_key:
+        breakdown = pd.DataFrame([value if isinstance(value, dict) else {} for value in evolution[breakdown_key]],
+                                 index=lines.index, dtype=float).fillna(0)
+        breakdown = breakdown[sorted(breakdown.columns)]
+    else:
+        breakdown = pd.DataFrame(index=lines.index)
+
+    x = lines['date'].to_numpy(dtype='datetime64[ns]').astype(np.int64)
+    keep = lttb_indices(x, lines['total_value'].to_numpy(), budget)
+
+    return lines.iloc[keep].reset_index(drop=True), breakdown.iloc[keep].reset_index(drop=True)
+
+
+def line_trace(x, y, **kwargs):
+    """
+    Trace de courbe : Scattergl (WebGL) au-delà de WEBGL_POINT_THRESHOLD points, Scatter (SVG)
+    sinon ou pour une aire empilée (stackgroup n'existe pas en WebGL)
+    """
+    import plotly.graph_objects as go
+
+    if len(x) > WEBGL_POINT_THRESHOLD and 'stackgroup' not in kwargs:
+        return go.Scattergl(x=x, y=y, **kwargs)
+    return go.Scatter(x=x, y=y, **kwargs)
@@ -2,6 +2,10 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
+from models.alerts import ALERT_TYPES, ALERT_TYPE_LABELS, WINDOW_ALERT_TYPES, format_alert_value
+from ui import data_cache
+from ui.progress import StreamlitReporter
+
 def config_page(tracker):
     st.title("⚙️ Configuration")
     
@@ -15,26 +19,179 @@ def config_page(tracker):
                                     min_value=1, max_value=365, value=30)
         if st.button("🔄 Actualiser tous les prix"):
             with st.spinner("Mise à jour en cours..."):
-                tracker.update_all_prices(update_days)
+                tracker.update_all_prices(update_days, StreamlitReporter())
             st.success("Tous les prix ont été mis à jour!")
             st.rerun()
     
     with col2:
         st.write("**Mise à jour d'un produit spécifique**")
-        products = tracker.get_financial_products()
+        products = data_cache.get_financial_products(tracker)
         if not products.empty:
             product_to_update = st.selectbox("Produit à actualiser", 
                                            products['symbol'].tolist(),
                                            format_func=lambda x: f"{x} - {products[products['symbol']==x]['name'].iloc[0]}")
             if st.button("🔄 Actualiser ce produit"):
-                if tracker.update_price(product_to_update, update_days):
+                if tracker.update_price(product_to_update, update_days, StreamlitReporter()):
                     st.success(f"Prix de {product_to_update} mis à jour!")
                     st.rerun()
                 else:
                     st.error(f"Erreur lors de la mise à jour de {product_to_update}")
-    
+
     st.divider()
-    
+
+    st.subheader("📏 Indices de référence")
+    st.caption("Indices suivis pour comparaison sur les graphiques d'évolution, sans apparaître dans vos positions")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write("**Ajouter un indice**")
+        benchmark_symbol = st.text_input("Symbole Yahoo Finance", placeholder="Ex: CW8.PA, SPY, ^GSPC")
+        benchmark_years = st.number_input("Années d'historique", min_value=1, max_value=20, value=5)
+        if st.button("➕ Ajouter l'indice"):
+            if benchmark_symbol.strip():
+                with st.spinner(f"Récupération de {benchmark_symbol.strip().upper()}..."):
+                    success, message = tracker.add_benchmark(benchmark_symbol.strip().upper(), int(benchmark_years))
+                if success:
+                    st.success(message)
+                    st.rerun()
+                else:
+                    st.error(message)
+            else:
+                st.error("Veuillez saisir un symbole")
+
+    with col2:
+        st.write("**Indices suivis**")
+        benchmarks = tracker.get_benchmarks()
+        if not benchmarks.empty:
+            for benchmark in benchmarks.itertuples(index=False):
+                bcol1, bcol2 = st.columns([4, 1])
+                with bcol1:
+                    period_info = f"du {benchmark.first_date} au {benchmark.last_date}" if benchmark.history_count > 0 else "aucun historique"
+                    st.write(f"**{benchmark.symbol}** - {benchmark.name} ({benchmark.history_count} prix, {period_info})")
+                with bcol2:
+                    if st.button("🗑️", key=f"delete_benchmark_{benchmark.id}"):
+                        success, message = tracker.delete_financial_product(int(benchmark.id))
+                        if success:
+                            st.rerun()
+                        else:
+                            st.error(message)
+        else:
+            st.info("Aucun indice de référence. Les produits déjà suivis peuvent aussi servir de comparaison.")
+
+    st.divider()
+
+    st.subheader("✂️ Opérations sur titres")
+    st.caption("Les fractionnements détectés lors de la mise à jour des prix sont appliqués automatiquement "
+               "aux transactions et à l'historique antérieurs")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write("**Saisir un fractionnement**")
+        split_products = data_cache.get_financial_products(tracker)
+        if not split_products.empty:
+            split_symbol = st.selectbox("Produit", split_products['symbol'].tolist(), key="split_symbol")
+            split_date = st.date_input("Date d'effet", value=datetime.now().date(), key="split_date")
+            split_ratio = st.number_input("Ratio (parts reçues pour une part)", min_value=0.001, value=2.0,
+                                          step=1.0, format="%.3f",
+                                          help="2 pour une division par deux du cours, 0.1 pour un regroupement de 10 en 1")
+            if st.button("✂️ Appliquer le fractionnement"):
+                success, message = tracker.add_split(split_symbol, datetime.combine(split_date, datetime.min.time()),
+                                                     split_ratio)
+                if success:
+                    st.success(message)
+                else:
+                    st.error(message)
+        else:
+            st.info("Aucun produit financier")
+
+    with col2:
+        st.write("**Historique des opérations**")
+        actions = tracker.get_corporate_actions()
+        if not actions.empty:
+            for action in actions.itertuples(index=False):
+                status = (f"{action.transactions_adjusted} transaction(s), {action.prices_adjusted} prix ajustés"
+                          if pd.notna(action.applied_at) else "en attente")
+                with st.expander(f"{action.symbol} - {action.ex_date} : {action.ratio:g} pour 1 ({action.source})"):
+                    st.write(f"Appliqué le {action.applied_at} : {status}" if pd.notna(action.applied_at) else status)
+                    audit = tracker.get_corporate_action_audit(int(action.id))
+                    if not audit.empty:
+                        st.dataframe(audit, hide_index=True)
+        else:
+            st.info("Aucune opération enregistrée")
+
+    st.divider()
+
+    st.subheader("🔔 Alertes de prix")
+    st.caption("Les alertes sont évaluées après chaque actualisation des prix ; "
+               "une alerte ne se redéclenche qu'après être repassée sous son seuil")
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write("**Nouvelle alerte**")
+        alert_products = data_cache.get_financial_products(tracker)
+        if not alert_products.empty:
+            alert_symbol = st.selectbox("Produit", alert_products['symbol'].tolist(), key="alert_symbol")
+            alert_type = st.selectbox("Condition", list(ALERT_TYPES), format_func=ALERT_TYPE_LABELS.get,
+                                      key="alert_type")
+            if alert_type in ('PRICE_ABOVE', 'PRICE_BELOW'):
+                currency = alert_products.loc[alert_products['symbol'] == alert_symbol, 'currency'].iloc[0]
+                threshold = st.number_input(f"Seuil ({currency})", min_value=0.0, value=100.0, step=1.0,
+                                            key="alert_threshold_price")
+            else:
+                threshold = st.number_input("Seuil (%)", value=-10.0 if alert_type == 'MOVE' else 10.0, step=1.0,
+                                            key="alert_threshold_pct",
+                                            help="Variation négative pour une alerte de baisse") / 100
+            window_days = st.number_input("Horizon (jours)", min_value=0, value=30, step=1, key="alert_window",
+                                          help="Requis pour une variation ; 0 = tout l'historique pour une baisse",
+                                          disabled=alert_type not in WINDOW_ALERT_TYPES + ('DRAWDOWN',))
+            note = st.text_input("Note", key="alert_note")
+            if st.button("🔔 Créer l'alerte"):
+                success, message = tracker.add_alert(
+                    alert_symbol, alert_type, threshold,
+                    int(window_days) if alert_type in WINDOW_ALERT_TYPES + ('DRAWDOWN',) else None, note
+                )
+                if success:
+                    st.success(message)
+                    st.rerun()
+                else:
+                    st.error(message)
+        else:
+            st.info("Aucun produit financier")
+
+    with col2:
+        st.write("**Alertes configurées**")
+        alerts = tracker.get_alerts()
+        if not alerts.empty:
+            for alert in alerts.itertuples(index=False):
+                status = "🔴 déclenchée" if alert.is_triggered else ("🟢 active" if alert.active else "⏸️ suspendue")
+                horizon = f" ({int(alert.window_days)} j)" if pd.notna(alert.window_days) else ""
+                with st.expander(f"{alert.symbol} - {ALERT_TYPE_LABELS[alert.alert_type]}{horizon} "
+                                 f"{format_alert_value(alert.alert_type, alert.threshold, alert.currency)} "
+                                 f"- {status}"):
+                    if alert.note:
+                        st.write(alert.note)
+                    if pd.notna(alert.last_fired_at):
+                        st.caption(f"Dernier déclenchement : {alert.last_fired_at}")
+                    button_col1, button_col2 = st.columns(2)
+                    with button_col1:
+                        if st.button("⏸️ Suspendre" if alert.active else "▶️ Réactiver", key=f"toggle_alert_{alert.id}"):
+                            tracker.set_alert_active(int(alert.id), not alert.active)
+                            st.rerun()
+                    with button_col2:
+                        if st.button("🗑️ Supprimer", key=f"delete_alert_{alert.id}"):
+                            tracker.delete_alert(int(alert.id))
+                            st.rerun()
+            if st.button("🔍 Évaluer maintenant"):
+                fired = tracker.check_alerts()
+                st.info(f"{len(fired)} nouvelle(s) alerte(s) déclenchée(s)")
+        else:
+            st.info("Aucune alerte configurée")
+
+    st.divider()
+
     st.subheader("🔍 Diagnostic des Graphiques d'Évolution")
     st.write("Vérifiez pourquoi les graphiques d'évolution ne s'affichent pas :")
     
@@ -43,7 +200,7 @@ def config_page(tracker):
             # 1. Vérifier les données de base
             st.write("**📊 1. Vérification des données de base :**")
             
-            transactions = tracker.get_all_transactions()
+            transactions = data_cache.get_all_transactions(tracker)
             if transactions.empty:
                 st.error("❌ Aucune transaction trouvée ! Ajoutez des transactions d'abord.")
                 return
@@ -56,7 +213,7 @@ def config_page(tracker):
             # 2. Vérifier l'historique des prix
             st.write("**📈 2. Vérification de l'historique des prix :**")
             
-            stats = tracker.db.get_database_stats()
+            stats = data_cache.get_database_stats(tracker)
             history_count = stats.get('price_history', 0)
             
             if history_count == 0:
@@ -150,7 +307,7 @@ def config_page(tracker):
             with st.spinner("Mise à jour du taux de change EUR/USD..."):
                 # Forcer la mise à jour en réinitialisant la date
                 tracker.currency_converter.last_update = None
-                success = tracker.currency_converter.get_eur_usd_rate(show_debug=True)
+                success = tracker.currency_converter.get_eur_usd_rate(StreamlitReporter())
                 if success:
                     st.success("✅ Taux EUR/USD mis à jour!")
                 else:
@@ -236,7 +393,7 @@ def config_page(tracker):
         if st.button("🚀 Initialiser l'historique complet", type="primary"):
             if not products.empty:
                 st.warning("⚠️ Cette opération peut prendre plusieurs minutes. Ne fermez pas la page.")
-                tracker.initialize_price_history(history_days)
+                tracker.initialize_price_history(history_days, StreamlitReporter())
                 st.success("🎉 Historique initialisé ! Vous pouvez maintenant utiliser les courbes d'évolution.")
                 st.rerun()
             else:
@@ -246,7 +403,7 @@ def config_page(tracker):
         # Statistiques sur l'historique actuel
         if not products.empty:
             with st.expander("📊 État de l'historique actuel", expanded=False):
-                stats = tracker.db.get_database_stats()
+                stats = data_cache.get_database_stats(tracker)
                 history_count = stats.get('price_history', 0)
                 
                 st.write(f"**Total points d'historique :** {history_count}")
@@ -258,17 +415,17 @@ def config_page(tracker):
                     conn = sqlite3.connect(tracker.db.db_path)
                     cursor = conn.cursor()
                     
-                    for _, product in products.iterrows():
+                    for product in products.itertuples(index=False):
                         cursor.execute('''SELECT COUNT(*), MIN(date), MAX(date) 
-                                        FROM price_history WHERE product_id = ?''', (product['id'],))
+                                        FROM price_history WHERE product_id = ?''', (product.id,))
                         result = cursor.fetchone()
                         count, min_date, max_date = result
                         
                         if count > 0:
-                            st.write(f"**{product['symbol']}** : {count} points")
+                            st.write(f"**{product.symbol}** : {count} points")
                             st.write(f"   📅 Du {min_date} au {max_date}")
                         else:
-                            st.write(f"**{product['symbol']}** : ❌ Aucun historique")
+                            st.write(f"**{product.symbol}** : ❌ Aucun historique")
                     
                     conn.close()
                 else:
@@ -279,9 +436,9 @@ def config_page(tracker):
     st.subheader("📊 Informations sur la base de données")
     
     # Statistiques générales
-    platforms = tracker.get_platforms()
-    accounts = tracker.get_accounts()
-    stats = tracker.db.get_database_stats()
+    platforms = data_cache.get_platforms(tracker)
+    accounts = data_cache.get_accounts(tracker)
+    stats = data_cache.get_database_stats(tracker)
     
     col1, col2, col3, col4 = st.columns(4)
     with col1:
@@ -351,7 +508,7 @@ def config_page(tracker):
     # Section de maintenance
     st.subheader("🛠️ Maintenance")
     
-    col1, col2, col3 = st.columns(3)
+    col1, col2, col3, col4 = st.columns(4)
     
     with col1:
         st.write("**🧹 Nettoyage**")
@@ -364,6 +521,7 @@ def config_page(tracker):
             deleted_count = cursor.rowcount
             conn.commit()
             conn.close()
+            tracker.db.mark_written()
             st.success(f"✅ {deleted_count} entrées supprimées")
             st.rerun()
     
@@ -377,6 +535,21 @@ def config_page(tracker):
         if st.button("Recharger l'application"):
             st.rerun()
     
+    with col4:
+        st.write("**🧮 Positions**")
+        if st.button("Reconstruire les positions"):
+            with st.spinner("Recalcul des positions depuis les transactions..."):
+                report = tracker.db.rebuild_positions()
+            if report['mismatches']:
+                st.warning(f"⚠️ {len(report['mismatches'])} écart(s) corrigé(s) sur {report['positions']} positions")
+                st.dataframe(pd.DataFrame([
+                    {'account_id': m['account_id'], 'product_id': m['product_id'],
+                     'quantité attendue': m['expected']['quantity'], 'quantité stockée': m['stored']['quantity']}
+                    for m in report['mismatches']
+                ]), use_container_width=True, hide_index=True)
+            else:
+                st.success(f"✅ {report['positions']} positions vérifiées, aucun écart")
+    
     # Section de debug avancé
     with st.expander("🔧 Debug Avancé", expanded=False):
         st.write("**Informations techniques :**")
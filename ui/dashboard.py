@@ -1,9 +1,17 @@
 import streamlit as st
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
 
+from models.alerts import ALERT_TYPE_LABELS, format_alert_value
+from models.exchange_rates import currency_symbol
+from ui import data_cache
+from ui.charts import line_trace
+from ui.progress import StreamlitReporter
+
+# Pastille et libellé des types de transactions
+TRANSACTION_LABELS = {'BUY': ("🟢", "ACHAT"), 'SELL': ("🔴", "VENTE"), 'DIVIDEND': ("🔵", "DIVIDENDE")}
+
 def dashboard_page(tracker):
     st.title("🏠 Tableau de Bord")
     
@@ -15,35 +23,57 @@ def dashboard_page(tracker):
     with col2:
         if st.button("🔄 Actualiser tous les prix"):
             with st.spinner("Mise à jour des prix..."):
-                tracker.update_all_prices(30)
+                tracker.update_all_prices(30, StreamlitReporter())
             st.success("Prix mis à jour!")
             st.rerun()
     
-    # Résumé du portefeuille
-    portfolio = tracker.get_portfolio_summary()
+    # Alertes déclenchées et pas encore lues
+    alert_events = data_cache.get_alert_events(tracker)
+    if not alert_events.empty:
+        lines = []
+        for event in alert_events.itertuples(index=False):
+            horizon = f" ({int(event.window_days)} j)" if pd.notna(event.window_days) else ""
+            lines.append(
+                f"- **{event.symbol}** : {ALERT_TYPE_LABELS.get(event.alert_type, event.alert_type)}{horizon} "
+                f"{format_alert_value(event.alert_type, event.threshold, event.currency)} "
+                f"→ {format_alert_value(event.alert_type, event.value, event.currency)} "
+                f"({event.trigger_date})"
+            )
+        col1, col2 = st.columns([5, 1])
+        with col1:
+            st.warning(f"🔔 **{len(alert_events)} alerte(s) déclenchée(s)**\n" + "\n".join(lines))
+        with col2:
+            if st.button("✔️ Marquer comme lues"):
+                tracker.acknowledge_alert_events(alert_events['id'].tolist())
+                st.rerun()
+    
+    # Résumé du portefeuille dans la devise de valorisation choisie
+    currency = st.session_state.get('reporting_currency', 'EUR')
+    symbol = currency_symbol(currency)
+    portfolio = data_cache.get_portfolio_summary(tracker, currency=currency)
     
     if not portfolio.empty:
         # Métriques principales
         total_invested = portfolio['total_invested'].sum()
         total_current = portfolio['current_value'].sum()
-        total_gain_loss = total_current - total_invested
+        total_gain_loss = portfolio['gain_loss'].sum()  # dividendes perçus inclus
         total_gain_loss_pct = (total_gain_loss / total_invested) * 100 if total_invested > 0 else 0
         
         st.subheader("📊 Vue d'ensemble")
         col1, col2, col3, col4 = st.columns(4)
         
         with col1:
-            st.metric("💰 Valeur totale", f"{total_current:,.2f} €")
+            st.metric("💰 Valeur totale", f"{total_current:,.2f} {symbol}")
         with col2:
-            st.metric("💸 Investi", f"{total_invested:,.2f} €")
+            st.metric("💸 Investi", f"{total_invested:,.2f} {symbol}")
         with col3:
-            st.metric("📈 Plus/Moins value", f"{total_gain_loss:,.2f} €", 
+            st.metric("📈 Plus/Moins value", f"{total_gain_loss:,.2f} {symbol}", 
                      delta=f"{total_gain_loss_pct:.2f}%")
         with col4:
             st.metric("📊 Nombre de positions", len(portfolio))
         
         # Vérifier s'il y a des données d'historique
-        stats = tracker.db.get_database_stats()
+        stats = data_cache.get_database_stats(tracker)
         history_count = stats.get('price_history', 0)
         
         if history_count > 0:
@@ -53,7 +83,7 @@ def dashboard_page(tracker):
             end_date = datetime.now()
             start_date = end_date - timedelta(days=365)
             
-            evolution_data = tracker.get_portfolio_evolution(start_date, end_date)
+            evolution_data = data_cache.get_portfolio_evolution(tracker, start_date, end_date, currency=currency)
             
             if not evolution_data.empty and len(evolution_data) > 1:
                 # Calculer la variation
@@ -66,20 +96,21 @@ def dashboard_page(tracker):
                 
                 with col1:
                     # Graphique simple et épuré
+                    chart_lines, _ = data_cache.get_evolution_chart_data(tracker, start_date, end_date, currency=currency)
                     fig_quick = go.Figure()
-                    fig_quick.add_trace(go.Scatter(
-                        x=evolution_data['date'],
-                        y=evolution_data['total_value'],
+                    fig_quick.add_trace(line_trace(
+                        x=chart_lines['date'],
+                        y=chart_lines['total_value'],
                         mode='lines',
                         name='Valeur du portefeuille',
                         line=dict(color='#1f77b4', width=3),
                         fill='tonexty',
-                        hovertemplate='<b>%{x}</b><br>Valeur: %{y:,.2f} €<extra></extra>'
+                        hovertemplate=f'<b>%{{x}}</b><br>Valeur: %{{y:,.2f}} {symbol}<extra></extra>'
                     ))
                     
                     fig_quick.update_layout(
                         xaxis_title="Date",
-                        yaxis_title="Valeur (€)",
+                        yaxis_title=f"Valeur ({symbol})",
                         height=400,
                         showlegend=False,
                         margin=dict(l=0, r=0, t=20, b=0),
@@ -95,7 +126,7 @@ def dashboard_page(tracker):
                 
                 with col2:
                     st.metric("📊 Variation 1 an", 
-                             f"{variation:,.2f} €",
+                             f"{variation:,.2f} {symbol}",
                              delta=f"{variation_pct:.2f}%")
             else:
                 st.info("📊 Pas assez de données pour afficher l'évolution sur 1 an. Vérifiez que vous avez des transactions et de l'historique de prix.")
@@ -103,6 +134,8 @@ def dashboard_page(tracker):
             st.info("🔧 Pour voir les courbes d'évolution, initialisez l'historique des prix dans la Configuration.")
         
         # Graphiques de répartition
+        import plotly.express as px
+        
         col1, col2 = st.columns(2)
         
         with col1:
@@ -126,43 +159,41 @@ def dashboard_page(tracker):
         
         # Affichage des transactions récentes
         st.subheader("📋 Transactions récentes")
-        all_transactions = tracker.get_all_transactions()
-        recent_transactions = all_transactions.head(5) if not all_transactions.empty else pd.DataFrame()
+        recent_transactions, _ = data_cache.query_transactions(tracker, limit=5)
         
         if not recent_transactions.empty:
-            for _, transaction in recent_transactions.iterrows():
-                type_color = "🟢" if transaction['transaction_type'] == 'BUY' else "🔴"
-                type_label = "ACHAT" if transaction['transaction_type'] == 'BUY' else "VENTE"
+            for transaction in recent_transactions.itertuples(index=False):
+                type_color, type_label = TRANSACTION_LABELS.get(transaction.transaction_type, ("🔴", "VENTE"))
                 
                 col1, col2, col3, col4 = st.columns([1, 2, 3, 2])
                 with col1:
                     st.write(f"{type_color} {type_label}")
                 with col2:
-                    st.write(f"**{transaction['symbol']}**")
+                    st.write(f"**{transaction.symbol}**")
                 with col3:
                     # Affichage amélioré du prix avec conversions
-                    price_display = f"{transaction['price']:.2f} {transaction['price_currency']}"
+                    price_display = f"{transaction.price:.2f} {transaction.price_currency}"
                     
                     # Ajouter les conversions si disponibles et différentes
                     conversions = []
-                    if transaction['price_currency'] != 'EUR' and pd.notna(transaction.get('price_eur')):
-                        conversions.append(f"{transaction['price_eur']:.2f} €")
-                    if transaction['price_currency'] != 'USD' and pd.notna(transaction.get('price_usd')):
-                        conversions.append(f"{transaction['price_usd']:.2f} $")
+                    if transaction.price_currency != 'EUR' and pd.notna(getattr(transaction, 'price_eur', None)):
+                        conversions.append(f"{transaction.price_eur:.2f} €")
+                    if transaction.price_currency != 'USD' and pd.notna(getattr(transaction, 'price_usd', None)):
+                        conversions.append(f"{transaction.price_usd:.2f} $")
                     
                     if conversions:
                         price_display += f" ({'/'.join(conversions)})"
                     
-                    st.write(f"{transaction['quantity']:.4f} @ {price_display}")
+                    st.write(f"{transaction.quantity:.4f} @ {price_display}")
                 with col4:
-                    date_str = transaction['transaction_date'].strftime('%d/%m/%Y')
+                    date_str = transaction.transaction_date.strftime('%d/%m/%Y')
                     # Ajouter un indicateur si c'est une conversion historique
-                    if pd.notna(transaction.get('exchange_rate_eur_usd')) and transaction['price_currency'] != 'EUR':
+                    if pd.notna(getattr(transaction, 'exchange_rate_eur_usd', None)) and transaction.price_currency != 'EUR':
                         date_str += " 💱"
                     st.write(date_str)
             
             # Statistique rapide
-            total_transactions = len(all_transactions)
+            total_transactions = data_cache.get_transaction_stats(tracker)['count']
             if total_transactions > 5:
                 st.caption(f"💡 Affichage des 5 dernières transactions sur {total_transactions} au total. Allez dans 'Gestion des Transactions' pour tout voir.")
             else:
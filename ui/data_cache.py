@@ -0,0 +1,218 @@
+import streamlit as st
+from datetime import datetime
+from typing import List
+
+from models.records import Account, Product
+from ui import charts
+
+# Nombre maximal d'entrées par cache (une entrée par combinaison d'arguments et de version)
+LIST_CACHE_ENTRIES = 4
+ANALYSIS_CACHE_ENTRIES = 16
+
+
+def data_token(tracker) -> tuple:
+    """
+    Jeton des données de la base du tracker, obtenu sans requête SQL : il change à chaque
+    écriture du processus (compteur incrémenté par les méthodes d'écriture) ou d'un autre
+    processus (date et taille du fichier). Toutes les lectures ci-dessous en dépendent.
+    """
+    return tracker.db.db_path, tracker.db.get_change_token()
+
+
+# Les fonctions _cached_* reçoivent le tracker sans le hacher (préfixe _) : la clé de cache
+# est le jeton des données et les arguments de la lecture.
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_platforms(token: tuple, _tracker):
+    return _tracker.get_platforms()
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_accounts(token: tuple, _tracker):
+    return _tracker.get_accounts()
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_account_records(token: tuple, _tracker):
+    return _tracker.get_account_records()
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_financial_products(token: tuple, include_benchmarks: bool, _tracker):
+    return _tracker.get_financial_products(include_benchmarks)
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_product_records(token: tuple, include_benchmarks: bool, _tracker):
+    return _tracker.get_product_records(include_benchmarks)
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_available_filters(token: tuple, _tracker):
+    return _tracker.get_available_filters()
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_all_transactions(token: tuple, _tracker):
+    return _tracker.get_all_transactions()
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def _cached_transactions_page(token: tuple, filters: dict, order: str, limit: int, cursor: tuple, _tracker):
+    return _tracker.query_transactions(filters, order, limit, cursor)
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def _cached_transaction_stats(token: tuple, filters: dict, _tracker):
+    return _tracker.get_transaction_stats(filters)
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_database_stats(token: tuple, _tracker):
+    return _tracker.db.get_database_stats()
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_reporting_currencies(token: tuple, _tracker):
+    return _tracker.get_reporting_currencies()
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_alert_events(token: tuple, _tracker):
+    return _tracker.get_alert_events()
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_realized_pnl(token: tuple, method: str, account_filter: list, product_filter: list,
+                         asset_class_filter: list, currency: str, _tracker):
+    return _tracker.get_realized_pnl(method, account_filter, product_filter, asset_class_filter, currency)
+
+
+@st.cache_data(max_entries=LIST_CACHE_ENTRIES, show_spinner=False)
+def _cached_unrealized_pnl(token: tuple, method: str, account_filter: list, product_filter: list,
+                           asset_class_filter: list, currency: str, _tracker):
+    return _tracker.get_unrealized_pnl(method, account_filter, product_filter, asset_class_filter, currency)
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def _cached_portfolio_summary(token: tuple, account_filter: list, product_filter: list,
+                              asset_class_filter: list, currency: str, _tracker):
+    return _tracker.get_portfolio_summary(account_filter, product_filter, asset_class_filter, currency)
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def _cached_portfolio_evolution(token: tuple, start_day, end_day, account_filter: list, product_filter: list,
+                                asset_class_filter: list, currency: str, frequency: str, _start_date: datetime,
+                                _end_date: datetime, _tracker):
+    return _tracker.get_portfolio_evolution(_start_date, _end_date, account_filter, product_filter,
+                                            asset_class_filter, currency, frequency)
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def _cached_evolution_chart(token: tuple, start_day, end_day, account_filter: list, product_filter: list,
+                            asset_class_filter: list, currency: str, frequency: str, breakdown_key: str,
+                            budget: int, _start_date: datetime, _end_date: datetime, _tracker):
+    evolution = _cached_portfolio_evolution(token, start_day, end_day, account_filter, product_filter,
+                                            asset_class_filter, currency, frequency, _start_date, _end_date,
+                                            _tracker)
+    return charts.evolution_chart_data(evolution, breakdown_key, budget)
+
+
+@st.cache_data(max_entries=ANALYSIS_CACHE_ENTRIES, show_spinner=False)
+def _cached_benchmark_evolution(token: tuple, benchmark_symbols: list, dates, account_filter: list,
+                                product_filter: list, asset_class_filter: list, currency: str, _tracker):
+    return _tracker.get_benchmark_evolution(benchmark_symbols, dates, account_filter, product_filter,
+                                            asset_class_filter, currency)
+
+
+def get_platforms(tracker):
+    return _cached_platforms(data_token(tracker), tracker)
+
+
+def get_accounts(tracker):
+    return _cached_accounts(data_token(tracker), tracker)
+
+
+def get_account_records(tracker) -> List[Account]:
+    return _cached_account_records(data_token(tracker), tracker)
+
+
+def get_financial_products(tracker, include_benchmarks: bool = False):
+    return _cached_financial_products(data_token(tracker), include_benchmarks, tracker)
+
+
+def get_product_records(tracker, include_benchmarks: bool = False) -> List[Product]:
+    return _cached_product_records(data_token(tracker), include_benchmarks, tracker)
+
+
+def get_available_filters(tracker):
+    return _cached_available_filters(data_token(tracker), tracker)
+
+
+def get_all_transactions(tracker):
+    return _cached_all_transactions(data_token(tracker), tracker)
+
+
+def query_transactions(tracker, filters: dict = None, order: str = 'desc', limit: int = 50, cursor: tuple = None):
+    return _cached_transactions_page(data_token(tracker), filters, order, limit, cursor, tracker)
+
+
+def get_transaction_stats(tracker, filters: dict = None):
+    return _cached_transaction_stats(data_token(tracker), filters, tracker)
+
+
+def get_database_stats(tracker):
+    return _cached_database_stats(data_token(tracker), tracker)
+
+
+def get_reporting_currencies(tracker) -> List[str]:
+    return _cached_reporting_currencies(data_token(tracker), tracker)
+
+
+def get_alert_events(tracker):
+    """Déclenchements non lus (les tables d'alertes ne changent pas la version des données, mais le jeton)"""
+    return _cached_alert_events(data_token(tracker), tracker)
+
+
+def get_realized_pnl(tracker, method: str = 'FIFO', account_filter: list = None, product_filter: list = None,
+                     asset_class_filter: list = None, currency: str = 'EUR'):
+    return _cached_realized_pnl(data_token(tracker), method, account_filter, product_filter, asset_class_filter,
+                                currency, tracker)
+
+
+def get_unrealized_pnl(tracker, method: str = 'FIFO', account_filter: list = None, product_filter: list = None,
+                       asset_class_filter: list = None, currency: str = 'EUR'):
+    return _cached_unrealized_pnl(data_token(tracker), method, account_filter, product_filter, asset_class_filter,
+                                  currency, tracker)
+
+
+def get_portfolio_summary(tracker, account_filter: list = None, product_filter: list = None,
+                          asset_class_filter: list = None, currency: str = 'EUR'):
+    return _cached_portfolio_summary(data_token(tracker), account_filter, product_filter, asset_class_filter,
+                                     currency, tracker)
+
+
+def get_portfolio_evolution(tracker, start_date: datetime, end_date: datetime, account_filter: list = None,
+                            product_filter: list = None, asset_class_filter: list = None, currency: str = 'EUR',
+                            frequency: str = None):
+    """Évolution mise en cache par jour : les bornes datetime.now() changent à chaque exécution"""
+    return _cached_portfolio_evolution(data_token(tracker), start_date.date(), end_date.date(), account_filter,
+                                       product_filter, asset_class_filter, currency, frequency, start_date,
+                                       end_date, tracker)
+
+
+def get_evolution_chart_data(tracker, start_date: datetime, end_date: datetime, account_filter: list = None,
+                             product_filter: list = None, asset_class_filter: list = None, currency: str = 'EUR',
+                             frequency: str = None, breakdown_key: str = None,
+                             budget: int = charts.CHART_POINT_BUDGET):
+    """Évolution réduite au budget de points des graphiques (voir charts.evolution_chart_data), en cache"""
+    return _cached_evolution_chart(data_token(tracker), start_date.date(), end_date.date(), account_filter,
+                                   product_filter, asset_class_filter, currency, frequency, breakdown_key, budget,
+                                   start_date, end_date, tracker)
+
+
+def get_benchmark_evolution(tracker, benchmark_symbols: list, dates, account_filter: list = None,
+                            product_filter: list = None, asset_class_filter: list = None, currency: str = 'EUR'):
+    """Valeur des mêmes flux investis dans chaque indice de référence aux dates données, en cache"""
+    return _cached_benchmark_evolution(data_token(tracker), benchmark_symbols, dates, account_filter, product_filter,
+                                       asset_class_filter, currency, tracker)
@@ -1,9 +1,21 @@
 import streamlit as st
+import numpy as np
 import pandas as pd
 import plotly.graph_objects as go
-import plotly.express as px
 from datetime import datetime, timedelta
 
+from models.exchange_rates import currency_symbol
+from ui import data_cache
+from ui.charts import line_trace
+from ui.progress import StreamlitReporter
+
+# Résolutions des courbes d'évolution -> fréquence de rééchantillonnage (None : quotidienne)
+EVOLUTION_RESOLUTIONS = {
+    "Quotidienne": None,
+    "Hebdomadaire": 'W',
+    "Mensuelle": 'M',
+}
+
 def portfolio_page(tracker):
     st.title("📈 Suivi de Portefeuille Avancé")
     st.caption("💱 Analyse multi-devises avec conversion automatique en temps réel")
@@ -34,6 +46,10 @@ def portfolio_page(tracker):
         else:  # 2 ans
             start_date = end_date - timedelta(days=730)
         
+        # Tranche de la série quotidienne en cache, éventuellement rééchantillonnée (sans recalcul)
+        resolution = st.selectbox("Résolution", list(EVOLUTION_RESOLUTIONS), index=0)
+        frequency = EVOLUTION_RESOLUTIONS[resolution]
+        
         st.divider()
         
         # Options d'affichage des courbes
@@ -50,16 +66,22 @@ def portfolio_page(tracker):
         else:
             breakdown_by = "💼 Comptes"
         
+        # Indices de référence : tout produit ayant un historique de prix
+        benchmark_products = data_cache.get_financial_products(tracker, include_benchmarks=True)
+        selected_benchmarks = st.multiselect("📏 Comparer avec",
+                                             benchmark_products['symbol'].tolist() if not benchmark_products.empty else [],
+                                             help="Simule les mêmes achats et ventes (dates et montants) investis dans l'indice choisi")
+        
         st.divider()
         
         # Récupérer les options de filtrage
-        filters = tracker.get_available_filters()
+        filters = data_cache.get_available_filters(tracker)
         
         # Filtres par compte
         st.write("**💼 Comptes**")
         if not filters['accounts'].empty:
-            account_options = ["Tous"] + [f"{row['name']} ({row['platform_name']})" 
-                                        for _, row in filters['accounts'].iterrows()]
+            account_options = ["Tous"] + [f"{row.name} ({row.platform_name})" 
+                                        for row in filters['accounts'].itertuples(index=False)]
             selected_accounts = st.multiselect("Sélectionner les comptes", 
                                              account_options,
                                              default=["Tous"])
@@ -77,8 +99,8 @@ def portfolio_page(tracker):
         # Filtres par produit
         st.write("**📊 Produits financiers**")
         if not filters['products'].empty:
-            product_options = ["Tous"] + [f"{row['symbol']} - {row['name']}" 
-                                        for _, row in filters['products'].iterrows()]
+            product_options = ["Tous"] + [f"{row.symbol} - {row.name}" 
+                                        for row in filters['products'].itertuples(index=False)]
             selected_products = st.multiselect("Sélectionner les produits", 
                                              product_options,
                                              default=["Tous"])
@@ -115,29 +137,16 @@ def portfolio_page(tracker):
         if st.button("🔄 Actualiser l'analyse"):
             st.rerun()
     
-    # Contenu principal
-    portfolio = tracker.get_portfolio_summary()
-    
-    if portfolio.empty:
-        st.info("📝 Aucune position dans le portefeuille. Ajoutez des transactions pour commencer l'analyse!")
-        return
-    
-    # Applique les filtres au portefeuille actuel
-    filtered_portfolio = portfolio.copy()
-    
-    if account_filter:
-        account_names = [filters['accounts'][filters['accounts']['id'] == aid]['name'].iloc[0] 
-                        for aid in account_filter]
-        filtered_portfolio = filtered_portfolio[filtered_portfolio['account_name'].isin(account_names)]
-    
-    if product_filter:
-        filtered_portfolio = filtered_portfolio[filtered_portfolio['symbol'].isin(product_filter)]
-    
-    if asset_filter:
-        filtered_portfolio = filtered_portfolio[filtered_portfolio['product_type'].isin(asset_filter)]
+    # Contenu principal : les filtres sont appliqués directement dans la requête SQL
+    currency = st.session_state.get('reporting_currency', 'EUR')
+    currency_sign = currency_symbol(currency)
+    filtered_portfolio = data_cache.get_portfolio_summary(tracker, account_filter, product_filter, asset_filter, currency)
     
     if filtered_portfolio.empty:
-        st.warning("🔍 Aucune donnée ne correspond aux filtres sélectionnés.")
+        if account_filter or product_filter or asset_filter:
+            st.warning("🔍 Aucune donnée ne correspond aux filtres sélectionnés.")
+        else:
+            st.info("📝 Aucune position dans le portefeuille. Ajoutez des transactions pour commencer l'analyse!")
         return
     
     # Métriques du portefeuille filtré
@@ -145,26 +154,29 @@ def portfolio_page(tracker):
     
     total_invested = filtered_portfolio['total_invested'].sum()
     total_current = filtered_portfolio['current_value'].sum()
-    total_gain_loss = total_current - total_invested
+    total_dividends = filtered_portfolio['total_dividends'].sum()
+    total_gain_loss = filtered_portfolio['gain_loss'].sum()
     total_gain_loss_pct = (total_gain_loss / total_invested) * 100 if total_invested > 0 else 0
     
-    col1, col2, col3, col4 = st.columns(4)
+    col1, col2, col3, col4, col5 = st.columns(5)
     with col1:
-        st.metric("💰 Valeur actuelle", f"{total_current:,.2f} €")
+        st.metric("💰 Valeur actuelle", f"{total_current:,.2f} {currency_sign}")
     with col2:
-        st.metric("💸 Montant investi", f"{total_invested:,.2f} €")
+        st.metric("💸 Montant investi", f"{total_invested:,.2f} {currency_sign}")
     with col3:
-        st.metric("📈 Plus/Moins value", f"{total_gain_loss:,.2f} €", 
-                 delta=f"{total_gain_loss_pct:.2f}%")
+        st.metric("📈 Plus/Moins value", f"{total_gain_loss:,.2f} {currency_sign}", 
+                 delta=f"{total_gain_loss_pct:.2f}%", help="Dividendes perçus inclus")
     with col4:
+        st.metric("💵 Dividendes perçus", f"{total_dividends:,.2f} {currency_sign}")
+    with col5:
         st.metric("🎯 Positions", len(filtered_portfolio))
     
     # Évolution temporelle
     st.subheader("📈 Évolution de la valeur du portefeuille")
     
     # Récupérer l'évolution
-    evolution_data = tracker.get_portfolio_evolution(
-        start_date, end_date, account_filter, product_filter, asset_filter
+    evolution_data = data_cache.get_portfolio_evolution(
+        tracker, start_date, end_date, account_filter, product_filter, asset_filter, currency, frequency
     )
     
     if not evolution_data.empty and len(evolution_data) > 1:
@@ -179,25 +191,30 @@ def portfolio_page(tracker):
         ]
         category_colors = {}  # Pour stocker les couleurs utilisées
         
+        # Courbes réduites au budget de points du graphique (LTTB), en cache
+        chart_lines, _ = data_cache.get_evolution_chart_data(
+            tracker, start_date, end_date, account_filter, product_filter, asset_filter, currency, frequency
+        )
+        
         # Graphique d'évolution
         if chart_type == "📊 Valeur totale":
             # Graphique simple
             fig_evolution = go.Figure()
             
-            fig_evolution.add_trace(go.Scatter(
-                x=evolution_data['date'],
-                y=evolution_data['total_value'],
+            fig_evolution.add_trace(line_trace(
+                x=chart_lines['date'],
+                y=chart_lines['total_value'],
                 mode='lines',
                 name='Valeur totale',
                 line=dict(color='#1f77b4', width=3),
-                hovertemplate='<b>%{x}</b><br>Valeur: %{y:,.2f} €<extra></extra>',
-                fill='tonexty' if len(evolution_data) > 2 else None
+                hovertemplate=f'<b>%{{x}}</b><br>Valeur: %{{y:,.2f}} {currency_sign}<extra></extra>',
+                fill='tonexty' if len(chart_lines) > 2 else None
             ))
             
             fig_evolution.update_layout(
                 title="Évolution de la valeur du portefeuille",
                 xaxis_title="Date",
-                yaxis_title="Valeur (€)",
+                yaxis_title=f"Valeur ({currency_sign})",
                 hovermode='x unified',
                 showlegend=False,
                 height=500
@@ -211,30 +228,30 @@ def portfolio_page(tracker):
             fig_evolution = go.Figure()
             
             # Courbe du montant investi
-            fig_evolution.add_trace(go.Scatter(
-                x=evolution_data['date'],
-                y=evolution_data['total_invested'],
+            fig_evolution.add_trace(line_trace(
+                x=chart_lines['date'],
+                y=chart_lines['total_invested'],
                 mode='lines',
                 name='Montant investi',
                 line=dict(color='#2E86AB', width=3),
-                hovertemplate='<b>%{x}</b><br>Investi: %{y:,.2f} €<extra></extra>',
+                hovertemplate=f'<b>%{{x}}</b><br>Investi: %{{y:,.2f}} {currency_sign}<extra></extra>',
                 fill='tonexty'
             ))
             
             # Courbe de la valeur actuelle
-            fig_evolution.add_trace(go.Scatter(
-                x=evolution_data['date'],
-                y=evolution_data['total_value'],
+            fig_evolution.add_trace(line_trace(
+                x=chart_lines['date'],
+                y=chart_lines['total_value'],
                 mode='lines',
                 name='Valeur actuelle',
                 line=dict(color='#A23B72', width=3),
-                hovertemplate='<b>%{x}</b><br>Valeur: %{y:,.2f} €<extra></extra>'
+                hovertemplate=f'<b>%{{x}}</b><br>Valeur: %{{y:,.2f}} {currency_sign}<extra></extra>'
             ))
             
             # Zone de gain/perte (remplissage entre les courbes)
-            fig_evolution.add_trace(go.Scatter(
-                x=evolution_data['date'],
-                y=evolution_data['total_value'],
+            fig_evolution.add_trace(line_trace(
+                x=chart_lines['date'],
+                y=chart_lines['total_value'],
                 mode='lines',
                 line=dict(color='rgba(0,0,0,0)'),
                 fill='tonexty',
@@ -244,22 +261,22 @@ def portfolio_page(tracker):
             ))
             
             # Ligne de la plus/moins value (optionnel, pour plus de clarté)
-            fig_evolution.add_trace(go.Scatter(
-                x=evolution_data['date'],
-                y=evolution_data['gain_loss'],
+            fig_evolution.add_trace(line_trace(
+                x=chart_lines['date'],
+                y=chart_lines['gain_loss'],
                 mode='lines',
                 name='Plus/Moins Value',
                 line=dict(color='#F18F01', width=2, dash='dash'),
-                hovertemplate='<b>%{x}</b><br>+/- Value: %{y:,.2f} €<extra></extra>',
+                hovertemplate=f'<b>%{{x}}</b><br>+/- Value: %{{y:,.2f}} {currency_sign}<extra></extra>',
                 yaxis='y2'  # Axe secondaire pour la plus/moins value
             ))
             
             fig_evolution.update_layout(
                 title="Évolution : Investissement vs Valeur Actuelle",
                 xaxis_title="Date",
-                yaxis_title="Montant (€)",
+                yaxis_title=f"Montant ({currency_sign})",
                 yaxis2=dict(
-                    title="Plus/Moins Value (€)",
+                    title=f"Plus/Moins Value ({currency_sign})",
                     overlaying='y',
                     side='right',
                     zeroline=True,
@@ -291,26 +308,16 @@ def portfolio_page(tracker):
                 "💱 Devises": 'breakdown_currency'
             }[breakdown_by]
             
-            # Collecter toutes les catégories uniques
-            all_categories = set()
-            for _, row in evolution_data.iterrows():
-                if isinstance(row[breakdown_key], dict):
-                    all_categories.update(row[breakdown_key].keys())
-            
-            all_categories = sorted(list(all_categories))
+            chart_lines, chart_breakdown = data_cache.get_evolution_chart_data(
+                tracker, start_date, end_date, account_filter, product_filter, asset_filter, currency, frequency,
+                breakdown_key
+            )
+            all_categories = chart_breakdown.columns.tolist()
             
             if not all_categories:
                 st.warning("Aucune donnée de répartition disponible pour cette période.")
                 return
             
-            # Préparer les données pour chaque catégorie
-            category_data = {}
-            for category in all_categories:
-                category_data[category] = []
-                for _, row in evolution_data.iterrows():
-                    breakdown = row[breakdown_key] if isinstance(row[breakdown_key], dict) else {}
-                    category_data[category].append(breakdown.get(category, 0))
-            
             # Créer le graphique empilé
             fig_evolution = go.Figure()
             
@@ -319,38 +326,35 @@ def portfolio_page(tracker):
                 color = colors[i % len(colors)]
                 category_colors[category] = color
                 
-                fig_evolution.add_trace(go.Scatter(
-                    x=evolution_data['date'],
-                    y=category_data[category],
+                fig_evolution.add_trace(line_trace(
+                    x=chart_lines['date'],
+                    y=chart_breakdown[category],
                     mode='lines',
                     name=category,
                     stackgroup='one',
                     line=dict(width=0.5),
                     fillcolor=color,
                     hovertemplate=f'<b>{category}</b><br>' + 
-                                '%{x}<br>Valeur: %{y:,.2f} €<extra></extra>'
+                                f'%{{x}}<br>Valeur: %{{y:,.2f}} {currency_sign}<extra></extra>'
                 ))
             
             # Calculer le total pour chaque point
-            total_values = []
-            for _, row in evolution_data.iterrows():
-                breakdown = row[breakdown_key] if isinstance(row[breakdown_key], dict) else {}
-                total_values.append(sum(breakdown.values()))
+            total_values = chart_breakdown.sum(axis=1)
             
             # Ajouter une ligne pour la valeur totale
-            fig_evolution.add_trace(go.Scatter(
-                x=evolution_data['date'],
+            fig_evolution.add_trace(line_trace(
+                x=chart_lines['date'],
                 y=total_values,
                 mode='lines',
                 name='Total',
                 line=dict(color='black', width=2, dash='dash'),
-                hovertemplate='<b>Total</b><br>%{x}<br>Valeur: %{y:,.2f} €<extra></extra>'
+                hovertemplate=f'<b>Total</b><br>%{{x}}<br>Valeur: %{{y:,.2f}} {currency_sign}<extra></extra>'
             ))
             
             fig_evolution.update_layout(
                 title=f"Évolution cumulative - {breakdown_by}",
                 xaxis_title="Date",
-                yaxis_title="Valeur (€)",
+                yaxis_title=f"Valeur ({currency_sign})",
                 hovermode='x unified',
                 showlegend=True,
                 height=600,
@@ -363,6 +367,23 @@ def portfolio_page(tracker):
                 )
             )
         
+        # Superposition des indices de référence (mêmes flux investis dans l'indice)
+        if selected_benchmarks:
+            benchmark_data = data_cache.get_benchmark_evolution(
+                tracker, selected_benchmarks, chart_lines['date'], account_filter, product_filter, asset_filter,
+                currency
+            )
+            for i, symbol in enumerate(benchmark_data.columns):
+                fig_evolution.add_trace(line_trace(
+                    x=chart_lines['date'],
+                    y=benchmark_data[symbol].to_numpy(),
+                    mode='lines',
+                    name=f"{symbol} (mêmes flux)",
+                    line=dict(color=colors[(i + 3) % len(colors)], width=2, dash='dot'),
+                    hovertemplate=f'<b>{symbol}</b><br>%{{x}}<br>Valeur: %{{y:,.2f}} {currency_sign}<extra></extra>'
+                ))
+            fig_evolution.update_layout(showlegend=True)
+        
         st.plotly_chart(fig_evolution, use_container_width=True)
         
         # Métriques d'évolution
@@ -375,24 +396,24 @@ def portfolio_page(tracker):
         
         with col1:
             st.metric("📊 Variation de période", 
-                     f"{variation:,.2f} €",
+                     f"{variation:,.2f} {currency_sign}",
                      delta=f"{variation_pct:.2f}%")
         
         with col2:
             max_value = evolution_data['total_value'].max()
-            st.metric("📈 Valeur maximale", f"{max_value:,.2f} €")
+            st.metric("📈 Valeur maximale", f"{max_value:,.2f} {currency_sign}")
         
         with col3:
             min_value = evolution_data['total_value'].min()
-            st.metric("📉 Valeur minimale", f"{min_value:,.2f} €")
+            st.metric("📉 Valeur minimale", f"{min_value:,.2f} {currency_sign}")
         
         with col4:
             volatility = evolution_data['total_value'].std()
-            st.metric("📊 Volatilité", f"{volatility:,.2f} €")
+            st.metric("📊 Volatilité", f"{volatility:,.2f} {currency_sign}")
             
     else:
         # Vérifier s'il y a des données d'historique
-        stats = tracker.db.get_database_stats()
+        stats = data_cache.get_database_stats(tracker)
         history_count = stats.get('price_history', 0)
         
         if history_count == 0:
@@ -403,6 +424,8 @@ def portfolio_page(tracker):
             st.info("💡 Pour diagnostiquer le problème, allez dans **Configuration** → **Diagnostic des Graphiques d'Évolution**")
     
     # Graphiques de répartition actuels
+    import plotly.express as px
+    
     col1, col2 = st.columns(2)
     
     with col1:
@@ -465,16 +488,20 @@ def portfolio_page(tracker):
         portfolio_by_account = filtered_portfolio.sort_values(['account_name', 'symbol'])
         current_account = None
         
-        for _, position in portfolio_by_account.iterrows():
+        # Performances TWR / TRI par compte (calcul groupé, mis en cache par version des données)
+        returns = tracker.get_returns()
+        account_returns = returns[returns['level'] == 'account'].set_index('id') if not returns.empty else pd.DataFrame()
+        
+        for position in portfolio_by_account.itertuples(index=False):
             # Afficher l'en-tête du compte si c'est un nouveau compte
-            if current_account != position['account_name']:
-                current_account = position['account_name']
+            if current_account != position.account_name:
+                current_account = position.account_name
                 
                 # Calculer les totaux pour ce compte
                 account_positions = portfolio_by_account[portfolio_by_account['account_name'] == current_account]
                 account_total_value = account_positions['current_value'].sum()
                 account_total_invested = account_positions['total_invested'].sum()
-                account_total_gain_loss = account_total_value - account_total_invested
+                account_total_gain_loss = account_positions['gain_loss'].sum()
                 account_gain_loss_pct = (account_total_gain_loss / account_total_invested) * 100 if account_total_invested > 0 else 0
                 
                 # Emoji selon le type de compte
@@ -490,24 +517,35 @@ def portfolio_page(tracker):
                 else:
                     account_emoji = "💰"
                 
-                st.markdown(f"### {account_emoji} {current_account} ({position['platform_name']})")
+                st.markdown(f"### {account_emoji} {current_account} ({position.platform_name})")
                 
                 # Métriques du compte
-                col1, col2, col3, col4 = st.columns(4)
+                col1, col2, col3, col4, col5, col6 = st.columns(6)
                 with col1:
-                    st.metric("💰 Valeur", f"{account_total_value:,.2f} €")
+                    st.metric("💰 Valeur", f"{account_total_value:,.2f} {currency_sign}")
                 with col2:
-                    st.metric("💸 Investi", f"{account_total_invested:,.2f} €")
+                    st.metric("💸 Investi", f"{account_total_invested:,.2f} {currency_sign}")
                 with col3:
-                    st.metric("📈 +/- Value", f"{account_total_gain_loss:,.2f} €", 
+                    st.metric("📈 +/- Value", f"{account_total_gain_loss:,.2f} {currency_sign}", 
                             delta=f"{account_gain_loss_pct:.2f}%")
                 with col4:
                     st.metric("🎯 Positions", len(account_positions))
                 
+                account_id = position.account_id
+                account_return = account_returns.loc[account_id] if account_id in account_returns.index else None
+                with col5:
+                    twr = account_return['twr'] if account_return is not None else None
+                    st.metric("⏱️ TWR", f"{twr * 100:.2f}%" if pd.notna(twr) else "N/A",
+                              help="Performance pondérée par le temps depuis l'ouverture, hors effet des apports et retraits")
+                with col6:
+                    xirr = account_return['xirr'] if account_return is not None else None
+                    st.metric("💹 TRI annuel", f"{xirr * 100:.2f}%" if pd.notna(xirr) else "N/A",
+                              help="Taux de rendement interne (XIRR) tenant compte de la date et du montant de chaque apport")
+                
                 # Créer le DataFrame pour ce compte avec informations de devise
                 account_df = account_positions[[
                     'symbol', 'name', 'product_type', 'currency', 'total_quantity', 
-                    'avg_buy_price_eur', 'current_price_eur', 'current_value', 
+                    'avg_buy_price', 'current_price_report', 'current_value', 
                     'total_invested', 'gain_loss', 'gain_loss_pct'
                 ]].copy()
                 
@@ -544,14 +582,14 @@ def portfolio_page(tracker):
                 # Renommer les colonnes pour l'affichage
                 display_df = account_df[[
                     'symbol_with_emoji', 'name', 'product_type', 'currency', 'total_quantity', 
-                    'avg_buy_price_eur', 'current_price_eur', 'current_value', 
+                    'avg_buy_price', 'current_price_report', 'current_value', 
                     'total_invested', 'gain_loss', 'gain_loss_pct'
                 ]].copy()
                 
                 display_df.columns = [
                     'Symbole', 'Nom', 'Type', 'Devise', 'Quantité', 
                     'Prix Achat Moy.', 'Prix Actuel', 'Valeur Actuelle',
-                    'Montant Investi', '+/- Value €', '+/- Value %'
+                    'Montant Investi', f'+/- Value {currency_sign}', '+/- Value %'
                 ]
                 
                 # Fonction pour colorer les cellules selon les gains/pertes
@@ -572,13 +610,13 @@ def portfolio_page(tracker):
                 # Appliquer le style avec couleurs
                 styled_df = display_df.style.format({
                     'Quantité': '{:.4f}',
-                    'Prix Achat Moy.': '{:.2f} €',
-                    'Prix Actuel': '{:.2f} €',
-                    'Valeur Actuelle': '{:,.2f} €',
-                    'Montant Investi': '{:,.2f} €',
-                    '+/- Value €': '{:,.2f} €',
+                    'Prix Achat Moy.': '{:.2f} ' + currency_sign,
+                    'Prix Actuel': '{:.2f} ' + currency_sign,
+                    'Valeur Actuelle': '{:,.2f} ' + currency_sign,
+                    'Montant Investi': '{:,.2f} ' + currency_sign,
+                    f'+/- Value {currency_sign}': '{:,.2f} ' + currency_sign,
                     '+/- Value %': '{:.2f}%'
-                }).applymap(color_gains_losses, subset=['+/- Value €', '+/- Value %'])
+                }).applymap(color_gains_losses, subset=[f'+/- Value {currency_sign}', '+/- Value %'])
                 
                 # Afficher le tableau stylé
                 st.dataframe(styled_df, use_container_width=True, hide_index=True)
@@ -589,25 +627,217 @@ def portfolio_page(tracker):
     st.divider()
     st.subheader("📊 Analyse Avancée")
     
+    # Performances sur la période sélectionnée (positions achetées en cours de période comprises)
+    period_performance = tracker.get_period_performance(start_date, currency)
+    if not filtered_portfolio.empty:
+        period_performance = filtered_portfolio[['account_id', 'product_id', 'symbol', 'name', 'account_name']].merge(
+            period_performance, on=['account_id', 'product_id'], how='left')
+    ranked = period_performance.dropna(subset=['return_period']) if not filtered_portfolio.empty else pd.DataFrame()
+    
     col1, col2 = st.columns(2)
     
     with col1:
-        st.write("**🎯 Top Performers**")
-        if not filtered_portfolio.empty:
-            top_performers = filtered_portfolio.nlargest(5, 'gain_loss_pct')[['symbol', 'name', 'gain_loss_pct']]
-            for _, perf in top_performers.iterrows():
-                st.write(f"📈 **{perf['symbol']}**: +{perf['gain_loss_pct']:.2f}%")
+        st.write(f"**🎯 Top Performers ({period})**")
+        if not ranked.empty:
+            top_performers = ranked[ranked['return_period'] > 0].nlargest(5, 'return_period')
+            for perf in top_performers.itertuples(index=False):
+                st.write(f"📈 **{perf.symbol}**: +{perf.return_period * 100:.2f}% ({perf.gain_period:+,.2f}{currency_sign})")
     
     with col2:
-        st.write("**📉 Positions en perte**")
-        if not filtered_portfolio.empty:
-            worst_performers = filtered_portfolio[filtered_portfolio['gain_loss_pct'] < 0].nsmallest(5, 'gain_loss_pct')[['symbol', 'name', 'gain_loss_pct']]
+        st.write(f"**📉 Positions en baisse ({period})**")
+        if not ranked.empty:
+            worst_performers = ranked[ranked['return_period'] < 0].nsmallest(5, 'return_period')
             if not worst_performers.empty:
-                for _, perf in worst_performers.iterrows():
-                    st.write(f"📉 **{perf['symbol']}**: {perf['gain_loss_pct']:.2f}%")
+                for perf in worst_performers.itertuples(index=False):
+                    st.write(f"📉 **{perf.symbol}**: {perf.return_period * 100:.2f}% ({perf.gain_period:+,.2f}{currency_sign})")
             else:
-                st.write("🎉 Aucune position en perte !")
+                st.write("🎉 Aucune position en baisse sur la période !")
     
+    if not ranked.empty:
+        with st.expander("📅 Performances par horizon"):
+            horizon_labels = {'return_1D': '1 jour', 'return_1W': '1 semaine', 'return_1M': '1 mois',
+                              'return_YTD': 'Depuis le 1er janvier', 'return_1Y': '1 an',
+                              'return_period': f"Période ({period})"}
+            horizons = ranked[['symbol', 'account_name'] + list(horizon_labels)].rename(
+                columns={'symbol': 'Symbole', 'account_name': 'Compte', **horizon_labels})
+            st.dataframe(horizons.style.format({label: '{:+.2%}' for label in horizon_labels.values()}, na_rep='N/A'),
+                         use_container_width=True, hide_index=True)
+            st.caption("Performance = (valeur finale - valeur initiale - flux) / (valeur initiale + achats) ; "
+                       "une position achetée en cours de période est mesurée depuis son prix d'achat")
+
+    # Plus-values réalisées et latentes par lots
+    st.divider()
+    st.subheader("🧾 Plus-values réalisées et latentes")
+
+    lot_method = st.radio("Méthode de calcul du coût de revient", ['FIFO', 'PRU'], horizontal=True,
+                          help="FIFO : premier entré, premier sorti. PRU : prix de revient unitaire moyen pondéré.")
+
+    realized = data_cache.get_realized_pnl(tracker, lot_method, account_filter, product_filter, asset_filter, currency)
+    unrealized = data_cache.get_unrealized_pnl(tracker, lot_method, account_filter, product_filter, asset_filter,
+                                               currency)
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        st.write("**💶 Plus-values réalisées par année**")
+        if not realized.empty:
+            realized_by_year = realized.groupby('year', as_index=False)[['proceeds', 'cost', 'realized']].sum()
+            realized_by_year.columns = ['Année', 'Produit des cessions', 'Coût de revient', '+/- Value réalisée']
+            st.dataframe(realized_by_year.style.format({
+                'Année': '{:d}',
+                'Produit des cessions': '{:,.2f} ' + currency_sign,
+                'Coût de revient': '{:,.2f} ' + currency_sign,
+                '+/- Value réalisée': '{:,.2f} ' + currency_sign
+            }), use_container_width=True, hide_index=True)
+        else:
+            st.info("Aucune vente enregistrée.")
+
+    with col2:
+        st.write("**📈 Plus-values latentes par position**")
+        if not unrealized.empty:
+            unrealized_display = unrealized[['account_name', 'symbol', 'quantity', 'unit_cost',
+                                             'current_value', 'unrealized', 'unrealized_pct']].copy()
+            unrealized_display.columns = ['Compte', 'Symbole', 'Quantité', 'Coût unitaire',
+                                          'Valeur Actuelle', '+/- Value latente', '+/- Value %']
+            st.dataframe(unrealized_display.style.format({
+                'Quantité': '{:.4f}',
+                'Coût unitaire': '{:.2f} ' + currency_sign,
+                'Valeur Actuelle': '{:,.2f} ' + currency_sign,
+                '+/- Value latente': '{:,.2f} ' + currency_sign,
+                '+/- Value %': '{:.2f}%'
+            }), use_container_width=True, hide_index=True)
+        else:
+            st.info("Aucune position ouverte.")
+
+    # Analyse de risque sur l'historique des prix
+    st.divider()
+    st.subheader("⚠️ Analyse de risque")
+
+    risk_window_label = st.selectbox("Fenêtre d'analyse du risque", ["1 an", "3 ans", "Tout l'historique"])
+    risk_window = {"1 an": 365, "3 ans": 1095, "Tout l'historique": None}[risk_window_label]
+    risk = tracker.get_risk_metrics(risk_window)
+
+    portfolio_risk = risk[risk['level'] == 'portfolio'] if not risk.empty else pd.DataFrame()
+    if portfolio_risk.empty or pd.isna(portfolio_risk.iloc[0]['volatility']):
+        st.info("📊 Historique de prix insuffisant pour calculer les indicateurs de risque.")
+    else:
+        portfolio_risk = portfolio_risk.iloc[0]
+        col1, col2, col3, col4, col5 = st.columns(5)
+        with col1:
+            st.metric("📈 Rendement annualisé", f"{portfolio_risk['annual_return'] * 100:.2f}%")
+        with col2:
+            st.metric("🌊 Volatilité", f"{portfolio_risk['volatility'] * 100:.2f}%",
+                      help="Écart-type annualisé des performances quotidiennes")
+        with col3:
+            st.metric("📉 Perte maximale", f"{portfolio_risk['max_drawdown'] * 100:.2f}%",
+                      help="Plus forte baisse depuis un plus haut sur la fenêtre")
+        with col4:
+            st.metric("⚖️ Sharpe", f"{portfolio_risk['sharpe']:.2f}")
+        with col5:
+            st.metric("🎲 VaR 95% (1 jour)", f"{portfolio_risk['var_95'] * 100:.2f}%",
+                      help="Perte quotidienne dépassée seulement 5% des jours (historique)")
+
+        risk_format = {
+            'Rendement annualisé': '{:.2%}',
+            'Volatilité': '{:.2%}',
+            'Perte maximale': '{:.2%}',
+            'Sharpe': '{:.2f}',
+            'Bêta': '{:.2f}',
+            'VaR 95%': '{:.2%}'
+        }
+        risk_labels = ['Nom', 'Rendement annualisé', 'Volatilité', 'Perte maximale', 'Sharpe', 'Bêta', 'VaR 95%']
+        risk_fields = ['name', 'annual_return', 'volatility', 'max_drawdown', 'sharpe', 'beta', 'var_95']
+
+        group_risk = risk[risk['level'].isin(['account', 'platform'])][risk_fields].copy()
+        group_risk.columns = risk_labels
+        st.write("**💼 Comptes et plateformes**")
+        st.dataframe(group_risk.style.format(risk_format, na_rep='N/A'), use_container_width=True, hide_index=True)
+
+        with st.expander("📊 Risque par produit (bêta par rapport au portefeuille)"):
+            held_products = filtered_portfolio['product_id'].unique()
+            product_risk = risk[(risk['level'] == 'product') & risk['id'].isin(held_products)][risk_fields].copy()
+            product_risk.columns = risk_labels
+            st.dataframe(product_risk.style.format(risk_format, na_rep='N/A'), use_container_width=True, hide_index=True)
+
+        risk_series = tracker.get_risk_series()
+        portfolio_columns = [column for column in risk_series['volatility'].columns if column[0] == 'portfolio']
+        if portfolio_columns:
+            col1, col2 = st.columns(2)
+            with col1:
+                st.write("**🌊 Volatilité glissante (3 mois)**")
+                fig_volatility = go.Figure(go.Scatter(
+                    x=risk_series['volatility'].index,
+                    y=risk_series['volatility'][portfolio_columns[0]] * 100,
+                    mode='lines', line=dict(color='#ff7f0e', width=2),
+                    hovertemplate='<b>%{x}</b><br>Volatilité: %{y:.2f}%<extra></extra>'
+                ))
+                fig_volatility.update_layout(height=300, yaxis_title="Volatilité (%)", margin=dict(l=0, r=0, t=20, b=0))
+                st.plotly_chart(fig_volatility, use_container_width=True)
+            with col2:
+                st.write("**📉 Drawdown du portefeuille**")
+                fig_drawdown = go.Figure(go.Scatter(
+                    x=risk_series['drawdown'].index,
+                    y=risk_series['drawdown'][portfolio_columns[0]] * 100,
+                    mode='lines', fill='tozeroy', line=dict(color='#d62728', width=2),
+                    hovertemplate='<b>%{x}</b><br>Drawdown: %{y:.2f}%<extra></extra>'
+                ))
+                fig_drawdown.update_layout(height=300, yaxis_title="Drawdown (%)", margin=dict(l=0, r=0, t=20, b=0))
+                st.plotly_chart(fig_drawdown, use_container_width=True)
+
+    # Corrélations entre les positions ouvertes (même fenêtre que l'analyse de risque)
+    st.divider()
+    st.subheader("🧩 Diversification et corrélations")
+
+    correlation = tracker.get_correlation(filtered_portfolio['product_id'].unique().tolist(), risk_window)
+    correlation_matrix = correlation['correlation']
+    if correlation_matrix.shape[0] < 2:
+        st.info("📊 Au moins deux positions avec un historique de prix suffisant sont nécessaires.")
+    else:
+        n_holdings = correlation_matrix.shape[0]
+        upper = np.triu_indices(n_holdings, k=1)
+        pair_values = correlation_matrix.to_numpy()[upper]
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            st.metric("🎯 Nombre effectif de paris", f"{correlation['effective_bets']:.1f} / {n_holdings}",
+                      help="Nombre de sources de risque indépendantes équivalentes (1 = tout dépend d'un seul facteur)")
+        with col2:
+            st.metric("🧮 Ratio de diversification", f"{correlation['diversification_ratio']:.2f}",
+                      help="Somme des volatilités pondérées / volatilité du portefeuille (1 = aucune diversification)")
+        with col3:
+            st.metric("🔗 Corrélation moyenne", f"{np.nanmean(pair_values):.2f}")
+
+        show_labels = n_holdings <= 60
+        fig_correlation = go.Figure(go.Heatmap(
+            z=correlation_matrix.to_numpy(),
+            x=correlation_matrix.columns,
+            y=correlation_matrix.index,
+            zmin=-1, zmax=1,
+            colorscale='RdBu_r',
+            hovertemplate='%{y} / %{x}<br>Corrélation: %{z:.2f}<extra></extra>'
+        ))
+        fig_correlation.update_layout(
+            height=min(max(400, 14 * n_holdings), 1200),
+            xaxis=dict(showticklabels=show_labels),
+            yaxis=dict(showticklabels=show_labels, autorange='reversed'),
+            margin=dict(l=0, r=0, t=20, b=0)
+        )
+        st.plotly_chart(fig_correlation, use_container_width=True)
+
+        with st.expander("🔗 Paires les plus corrélées"):
+            order = np.argsort(-np.nan_to_num(pair_values, nan=-2.0))[:10]
+            symbols = correlation_matrix.index.to_numpy()
+            top_pairs = pd.DataFrame({
+                'Produit 1': symbols[upper[0][order]],
+                'Produit 2': symbols[upper[1][order]],
+                'Corrélation': pair_values[order]
+            })
+            st.dataframe(top_pairs.style.format({'Corrélation': '{:.2f}'}, na_rep='N/A'),
+                         use_container_width=True, hide_index=True)
+
+        if correlation['excluded']:
+            st.caption(f"Historique insuffisant, exclus de l'analyse : {', '.join(correlation['excluded'])}")
+
     # Informations sur les devises
     st.subheader("💱 Informations de Change")
     col1, col2 = st.columns(2)
@@ -620,7 +850,7 @@ def portfolio_page(tracker):
     with col2:
         if st.button("🔄 Actualiser les taux"):
             tracker.currency_converter.last_update = None
-            success = tracker.currency_converter.get_eur_usd_rate(show_debug=True)
+            success = tracker.currency_converter.get_eur_usd_rate(StreamlitReporter())
             if success:
                 st.success("✅ Taux mis à jour!")
             st.rerun()
\ No newline at end of file
@@ -0,0 +1,41 @@
+import streamlit as st
+
+from models.progress import ProgressReporter
+
+# Affichage Streamlit de chaque niveau de message du modèle
+_MESSAGE_WRITERS = {
+    'debug': st.write,
+    'info': st.info,
+    'success': st.success,
+    'warning': st.warning,
+    'error': st.error,
+}
+
+
+class StreamlitReporter(ProgressReporter):
+    """
+    Adaptateur Streamlit du suivi des opérations du modèle : barre de progression et
+    libellé créés au premier avancement, messages affichés selon leur niveau
+    """
+
+    def __init__(self):
+        self._progress_bar = None
+        self._status_text = None
+
+    def progress(self, done: int, total: int, label: str = ''):
+        if self._progress_bar is None:
+            self._progress_bar = st.progress(0)
+            self._status_text = st.empty()
+        if label:
+            self._status_text.text(label)
+        self._progress_bar.progress(done / total if total else 1.0)
+
+    def message(self, level: str, text: str):
+        _MESSAGE_WRITERS.get(level, st.write)(text)
+
+    def close(self):
+        if self._progress_bar is not None:
+            self._progress_bar.empty()
+            self._status_text.empty()
+            self._progress_bar = None
+            self._status_text = None
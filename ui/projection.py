@@ -0,0 +1,85 @@
+import streamlit as st
+import plotly.graph_objects as go
+
+from models.risk import TRADING_DAYS_PER_YEAR
+
+PATH_COUNTS = [1_000, 10_000, 50_000, 100_000]
+
+METHOD_LABELS = {
+    "Rééchantillonnage historique": 'bootstrap',
+    "Loi normale": 'parametric',
+}
+
+
+def projection_page(tracker):
+    st.title("🔮 Projection du patrimoine")
+    st.caption("Simulation Monte-Carlo des positions actuelles à partir de l'historique des prix stockés")
+
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        years = st.slider("Horizon (années)", 1, 40, 20)
+        monthly_contribution = st.number_input("💶 Versement mensuel (€)", min_value=0.0, value=0.0, step=50.0)
+    with col2:
+        method_label = st.selectbox("Méthode", list(METHOD_LABELS),
+                                    help="Rééchantillonnage : tirage parmi les performances mensuelles passées ; "
+                                         "loi normale : moyenne et volatilité historiques")
+        window_label = st.selectbox("Historique utilisé", ["Tout l'historique", "3 ans", "1 an"])
+    with col3:
+        n_paths = st.select_slider("Nombre de simulations", PATH_COUNTS, value=10_000)
+        seed = st.number_input("Graine aléatoire", min_value=0, value=42, step=1,
+                               help="Même graine = mêmes résultats")
+    window = {"Tout l'historique": None, "3 ans": 1095, "1 an": 365}[window_label]
+
+    with st.spinner("🎲 Simulation en cours..."):
+        projection = tracker.project_wealth(years, n_paths, monthly_contribution, METHOD_LABELS[method_label],
+                                            int(seed), window)
+
+    bands = projection['bands']
+    if not projection['final']:
+        st.info("📊 Historique de prix insuffisant (ou aucune position) pour projeter le patrimoine.")
+        return
+
+    final = projection['final']
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("💰 Valeur actuelle", f"{projection['initial_value']:,.0f}€")
+    with col2:
+        st.metric("🎯 Médiane finale", f"{final['median']:,.0f}€")
+    with col3:
+        st.metric("📉 Scénario défavorable (5%)", f"{final['p5']:,.0f}€")
+    with col4:
+        st.metric("⚠️ Probabilité de perte", f"{final['probability_loss'] * 100:.1f}%",
+                  help="Part des simulations finissant sous le total investi (valeur actuelle + versements)")
+
+    st.caption(f"Hypothèses : performance annuelle {projection['annual_return'] * 100:.2f}%, "
+               f"volatilité {projection['annual_volatility'] * 100:.2f}% "
+               f"({projection['observations']} jours ouvrés, {projection['coverage'] * 100:.0f}% de la valeur couverte)")
+    if projection['observations'] < 3 * TRADING_DAYS_PER_YEAR:
+        st.warning("⚠️ Moins de 3 ans d'historique : les hypothèses de performance sont peu fiables.")
+
+    fig = go.Figure()
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['p95'], mode='lines', line=dict(width=0),
+                             showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['p5'], mode='lines', line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(31, 119, 180, 0.15)', name="5% - 95%",
+                             hovertemplate='<b>%{x|%Y-%m}</b><br>5%: %{y:,.0f}€<extra></extra>'))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['p75'], mode='lines', line=dict(width=0),
+                             showlegend=False, hoverinfo='skip'))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['p25'], mode='lines', line=dict(width=0), fill='tonexty',
+                             fillcolor='rgba(31, 119, 180, 0.35)', name="25% - 75%",
+                             hovertemplate='<b>%{x|%Y-%m}</b><br>25%: %{y:,.0f}€<extra></extra>'))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['p50'], mode='lines', name="Médiane",
+                             line=dict(color='#1f77b4', width=3),
+                             hovertemplate='<b>%{x|%Y-%m}</b><br>Médiane: %{y:,.0f}€<extra></extra>'))
+    fig.add_trace(go.Scatter(x=bands.index, y=bands['invested'], mode='lines', name="Investi",
+                             line=dict(color='#ff7f0e', width=2, dash='dash'),
+                             hovertemplate='<b>%{x|%Y-%m}</b><br>Investi: %{y:,.0f}€<extra></extra>'))
+    fig.update_layout(height=500, yaxis_title="Patrimoine (€)", hovermode='x unified',
+                      margin=dict(l=0, r=0, t=20, b=0))
+    st.plotly_chart(fig, use_container_width=True)
+
+    with st.expander("📋 Percentiles par date"):
+        table = bands.rename(columns={'p5': '5%', 'p25': '25%', 'p50': 'Médiane', 'p75': '75%', 'p95': '95%',
+                                      'mean': 'Moyenne', 'invested': 'Investi'})
+        table.index = table.index.strftime('%Y-%m')
+        st.dataframe(table.style.format('{:,.0f}'), use_container_width=True)
@@ -0,0 +1,192 @@
+import streamlit as st
+import pandas as pd
+import plotly.graph_objects as go
+
+from ui import data_cache
+
+# Modes de saisie d'une opération hypothétique → clé attendue par simulate_scenario
+TRADE_MODES = {
+    "Montant (€)": 'amount',
+    "Quantité": 'quantity',
+    "Fraction de la position (%)": 'fraction',
+}
+
+AUTO_ACCOUNT = "Répartition automatique"
+
+BREAKDOWN_LABELS = {
+    "Classe d'actifs": 'asset_class',
+    "Compte": 'account',
+    "Plateforme": 'platform',
+    "Devise": 'currency',
+    "Produit": 'product',
+}
+
+
+def _manual_trades(products: pd.DataFrame, accounts: pd.DataFrame) -> list:
+    """Saisie des opérations hypothétiques dans un tableau éditable"""
+    st.write("**✍️ Opérations hypothétiques** (valeur positive = achat, négative = vente)")
+    editor = st.data_editor(
+        pd.DataFrame({'Symbole': pd.Series(dtype=str), 'Type': pd.Series(dtype=str),
+                      'Valeur': pd.Series(dtype=float), 'Compte': pd.Series(dtype=str)}),
+        num_rows="dynamic",
+        use_container_width=True,
+        key="scenario_trades",
+        column_config={
+            'Symbole': st.column_config.SelectboxColumn("Symbole", options=products['symbol'].tolist(), required=True),
+            'Type': st.column_config.SelectboxColumn("Type", options=list(TRADE_MODES), default="Montant (€)"),
+            'Valeur': st.column_config.NumberColumn("Valeur", format="%.2f"),
+            'Compte': st.column_config.SelectboxColumn("Compte", options=[AUTO_ACCOUNT] + accounts['name'].tolist(),
+                                                       default=AUTO_ACCOUNT),
+        }
+    )
+
+    account_ids = dict(zip(accounts['name'], accounts['id']))
+    trades = []
+    for row in editor.dropna(subset=['Symbole', 'Valeur']).itertuples(index=False):
+        mode = TRADE_MODES.get(row.Type, 'amount')
+        value = row.Valeur / 100 if mode == 'fraction' else row.Valeur
+        trade = {'symbol': row.Symbole, mode: value}
+        if row.Compte in account_ids:
+            trade['account_id'] = account_ids[row.Compte]
+        trades.append(trade)
+    return trades
+
+
+def _target_trades(tracker, summary: pd.DataFrame, products: pd.DataFrame) -> list:
+    """Allocation cible par classe d'actifs et opérations proposées pour l'atteindre"""
+    current = summary.groupby('product_type')['current_value'].sum() if not summary.empty else pd.Series(dtype=float)
+    current_weights = current / current.sum() * 100 if current.sum() > 0 else current
+    classes = sorted(set(current.index) | set(products['product_type'].dropna()))
+
+    st.write("**🎯 Répartition cible par classe d'actifs** (poids normalisés à 100%)")
+    targets = {}
+    candidates = {}
+    columns = st.columns(min(len(classes), 4) or 1)
+    for i, asset_class in enumerate(classes):
+        with columns[i % len(columns)]:
+            targets[asset_class] = st.slider(asset_class, 0, 100, int(round(current_weights.get(asset_class, 0))),
+                                             key=f"target_{asset_class}")
+            if asset_class not in current.index:
+                class_products = products[products['product_type'] == asset_class]['symbol'].tolist()
+                if class_products:
+                    candidates[asset_class] = st.selectbox(f"Produit pour {asset_class}", class_products,
+                                                           key=f"candidate_{asset_class}")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        contribution = st.number_input("💶 Apport (€)", min_value=0.0, value=0.0, step=100.0)
+    with col2:
+        allow_sells = st.checkbox("Autoriser les ventes", value=True,
+                                  help="Sans vente, seul l'apport est réparti vers les classes sous-pondérées")
+
+    if sum(targets.values()) <= 0:
+        st.info("Définissez au moins un poids cible.")
+        return []
+
+    trades, missing = tracker.propose_rebalancing(targets, contribution, allow_sells, candidates)
+    if missing:
+        st.warning(f"⚠️ Aucun produit disponible pour : {', '.join(missing)}")
+    if trades:
+        with st.expander(f"📋 Opérations proposées ({len(trades)})", expanded=True):
+            proposed = pd.DataFrame(trades).rename(columns={'symbol': 'Symbole', 'amount': 'Montant (€)'})
+            st.dataframe(proposed.sort_values('Montant (€)').style.format({'Montant (€)': '{:+,.2f}'}),
+                         use_container_width=True, hide_index=True)
+    else:
+        st.info("✅ La répartition actuelle correspond déjà à la cible.")
+    return trades
+
+
+def scenario_page(tracker):
+    st.title("🧪 Simulation de scénarios")
+    st.caption("Opérations hypothétiques appliquées en mémoire : aucune transaction n'est enregistrée")
+
+    summary = data_cache.get_portfolio_summary(tracker)
+    products = data_cache.get_financial_products(tracker)
+    accounts = data_cache.get_accounts(tracker)
+    if products.empty:
+        st.info("Ajoutez des produits financiers pour simuler des opérations.")
+        return
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        mode = st.radio("Mode", ["✍️ Opérations manuelles", "🎯 Allocation cible"], horizontal=True)
+    with col2:
+        window_label = st.selectbox("Fenêtre historique", ["1 an", "3 ans", "Tout l'historique"])
+    window = {"1 an": 365, "3 ans": 1095, "Tout l'historique": None}[window_label]
+
+    if mode == "✍️ Opérations manuelles":
+        trades = _manual_trades(products, accounts)
+    else:
+        trades = _target_trades(tracker, summary, products)
+
+    try:
+        result = tracker.simulate_scenario(trades, window)
+    except ValueError as e:
+        st.error(f"❌ {e}")
+        return
+
+    risk = result['risk']
+    before, after = risk.loc['before'], risk.loc['after']
+
+    st.divider()
+    st.subheader("📊 Effet du scénario")
+    col1, col2, col3, col4, col5 = st.columns(5)
+    with col1:
+        st.metric("💰 Valeur des positions", f"{after['value']:,.2f}€", f"{after['value'] - before['value']:+,.2f}€")
+    with col2:
+        st.metric("💶 Solde de trésorerie", f"{result['cash']:+,.2f}€",
+                  help="Liquidités libérées par les ventes (positif) ou à apporter pour les achats (négatif)")
+    with col3:
+        st.metric("🌊 Volatilité", f"{after['volatility'] * 100:.2f}%",
+                  f"{(after['volatility'] - before['volatility']) * 100:+.2f} pts", delta_color="inverse")
+    with col4:
+        st.metric("🎯 Nombre effectif de paris", f"{after['effective_bets']:.1f}",
+                  f"{after['effective_bets'] - before['effective_bets']:+.1f}")
+    with col5:
+        st.metric("📈 Performance sur la fenêtre", f"{after['period_return'] * 100:.2f}%",
+                  f"{(after['period_return'] - before['period_return']) * 100:+.2f} pts",
+                  help="Performance des quantités simulées, détenues sur toute la fenêtre")
+    if pd.notna(after['coverage']) and after['coverage'] < 0.99:
+        st.caption(f"Risque calculé sur {after['coverage'] * 100:.0f}% de la valeur (historique de prix suffisant)")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        level_label = st.selectbox("Répartition", list(BREAKDOWN_LABELS))
+        breakdown = result['breakdowns'][BREAKDOWN_LABELS[level_label]]
+        breakdown = breakdown[(breakdown['before'] > 0) | (breakdown['after'] > 0)]
+        fig_breakdown = go.Figure([
+            go.Bar(name="Avant", x=breakdown.index, y=breakdown['weight_before'] * 100, marker_color='#9ecae1',
+                   hovertemplate='<b>%{x}</b><br>Avant: %{y:.2f}%<extra></extra>'),
+            go.Bar(name="Après", x=breakdown.index, y=breakdown['weight_after'] * 100, marker_color='#1f77b4',
+                   hovertemplate='<b>%{x}</b><br>Après: %{y:.2f}%<extra></extra>'),
+        ])
+        fig_breakdown.update_layout(barmode='group', height=400, yaxis_title="Poids (%)",
+                                    margin=dict(l=0, r=0, t=20, b=0))
+        st.plotly_chart(fig_breakdown, use_container_width=True)
+
+    with col2:
+        st.write("**📈 Performance passée (base 100)**")
+        evolution = result['evolution']
+        fig_evolution = go.Figure([
+            go.Scatter(x=evolution.index, y=evolution['index_before'], mode='lines', name="Avant",
+                       line=dict(color='#9ecae1', width=2),
+                       hovertemplate='<b>%{x}</b><br>Avant: %{y:.2f}<extra></extra>'),
+            go.Scatter(x=evolution.index, y=evolution['index_after'], mode='lines', name="Après",
+                       line=dict(color='#1f77b4', width=2),
+                       hovertemplate='<b>%{x}</b><br>Après: %{y:.2f}<extra></extra>'),
+        ])
+        fig_evolution.update_layout(height=400, yaxis_title="Base 100", margin=dict(l=0, r=0, t=20, b=0))
+        st.plotly_chart(fig_evolution, use_container_width=True)
+
+    executed = result['trades']
+    if not executed.empty:
+        st.write("**📋 Mouvements simulés**")
+        changes = pd.DataFrame({
+            'Compte': executed['account_name'],
+            'Symbole': executed['symbol'],
+            'Quantité': executed['executed_quantity'],
+            'Prix (€)': executed['price_eur'],
+            'Montant (€)': executed['executed_quantity'] * executed['price_eur'],
+        })
+        st.dataframe(changes.style.format({'Quantité': '{:+,.4f}', 'Prix (€)': '{:,.2f}', 'Montant (€)': '{:+,.2f}'}),
+                     use_container_width=True, hide_index=True)
@@ -2,15 +2,24 @@ import streamlit as st
 import pandas as pd
 from datetime import datetime, timedelta
 
+from models.database import TRANSACTION_TYPES
+from models.records import Transaction
+from models.transaction_import import read_transactions_csv
+from ui import data_cache
+from ui.dashboard import TRANSACTION_LABELS
+
+# Tailles de page proposées pour la liste des transactions
+PAGE_SIZES = [25, 50, 100, 500]
+
 def transaction_page(tracker):
     st.title("💸 Gestion des Transactions")
     st.caption("💡 Saisissez vos prix dans n'importe quelle devise - La conversion historique est automatique !")
     
     # Onglets pour séparer nouvelle transaction et gestion
-    tab1, tab2 = st.tabs(["🛒 Nouvelle Transaction", "📋 Gérer les Transactions"])
+    tab1, tab2, tab3 = st.tabs(["🛒 Nouvelle Transaction", "📋 Gérer les Transactions", "📥 Import CSV"])
     
-    accounts = tracker.get_accounts()
-    products = tracker.get_financial_products()
+    accounts = data_cache.get_accounts(tracker)
+    products = data_cache.get_financial_products(tracker)
     
     if accounts.empty or products.empty:
         st.warning("Vous devez d'abord créer des comptes et des produits financiers.")
@@ -31,7 +40,8 @@ def transaction_page(tracker):
                                             options=products['symbol'].tolist(),
                                             format_func=lambda x: f"{x} - {products[products['symbol']==x]['name'].iloc[0]}")
                 
-                transaction_type = st.selectbox("Type", ["BUY", "SELL"])
+                transaction_type = st.selectbox("Type", TRANSACTION_TYPES,
+                                              help="DIVIDEND : quantité = parts détenues, prix = dividende par part, frais = retenues")
                 
                 # Afficher les prix actuels du produit sélectionné
                 if product_choice:
@@ -109,300 +119,348 @@ def transaction_page(tracker):
     with tab2:
         st.subheader("Gérer les transactions existantes")
         
-        # Récupérer toutes les transactions
-        all_transactions = tracker.get_all_transactions()
-        
-        if all_transactions.empty:
-            st.info("📝 Aucune transaction enregistrée.")
-            return
-        
-        # Filtres
+        # Filtres appliqués directement dans la requête SQL
         col1, col2, col3 = st.columns(3)
         
         with col1:
-            # Filtre par compte
-            account_options = ["Tous"] + all_transactions['account_name'].unique().tolist()
-            selected_account = st.selectbox("Filtrer par compte", account_options)
+            account_options = ["Tous"] + accounts['id'].tolist()
+            selected_account = st.selectbox("Filtrer par compte", account_options,
+                                            format_func=lambda x: x if x == "Tous" else accounts.loc[accounts['id'] == x, 'name'].iloc[0])
         
         with col2:
-            # Filtre par type
-            type_options = ["Tous", "BUY", "SELL"]
+            type_options = ["Tous"] + TRANSACTION_TYPES
             selected_type = st.selectbox("Filtrer par type", type_options)
         
         with col3:
-            # Filtre par période
-            period_options = ["Toutes", "7 derniers jours", "30 derniers jours", "3 derniers mois"]
-            selected_period = st.selectbox("Filtrer par période", period_options)
+            period_days = {"Toutes": None, "7 derniers jours": 7, "30 derniers jours": 30, "3 derniers mois": 90}
+            selected_period = st.selectbox("Filtrer par période", list(period_days))
+        
+        filters = {
+            'account_ids': [int(selected_account)] if selected_account != "Tous" else None,
+            'transaction_types': [selected_type] if selected_type != "Tous" else None,
+            'start_date': ((datetime.now().date() - timedelta(days=period_days[selected_period])).isoformat()
+                           if period_days[selected_period] else None),
+        }
+        
+        stats = data_cache.get_transaction_stats(tracker, filters)
+        if stats['count'] == 0:
+            if any(value is not None for value in filters.values()):
+                st.info("🔍 Aucune transaction ne correspond aux filtres sélectionnés.")
+            else:
+                st.info("📝 Aucune transaction enregistrée.")
+            return
+        
+        # Statistiques rapides (agrégées en SQL)
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            st.metric("📊 Transactions", stats['count'])
+        with col2:
+            st.metric("🛒 Achats", stats['by_type'].get('BUY', 0))
+        with col3:
+            st.metric("💰 Ventes", stats['by_type'].get('SELL', 0))
+        with col4:
+            st.metric("💸 Frais totaux", f"{stats['fees']:.2f} €")
         
-        # Appliquer les filtres
-        filtered_transactions = all_transactions.copy()
+        st.divider()
         
-        if selected_account != "Tous":
-            filtered_transactions = filtered_transactions[filtered_transactions['account_name'] == selected_account]
+        # Pagination par clé : pile des curseurs des pages parcourues, réinitialisée quand les filtres changent
+        page_size = st.selectbox("Transactions par page", PAGE_SIZES, index=1)
+        pager_key = (tuple(sorted((key, str(value)) for key, value in filters.items())), page_size)
+        if st.session_state.get('transactions_pager_key') != pager_key:
+            st.session_state.transactions_pager_key = pager_key
+            st.session_state.transactions_cursors = [None]
+        cursors = st.session_state.transactions_cursors
         
-        if selected_type != "Tous":
-            filtered_transactions = filtered_transactions[filtered_transactions['transaction_type'] == selected_type]
+        page, next_cursor = data_cache.query_transactions(tracker, filters, 'desc', page_size, cursors[-1])
         
-        if selected_period != "Toutes":
-            end_date = datetime.now()
-            if selected_period == "7 derniers jours":
-                start_date = end_date - timedelta(days=7)
-            elif selected_period == "30 derniers jours":
-                start_date = end_date - timedelta(days=30)
-            else:  # 3 derniers mois
-                start_date = end_date - timedelta(days=90)
-            
-            filtered_transactions = filtered_transactions[
-                filtered_transactions['transaction_date'] >= start_date
-            ]
+        # Tableau virtualisé : seules les lignes visibles sont rendues par le navigateur
+        labels = page['transaction_type'].map(lambda transaction_type: " ".join(
+            TRANSACTION_LABELS.get(transaction_type, ("🔴", "VENTE"))))
+        table = pd.DataFrame({
+            'Date': page['transaction_date'],
+            'Type': labels,
+            'Symbole': page['symbol'],
+            'Compte': page['account_name'],
+            'Quantité': page['quantity'],
+            'Prix': page['price'].map('{:.2f}'.format) + ' ' + page['price_currency'],
+            'Prix EUR': page['price_eur'],
+            'Frais (EUR)': page['fees'],
+            'Total (EUR)': page['total_amount'],
+            'Taux EUR/USD': page['exchange_rate_eur_usd'],
+        })
+        selection = st.dataframe(
+            table, hide_index=True, use_container_width=True, on_select="rerun", selection_mode="single-row",
+            key=f"transactions_table_{len(cursors)}",
+            column_config={
+                'Date': st.column_config.DatetimeColumn(format="DD/MM/YYYY"),
+                'Quantité': st.column_config.NumberColumn(format="%.4f"),
+                'Prix EUR': st.column_config.NumberColumn(format="%.2f €"),
+                'Frais (EUR)': st.column_config.NumberColumn(format="%.2f €"),
+                'Total (EUR)': st.column_config.NumberColumn(format="%.2f €"),
+                'Taux EUR/USD': st.column_config.NumberColumn(format="%.4f"),
+            }
+        )
         
-        # Statistiques rapides
-        if not filtered_transactions.empty:
-            col1, col2, col3, col4 = st.columns(4)
-            with col1:
-                st.metric("📊 Transactions", len(filtered_transactions))
-            with col2:
-                buy_count = len(filtered_transactions[filtered_transactions['transaction_type'] == 'BUY'])
-                st.metric("🛒 Achats", buy_count)
-            with col3:
-                sell_count = len(filtered_transactions[filtered_transactions['transaction_type'] == 'SELL'])
-                st.metric("💰 Ventes", sell_count)
-            with col4:
-                total_fees = filtered_transactions['fees'].sum()
-                st.metric("💸 Frais totaux", f"{total_fees:.2f} €")
-            
-            st.divider()
+        col1, col2, col3 = st.columns([1, 2, 1])
+        with col1:
+            if st.button("⬅️ Page précédente", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col2:
+            first = (len(cursors) - 1) * page_size + 1
+            st.caption(f"Transactions {first} à {first + len(page) - 1} sur {stats['count']} - "
+                       "sélectionnez une ligne pour la modifier")
+        with col3:
+            if st.button("Page suivante ➡️", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
+        
+        selected_rows = selection.selection.rows if selection is not None else []
+        transaction = None
+        if selected_rows:
+            transaction = tracker.get_transaction_by_id(int(page['id'].iloc[selected_rows[0]]))
+        if transaction is not None:
+            st.markdown(f"### ✏️ {transaction['symbol']} du {transaction['transaction_date'].strftime('%d/%m/%Y')}")
+            transaction_editor(tracker, transaction, accounts, products)
+        
+        # Export des transactions filtrées (toutes les pages)
+        st.divider()
+        st.subheader("📤 Export des données")
+        
+        col1, col2 = st.columns([1, 3])
+        with col1:
+            if st.button("📊 Télécharger CSV"):
+                filtered_transactions, _ = tracker.query_transactions(filters, limit=None)
+                csv = filtered_transactions.to_csv(index=False)
+                st.download_button(
+                    label="💾 Télécharger",
+                    data=csv,
+                    file_name=f"transactions_{datetime.now().strftime('%Y%m%d')}.csv",
+                    mime="text/csv"
+                )
+        
+        with col2:
+            st.caption("Téléchargez vos transactions filtrées au format CSV pour analyse externe.")
+    
+    with tab3:
+        transaction_import(tracker)
+
+def transaction_import(tracker):
+    """Import de transactions en lot : vérification du fichier, puis import des lignes valides"""
+    st.subheader("Importer des transactions depuis un fichier CSV")
+    st.caption("Colonnes : date (AAAA-MM-JJ ou JJ/MM/AAAA), compte (nom ou id), symbole, type "
+               "(BUY/SELL/DIVIDEND ou ACHAT/VENTE/DIVIDENDE), quantité, prix ; optionnelles : devise "
+               "(celle du produit par défaut), frais, devise_frais (EUR par défaut). Séparateur , ou ;")
+    
+    uploaded = st.file_uploader("Fichier CSV", type=['csv'])
+    if uploaded is None:
+        return
+    
+    # Vérification sans écriture ni téléchargement
+    try:
+        data = read_transactions_csv(uploaded)
+        check = tracker.import_transactions(data, dry_run=True)
+    except Exception as e:
+        st.error(f"❌ Fichier illisible : {str(e)}")
+        return
+    
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("📄 Lignes", check['rows'])
+    with col2:
+        st.metric("✅ Valides", check['valid'])
+    with col3:
+        st.metric("❌ En erreur", len(check['errors']))
+    
+    if check['created_products']:
+        st.info(f"🆕 Produits absents, créés à l'import via Yahoo Finance : {', '.join(check['created_products'])}")
+    
+    if check['errors']:
+        st.warning("Les lignes en erreur seront ignorées :")
+        st.dataframe(pd.DataFrame(check['errors'], columns=['Ligne', 'Erreur']), hide_index=True)
+    
+    with st.expander("👀 Aperçu du fichier"):
+        st.dataframe(data.head(20), hide_index=True)
+    
+    if check['valid'] and st.button(f"📥 Importer {check['valid']} transaction(s)", type="primary"):
+        with st.spinner("Import en cours..."):
+            result = tracker.import_transactions(data)
+        
+        st.success(f"✅ {result['imported']} transaction(s) importée(s)")
+        if result['created_products']:
+            st.info(f"🆕 Produits créés : {', '.join(result['created_products'])}")
+        if result['errors']:
+            st.warning(f"⚠️ {len(result['errors'])} ligne(s) ignorée(s)")
+            st.dataframe(pd.DataFrame(result['errors'], columns=['Ligne', 'Erreur']), hide_index=True)
+
+def transaction_editor(tracker, transaction: Transaction, accounts: pd.DataFrame, products: pd.DataFrame):
+    """Formulaire de modification / suppression et détails d'une transaction"""
+    total_amount = transaction['total_amount']
+    
+    col1, col2 = st.columns([3, 1])
+    
+    with col1:
+        # Formulaire de modification
+        with st.form(f"edit_transaction_{transaction['id']}"):
+            st.write("**Modifier cette transaction :**")
             
-            # Affichage des transactions par groupe
-            current_date = None
+            # Champs modifiables
+            edit_col1, edit_col2 = st.columns(2)
             
-            for _, transaction in filtered_transactions.iterrows():
-                transaction_date = transaction['transaction_date'].date()
+            with edit_col1:
+                # Compte
+                accounts_list = accounts['id'].tolist()
+                current_account_idx = 0
+                for idx, acc_id in enumerate(accounts_list):
+                    if acc_id == transaction['account_id']:
+                        current_account_idx = idx
+                        break
                 
-                # Afficher l'en-tête de date si c'est une nouvelle date
-                if current_date != transaction_date:
-                    current_date = transaction_date
-                    st.markdown(f"### 📅 {transaction_date.strftime('%d/%m/%Y')}")
+                new_account = st.selectbox("Compte", 
+                                         options=accounts_list,
+                                         index=current_account_idx,
+                                         format_func=lambda x: f"{accounts[accounts['id']==x]['name'].iloc[0]} ({accounts[accounts['id']==x]['platform_name'].iloc[0]})",
+                                         key=f"account_{transaction['id']}")
                 
-                # Couleur selon le type de transaction
-                if transaction['transaction_type'] == 'BUY':
-                    type_color = "🟢"
-                    type_label = "ACHAT"
-                else:
-                    type_color = "🔴"
-                    type_label = "VENTE"
+                # Produit
+                products_list = products['symbol'].tolist()
+                current_product_idx = 0
+                for idx, symbol in enumerate(products_list):
+                    if symbol == transaction['symbol']:
+                        current_product_idx = idx
+                        break
+                
+                new_product = st.selectbox("Produit", 
+                                         options=products_list,
+                                         index=current_product_idx,
+                                         format_func=lambda x: f"{x} - {products[products['symbol']==x]['name'].iloc[0]}",
+                                         key=f"product_{transaction['id']}")
                 
-                # Afficher la transaction dans un expander
-                total_amount = transaction['total_amount']
+                new_type = st.selectbox("Type", 
+                                       TRANSACTION_TYPES,
+                                       index=TRANSACTION_TYPES.index(transaction['transaction_type']),
+                                       key=f"type_{transaction['id']}")
+            
+            with edit_col2:
+                new_quantity = st.number_input("Quantité", 
+                                             min_value=0.0, 
+                                             step=0.0001,
+                                             value=float(transaction['quantity']),
+                                             key=f"quantity_{transaction['id']}")
                 
-                # Affichage du prix avec conversion plus détaillé
-                price_display = f"{transaction['price']:.2f} {transaction['price_currency']}"
+                # Sélecteur de devise pour modifier la transaction
+                available_currencies = ["EUR", "USD", "GBP", "CHF", "CAD", "JPY"]
+                current_currency_idx = 0
+                if transaction['price_currency'] in available_currencies:
+                    current_currency_idx = available_currencies.index(transaction['price_currency'])
                 
-                # Ajouter les conversions historiques si différentes de la devise de saisie
-                conversion_info = []
-                if transaction['price_currency'] != 'EUR' and pd.notna(transaction['price_eur']):
-                    conversion_info.append(f"{transaction['price_eur']:.2f} €")
-                if transaction['price_currency'] != 'USD' and pd.notna(transaction['price_usd']):
-                    conversion_info.append(f"{transaction['price_usd']:.2f} $")
+                new_price_currency = st.selectbox("Devise du prix", 
+                                                 available_currencies,
+                                                 index=current_currency_idx,
+                                                 key=f"currency_{transaction['id']}",
+                                                 help="Changez la devise et le prix sera reconverti avec le taux historique")
                 
-                if conversion_info:
-                    price_display += f" ({' / '.join(conversion_info)})"
+                new_price = st.number_input(f"Prix unitaire ({new_price_currency})", 
+                                           min_value=0.0, 
+                                           step=0.01,
+                                           value=float(transaction['price']),
+                                           key=f"price_{transaction['id']}")
                 
-                # Afficher le taux de change si disponible
-                rate_info = ""
-                if pd.notna(transaction.get('exchange_rate_eur_usd')):
-                    rate_info = f" | Taux: {transaction['exchange_rate_eur_usd']:.4f}"
+                # Afficher la conversion historique si la devise a changé
+                if new_price_currency != transaction['price_currency'] and new_price > 0:
+                    historical_date = transaction['transaction_date']
+                    est_eur = tracker.currency_converter.convert_with_historical_rate(
+                        new_price, new_price_currency, 'EUR', historical_date
+                    )
+                    est_usd = tracker.currency_converter.convert_with_historical_rate(
+                        new_price, new_price_currency, 'USD', historical_date
+                    )
+                    st.caption(f"💱 À la date du {historical_date.strftime('%d/%m/%Y')} :")
+                    st.caption(f"~{est_eur:.2f} EUR / ~{est_usd:.2f} USD")
                 
-                transaction_title = f"{type_color} {type_label} • {transaction['symbol']} • {transaction['quantity']:.4f} @ {price_display} • {total_amount:,.2f} €{rate_info}"
+                new_fees = st.number_input("Frais (EUR)", 
+                                          min_value=0.0, 
+                                          step=0.01,
+                                          value=float(transaction['fees']),
+                                          key=f"fees_{transaction['id']}")
                 
-                with st.expander(transaction_title):
-                    col1, col2 = st.columns([3, 1])
-                    
-                    with col1:
-                        # Formulaire de modification
-                        with st.form(f"edit_transaction_{transaction['id']}"):
-                            st.write("**Modifier cette transaction :**")
-                            
-                            # Champs modifiables
-                            edit_col1, edit_col2 = st.columns(2)
-                            
-                            with edit_col1:
-                                # Compte
-                                accounts_list = accounts['id'].tolist()
-                                current_account_idx = 0
-                                for idx, acc_id in enumerate(accounts_list):
-                                    if acc_id == transaction['account_id']:
-                                        current_account_idx = idx
-                                        break
-                                
-                                new_account = st.selectbox("Compte", 
-                                                         options=accounts_list,
-                                                         index=current_account_idx,
-                                                         format_func=lambda x: f"{accounts[accounts['id']==x]['name'].iloc[0]} ({accounts[accounts['id']==x]['platform_name'].iloc[0]})",
-                                                         key=f"account_{transaction['id']}")
-                                
-                                # Produit
-                                products_list = products['symbol'].tolist()
-                                current_product_idx = 0
-                                for idx, symbol in enumerate(products_list):
-                                    if symbol == transaction['symbol']:
-                                        current_product_idx = idx
-                                        break
-                                
-                                new_product = st.selectbox("Produit", 
-                                                         options=products_list,
-                                                         index=current_product_idx,
-                                                         format_func=lambda x: f"{x} - {products[products['symbol']==x]['name'].iloc[0]}",
-                                                         key=f"product_{transaction['id']}")
-                                
-                                new_type = st.selectbox("Type", 
-                                                       ["BUY", "SELL"],
-                                                       index=0 if transaction['transaction_type'] == 'BUY' else 1,
-                                                       key=f"type_{transaction['id']}")
-                            
-                            with edit_col2:
-                                new_quantity = st.number_input("Quantité", 
-                                                             min_value=0.0, 
-                                                             step=0.0001,
-                                                             value=float(transaction['quantity']),
-                                                             key=f"quantity_{transaction['id']}")
-                                
-                                # Sélecteur de devise pour modifier la transaction
-                                available_currencies = ["EUR", "USD", "GBP", "CHF", "CAD", "JPY"]
-                                current_currency_idx = 0
-                                if transaction['price_currency'] in available_currencies:
-                                    current_currency_idx = available_currencies.index(transaction['price_currency'])
-                                
-                                new_price_currency = st.selectbox("Devise du prix", 
-                                                                 available_currencies,
-                                                                 index=current_currency_idx,
-                                                                 key=f"currency_{transaction['id']}",
-                                                                 help="Changez la devise et le prix sera reconverti avec le taux historique")
-                                
-                                new_price = st.number_input(f"Prix unitaire ({new_price_currency})", 
-                                                           min_value=0.0, 
-                                                           step=0.01,
-                                                           value=float(transaction['price']),
-                                                           key=f"price_{transaction['id']}")
-                                
-                                # Afficher la conversion historique si la devise a changé
-                                if new_price_currency != transaction['price_currency'] and new_price > 0:
-                                    historical_date = transaction['transaction_date']
-                                    est_eur = tracker.currency_converter.convert_with_historical_rate(
-                                        new_price, new_price_currency, 'EUR', historical_date
-                                    )
-                                    est_usd = tracker.currency_converter.convert_with_historical_rate(
-                                        new_price, new_price_currency, 'USD', historical_date
-                                    )
-                                    st.caption(f"💱 À la date du {historical_date.strftime('%d/%m/%Y')} :")
-                                    st.caption(f"~{est_eur:.2f} EUR / ~{est_usd:.2f} USD")
-                                
-                                new_fees = st.number_input("Frais (EUR)", 
-                                                          min_value=0.0, 
-                                                          step=0.01,
-                                                          value=float(transaction['fees']),
-                                                          key=f"fees_{transaction['id']}")
-                                
-                                new_date = st.date_input("Date", 
-                                                        value=transaction['transaction_date'].date(),
-                                                        key=f"date_{transaction['id']}")
-                            
-                            # Boutons d'action
-                            col_update, col_delete = st.columns(2)
-                            
-                            with col_update:
-                                if st.form_submit_button("✏️ Modifier", type="primary"):
-                                    success, message = tracker.update_transaction(
-                                        transaction['id'], new_account, new_product, new_type,
-                                        new_quantity, new_price, new_price_currency,
-                                        datetime.combine(new_date, datetime.min.time()), new_fees
-                                    )
-                                    if success:
-                                        st.success(message)
-                                        st.rerun()
-                                    else:
-                                        st.error(message)
-                            
-                            with col_delete:
-                                if st.form_submit_button("🗑️ Supprimer", type="secondary"):
-                                    success, message = tracker.delete_transaction(transaction['id'])
-                                    if success:
-                                        st.success(message)
-                                        st.rerun()
-                                    else:
-                                        st.error(message)
-                    
-                    with col2:
-                        # Informations détaillées de la transaction
-                        st.write("**Détails :**")
-                        st.write(f"**Compte :** {transaction['account_name']}")
-                        st.write(f"**Plateforme :** {transaction['platform_name']}")
-                        st.write(f"**Produit :** {transaction['product_name']}")
-                        st.write(f"**Devise produit :** {transaction['product_currency']}")
-                        st.write(f"**Type :** {transaction['transaction_type']}")
-                        st.write(f"**Quantité :** {transaction['quantity']:.4f}")
-                        
-                        st.divider()
-                        st.write("**💰 Prix à la date d'achat :**")
-                        
-                        # Prix saisi
-                        st.write(f"**Prix saisi :** {transaction['price']:.2f} {transaction['price_currency']}")
-                        
-                        # Prix historiques convertis à la date de transaction
-                        transaction_date = transaction['transaction_date']
-                        st.write(f"**À la date du {transaction_date.strftime('%d/%m/%Y')} :**")
-                        
-                        if pd.notna(transaction['price_eur']):
-                            st.write(f"  📈 **Prix EUR :** {transaction['price_eur']:.2f} €")
-                        
-                        if pd.notna(transaction['price_usd']):
-                            st.write(f"  📈 **Prix USD :** {transaction['price_usd']:.2f} $")
-                        
-                        # Taux de change utilisé pour cette transaction
-                        if pd.notna(transaction.get('exchange_rate_eur_usd')):
-                            st.write(f"**Taux EUR/USD utilisé :** {transaction['exchange_rate_eur_usd']:.4f}")
-                        
-                        st.divider()
-                        st.write("**💸 Autres informations :**")
-                        st.write(f"**Frais :** {transaction['fees']:.2f} EUR")
-                        st.write(f"**Total :** {total_amount:,.2f} EUR")
-                        st.write(f"**Date/Heure :** {transaction['transaction_date'].strftime('%d/%m/%Y %H:%M')}")
-                        
-                        # Comparaison avec les prix actuels si disponible
-                        products = tracker.get_financial_products()
-                        current_product = products[products['symbol'] == transaction['symbol']]
-                        if not current_product.empty:
-                            current_price = current_product.iloc[0]
-                            if pd.notna(current_price['current_price_eur']):
-                                price_change_eur = current_price['current_price_eur'] - transaction['price_eur']
-                                price_change_pct = (price_change_eur / transaction['price_eur']) * 100
-                                
-                                st.divider()
-                                st.write("**📊 Évolution depuis l'achat :**")
-                                st.write(f"**Prix actuel :** {current_price['current_price_eur']:.2f} €")
-                                
-                                if price_change_eur >= 0:
-                                    st.write(f"**Évolution :** +{price_change_eur:.2f} € (+{price_change_pct:.2f}%) 📈")
-                                else:
-                                    st.write(f"**Évolution :** {price_change_eur:.2f} € ({price_change_pct:.2f}%) 📉")
-        else:
-            st.info("🔍 Aucune transaction ne correspond aux filtres sélectionnés.")
+                new_date = st.date_input("Date", 
+                                        value=transaction['transaction_date'].date(),
+                                        key=f"date_{transaction['id']}")
             
-        # Export des transactions (optionnel)
-        if not all_transactions.empty:
-            st.divider()
-            st.subheader("📤 Export des données")
+            # Boutons d'action
+            col_update, col_delete = st.columns(2)
             
-            col1, col2 = st.columns([1, 3])
-            with col1:
-                if st.button("📊 Télécharger CSV"):
-                    csv = filtered_transactions.to_csv(index=False)
-                    st.download_button(
-                        label="💾 Télécharger",
-                        data=csv,
-                        file_name=f"transactions_{datetime.now().strftime('%Y%m%d')}.csv",
-                        mime="text/csv"
+            with col_update:
+                if st.form_submit_button("✏️ Modifier", type="primary"):
+                    success, message = tracker.update_transaction(
+                        transaction['id'], new_account, new_product, new_type,
+                        new_quantity, new_price, new_price_currency,
+                        datetime.combine(new_date, datetime.min.time()), new_fees
                     )
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(message)
             
-            with col2:
-                st.caption("Téléchargez vos transactions filtrées au format CSV pour analyse externe.")
\ No newline at end of file
+            with col_delete:
+                if st.form_submit_button("🗑️ Supprimer", type="secondary"):
+                    success, message = tracker.delete_transaction(transaction['id'])
+                    if success:
+                        st.success(message)
+                        st.rerun()
+                    else:
+                        st.error(message)
+    
+    with col2:
+        # Informations détaillées de la transaction
+        st.write("**Détails :**")
+        st.write(f"**Compte :** {transaction['account_name']}")
+        st.write(f"**Plateforme :** {transaction['platform_name']}")
+        st.write(f"**Produit :** {transaction['product_name']}")
+        st.write(f"**Devise produit :** {transaction['product_currency']}")
+        st.write(f"**Type :** {transaction['transaction_type']}")
+        st.write(f"**Quantité :** {transaction['quantity']:.4f}")
+        
+        st.divider()
+        st.write("**💰 Prix à la date d'achat :**")
+        
+        # Prix saisi
+        st.write(f"**Prix saisi :** {transaction['price']:.2f} {transaction['price_currency']}")
+        
+        # Prix historiques convertis à la date de transaction
+        transaction_date = transaction['transaction_date']
+        st.write(f"**À la date du {transaction_date.strftime('%d/%m/%Y')} :**")
+        
+        if pd.notna(transaction['price_eur']):
+            st.write(f"  📈 **Prix EUR :** {transaction['price_eur']:.2f} €")
+        
+        if pd.notna(transaction['price_usd']):
+            st.write(f"  📈 **Prix USD :** {transaction['price_usd']:.2f} $")
+        
+        # Taux de change utilisé pour cette transaction
+        if pd.notna(transaction.get('exchange_rate_eur_usd')):
+            st.write(f"**Taux EUR/USD utilisé :** {transaction['exchange_rate_eur_usd']:.4f}")
+        
+        st.divider()
+        st.write("**💸 Autres informations :**")
+        st.write(f"**Frais :** {transaction['fees']:.2f} EUR")
+        st.write(f"**Total :** {total_amount:,.2f} EUR")
+        st.write(f"**Date/Heure :** {transaction['transaction_date'].strftime('%d/%m/%Y %H:%M')}")
+        
+        # Comparaison avec les prix actuels si disponible
+        current_price = tracker.get_financial_product_by_id(transaction['product_id'])
+        if current_price is not None:
+            if pd.notna(current_price['current_price_eur']):
+                price_change_eur = current_price['current_price_eur'] - transaction['price_eur']
+                price_change_pct = (price_change_eur / transaction['price_eur']) * 100
+                
+                st.divider()
+                st.write("**📊 Évolution depuis l'achat :**")
+                st.write(f"**Prix actuel :** {current_price['current_price_eur']:.2f} €")
+                
+                if price_change_eur >= 0:
+                    st.write(f"**Évolution :** +{price_change_eur:.2f} € (+{price_change_pct:.2f}%) 📈")
+                else:
+                    st.write(f"**Évolution :** {price_change_eur:.2f} € ({price_change_pct:.2f}%) 📉")
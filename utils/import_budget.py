@@ -0,0 +1,109 @@
+import os
+import subprocess
+import sys
+from typing import Dict, List
+
+# Module importé au démarrage de l'application (celui que lance `streamlit run`)
+COLD_START_MODULE = 'main'
+
+# Socle incompressible du démarrage : la durée de main est rapportée à la sienne, mesurée
+# sur la même machine au même moment (une durée absolue dépendrait trop de la machine)
+BASE_MODULES = ('streamlit', 'pandas')
+
+# Modules lourds chargés seulement là où ils servent : ils ne doivent pas être importés au démarrage
+# (plotly.graph_objects n'y figure pas : streamlit l'importe lui-même)
+LAZY_MODULES = ('yfinance', 'requests', 'plotly.express')
+
+# Rapport import de main / import du socle accordé au démarrage à froid (1.35 à 1.7 mesuré
+# avant le chargement à la demande, 1.1 à 1.2 après), vérifié par tests/test_import_budget.py
+IMPORT_TIME_BUDGET_RATIO = 1.3
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def measure_import_time(modules: str = COLD_START_MODULE, repeat: int = 3) -> Dict[str, int]:
+    """
+    Importe modules (noms séparés par des virgules) dans un interpréteur neuf avec
+    `-X importtime` et retourne la durée cumulée d'import (en µs) de chaque module chargé,
+    sous-modules compris. La mesure est répétée repeat fois et la plus courte est retenue.
+    """
+    timings = {}
+    for _ in range(repeat):
+        for name, cumulative_us in _run_importtime(modules).items():
+            timings[name] = min(cumulative_us, timings.get(name, cumulative_us))
+    return timings
+
+
+def _run_importtime(modules: str) -> Dict[str, int]:
+    """Une mesure `-X importtime` (voir measure_import_time)"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {modules}'],
+                            cwd=_ROOT, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"Import de {modules} impossible :\n{result.stderr}")
+
+    timings = {}
+    for line in result.stderr.splitlines():
+        # Format : "import time: <propre µs> | <cumulé µs> | <indentation><module>"
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[1].strip().isdigit():
+            continue  # ligne d'en-tête
+        timings[fields[2].strip()] = int(fields[1])
+    return timings
+
+
+def base_import_time() -> int:
+    """Durée d'import (en µs) du socle BASE_MODULES"""
+    timings = measure_import_time(', '.join(BASE_MODULES))
+    return sum(timings.get(module, 0) for module in BASE_MODULES)
+
+
+def loaded_lazy_modules(timings: Dict[str, int]) -> List[str]:
+    """Modules de LAZY_MODULES (sous-modules compris) présents dans une mesure, triés"""
+    return sorted(name for name in timings
+                  if any(name == lazy or name.startswith(lazy + '.') for lazy in LAZY_MODULES))
+
+
+def check_import_budget(timings: Dict[str, int], base_us: int,
+                        budget_ratio: float = IMPORT_TIME_BUDGET_RATIO) -> List[str]:
+    """
+    Écarts au budget de démarrage (liste vide si respecté) à partir d'une mesure de main
+    (measure_import_time) et de celle du socle (base_import_time) : modules lourds
+    chargés, rapport des durées dépassé
+    """
+    problems = []
+
+    for name in loaded_lazy_modules(timings):
+        problems.append(f"{name} est importé au démarrage (chargement à la demande attendu)")
+
+    ratio = timings.get(COLD_START_MODULE, 0) / base_us if base_us else 0
+    if ratio > budget_ratio:
+        problems.append(f"import de {COLD_START_MODULE} : {ratio:.2f} fois le socle "
+                        f"pour un budget de {budget_ratio}")
+    return problems
+
+
+def main() -> int:
+    timings = measure_import_time()
+    base_us = base_import_time()
+    total_us = timings.get(COLD_START_MODULE, 0)
+    print(f"Import de {COLD_START_MODULE} : {total_us / 1000:.0f} ms, "
+          f"socle {' + '.join(BASE_MODULES)} : {base_us / 1000:.0f} ms, "
+          f"rapport {total_us / base_us:.2f} (budget {IMPORT_TIME_BUDGET_RATIO})")
+
+    # Modules de premier niveau les plus coûteux
+    top_level = {name: us for name, us in timings.items() if '.' not in name and name != COLD_START_MODULE}
+    for name, us in sorted(top_level.items(), key=lambda item: item[1], reverse=True)[:10]:
+        print(f"  {name:<30} {us / 1000:8.0f} ms")
+
+    problems = check_import_budget(timings, base_us)
+    for problem in problems:
+        print(f"❌ {problem}")
+    if not problems:
+        print("✅ Budget de démarrage respecté")
+    return 1 if problems else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
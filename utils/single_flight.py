@@ -0,0 +1,63 @@
+import threading
+from typing import Any, Callable, Dict, Hashable
+
+
+class _Call:
+    """Appel en cours partagé entre les demandeurs d'une même clé"""
+
+    __slots__ = ('event', 'result', 'error', 'waiters')
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Regroupe les appels concurrents portant sur la même clé (single-flight).
+
+    Le premier appelant exécute la fonction ; les appelants concurrents avec la
+    même clé attendent sa fin et reçoivent le même résultat (ou la même exception).
+    Rien n'est mis en cache : une fois l'appel terminé, la clé est libérée.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Exécute fn(*args, **kwargs) une seule fois pour tous les appels concurrents sur key"""
+        with self._lock:
+            call = self._calls.get(key)
+            if call is None:
+                call = _Call()
+                self._calls[key] = call
+                leader = True
+            else:
+                call.waiters += 1
+                leader = False
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = fn(*args, **kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+        return call.result
+
+    def in_flight(self) -> int:
+        """Nombre de clés en cours de téléchargement"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,44 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Hashable
+
+from utils.single_flight import SingleFlight
+
+
+class VersionedCache:
+    """
+    Cache LRU borné pour des calculs dépendant de la version des données.
+
+    Chaque entrée est indexée par (clé, version) : dès que la version des données
+    change, les anciennes entrées ne sont plus servies et sortent du cache par LRU.
+    Les calculs concurrents d'une même entrée sont regroupés (single-flight).
+    """
+
+    def __init__(self, max_entries: int = 32):
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: OrderedDict = OrderedDict()
+        self._flight = SingleFlight()
+
+    def get_or_compute(self, key: Hashable, version: Hashable, fn: Callable, *args, **kwargs) -> Any:
+        """Retourne la valeur en cache pour (key, version), ou la calcule avec fn(*args, **kwargs)"""
+        entry_key = (key, version)
+        with self._lock:
+            if entry_key in self._entries:
+                self._entries.move_to_end(entry_key)
+                return self._entries[entry_key]
+
+        value = self._flight.do(entry_key, fn, *args, **kwargs)
+
+        with self._lock:
+            self._entries[entry_key] = value
+            self._entries.move_to_end(entry_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return value
+
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self._entries.clear()
@@ -1,6 +1,10 @@
-import yfinance as yf
 import re
-from typing import Dict, Optional, Tuple
+from typing import Dict, List, Optional, Tuple
+
+from utils.single_flight import SingleFlight
+
+# Téléchargements Yahoo Finance en cours, partagés entre toutes les sessions du processus
+_market_data_flight = SingleFlight()
 
 class YahooFinanceUtils:
     """Utilitaires pour extraire les informations de Yahoo Finance"""
@@ -74,12 +78,64 @@ class YahooFinanceUtils:
         # Par défaut, considérer comme USD (marchés américains)
         return 'USD'
     
+    @staticmethod
+    def get_history(symbol: str, period: Optional[str] = None, start=None, end=None):
+        """
+        Télécharge l'historique d'un symbole.
+        Close est le cours de clôture non ajusté des dividendes (ceux-ci sont fournis à part
+        dans la colonne Dividends, avec les fractionnements dans Stock Splits).
+        Les appels concurrents sur le même (symbole, plage) partagent un seul téléchargement :
+        le DataFrame retourné est partagé et ne doit pas être modifié en place.
+        """
+        import yfinance as yf
+
+        key = ('history', symbol.upper(), period, start, end)
+        if period is not None:
+            return _market_data_flight.do(key, lambda: yf.Ticker(symbol).history(period=period, auto_adjust=False))
+        return _market_data_flight.do(key, lambda: yf.Ticker(symbol).history(start=start, end=end, auto_adjust=False))
+    
+    @staticmethod
+    def get_histories(symbols: List[str], period: str) -> Dict:
+        """
+        Télécharge l'historique de plusieurs symboles en une seule requête groupée et le
+        découpe par symbole (en majuscules), avec les mêmes colonnes que get_history.
+        Un symbole sans aucune cotation sur la période est absent du résultat.
+        """
+        import yfinance as yf
+
+        symbols = sorted({symbol.upper() for symbol in symbols})
+        data = yf.download(symbols, period=period, group_by='ticker', auto_adjust=False, actions=True,
+                           multi_level_index=True, progress=False)
+        histories = {}
+        if data is None or data.empty:
+            return histories
+
+        downloaded = set(data.columns.get_level_values(0))
+        for symbol in symbols:
+            if symbol not in downloaded:
+                continue
+            # Les jours cotés par un autre symbole seulement sont retirés
+            hist = data[symbol].dropna(subset=['Close'])
+            if not hist.empty:
+                histories[symbol] = hist.fillna({'Dividends': 0.0, 'Stock Splits': 0.0})
+        return histories
+    
     @staticmethod
     def get_product_info(symbol: str) -> Tuple[bool, Dict]:
         """
         Récupère les informations complètes d'un produit financier
         Retourne (success, info_dict)
         """
+        success, info = _market_data_flight.do(('info', symbol.upper()),
+                                               YahooFinanceUtils._fetch_product_info, symbol)
+        # Copie par appelant : le résultat partagé peut être enrichi par chacun
+        return success, dict(info)
+    
+    @staticmethod
+    def _fetch_product_info(symbol: str) -> Tuple[bool, Dict]:
+        """Télécharge les informations d'un produit (voir get_product_info)"""
+        import yfinance as yf
+
         try:
             ticker = yf.Ticker(symbol)
             
@@ -174,6 +230,8 @@ class YahooFinanceUtils:
         Valide qu'un symbole existe sur Yahoo Finance
         Retourne (is_valid, message)
         """
+        import yfinance as yf
+
         try:
             ticker = yf.Ticker(symbol)
             hist = ticker.history(period="1d")